@@ -0,0 +1,60 @@
+"""
+Peak RSS of the streaming downloader versus buffering the whole response.
+
+Each download runs in a fresh child process against the local mock HeyGen
+server, and the child's peak resident set size is reported per video size.
+Unix only (uses the resource module).
+
+Usage (from the repository root):
+    python -m benchmarks.bench_download_memory [--sizes-mb 10 100 400]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+from mock_heygen import MockHeyGenServer
+
+CHILD = r"""
+import resource, sys, requests
+import video_downloader
+url, dest, mode = sys.argv[1:4]
+if mode == "buffered":
+    with open(dest, "wb") as f:
+        f.write(requests.get(url).content)
+else:
+    video_downloader.download_file(requests.Session(), url, dest)
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+# ru_maxrss is KB on Linux, bytes on macOS.
+print(peak / 1024 if sys.platform != "darwin" else peak / 1024 / 1024)
+"""
+
+
+def peak_rss_mb(url, dest, mode):
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.check_output(
+        [sys.executable, "-c", CHILD, url, dest, mode], cwd=repo_root, text=True
+    )
+    return float(output.strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[10, 100, 400])
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'buffered':>12} {'streaming':>12}")
+    for size_mb in args.sizes_mb:
+        with MockHeyGenServer(render_seconds=0, video_size=size_mb * 1024 * 1024) as mock, \
+                tempfile.TemporaryDirectory() as folder:
+            video_id = mock.create_video("bench", "bench")
+            url = f"{mock.url}/videos/{video_id}.mp4"
+            buffered = peak_rss_mb(url, os.path.join(folder, "buffered.mp4"), "buffered")
+            streaming = peak_rss_mb(url, os.path.join(folder, "streaming.mp4"), "streaming")
+        print(f"{size_mb:>6}MB {buffered:>10.1f}MB {streaming:>10.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Compares step5's old serial poll-then-download loop with the concurrent engine.
+
+Videos are submitted to the local mock HeyGen server with staggered render
+times, slowest first, so the serial loop is stuck behind the first row.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_downloads [--videos 20] [--max-render 6] [--video-size 2000000]
+"""
+
+import argparse
+import itertools
+import os
+import tempfile
+import time
+
+import requests
+
+from mock_heygen import MockHeyGenServer
+from video_downloader import DownloadEngine, DownloadJob
+
+
+def submit_videos(mock, count):
+    ids = []
+    for i in range(count):
+        response = requests.post(mock.url + "/v2/video/generate", json={
+            "title": f"{i} - Lead",
+            "video_inputs": [{"voice": {"input_text": f"Script {i}"}}],
+        })
+        ids.append(response.json()["data"]["video_id"])
+    return ids
+
+
+def serial(mock, ids, folder, poll_interval):
+    """The original step5 loop: poll one id until done, download it, then the next."""
+    start = time.monotonic()
+    for i, video_id in enumerate(ids):
+        while True:
+            data = requests.get(mock.url + "/v1/video_status.get", params={"video_id": video_id}).json()["data"]
+            if data["status"] == "completed":
+                break
+            time.sleep(poll_interval)
+        content = requests.get(data["video_url"]).content
+        with open(os.path.join(folder, f"serial_{i}.mp4"), "wb") as f:
+            f.write(content)
+    return time.monotonic() - start
+
+
+def concurrent_engine(mock, ids, folder, poll_interval):
+    engine = DownloadEngine("", base_url=mock.url, min_interval=poll_interval, max_interval=poll_interval * 8)
+    jobs = [DownloadJob(i, video_id, os.path.join(folder, f"engine_{i}.mp4")) for i, video_id in enumerate(ids)]
+    start = time.monotonic()
+    try:
+        engine.run(jobs)
+    finally:
+        engine.close()
+    return time.monotonic() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--videos", type=int, default=20)
+    parser.add_argument("--max-render", type=float, default=6.0, help="Render time of the slowest video (s).")
+    parser.add_argument("--video-size", type=int, default=2_000_000)
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    args = parser.parse_args()
+
+    # Slowest render first, then evenly spaced down to ~0.
+    step = args.max_render / args.videos
+    for label, runner in (("serial", serial), ("concurrent", concurrent_engine)):
+        render_times = itertools.count(args.max_render, -step)
+        with MockHeyGenServer(render_seconds=lambda: max(0.0, next(render_times)),
+                              video_size=args.video_size) as mock, tempfile.TemporaryDirectory() as folder:
+            ids = submit_videos(mock, args.videos)
+            started = time.time()
+            elapsed = runner(mock, ids, folder, args.poll_interval)
+            # How long each video waited before it was on disk.
+            waits = [os.path.getmtime(os.path.join(folder, name)) - started for name in os.listdir(folder)]
+            print(f"{label:>10}: {elapsed:.2f}s for {args.videos} videos, "
+                  f"mean time to file {sum(waits) / len(waits):.2f}s, "
+                  f"{mock.request_counts.get('status', 0)} status requests")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Encoding speed of each H.264 path step6 can use on this machine.
+
+Every encoder the local ffmpeg lists (and that passes the test encode) is
+timed on the same synthetic 1080p clip, plus libx264 at a few presets.
+The path select_encoder would pick is marked.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_encoders [--seconds 10] [--size 1920x1080]
+"""
+
+import argparse
+import subprocess
+import time
+
+from ffmpeg_encoders import (EncoderChoice, EncoderError, available_choices, probe_capabilities,
+                             select_encoder, test_encode, CPU_CRF)
+
+CPU_PRESETS = ("ultrafast", "veryfast", "medium")
+
+
+def encode_fps(choice, seconds, size, rate=30):
+    cmd = (["ffmpeg", "-hide_banner", "-v", "error"] + choice.input_args
+           + ["-f", "lavfi", "-i", f"testsrc2=size={size}:rate={rate}:duration={seconds}"])
+    if choice.filter_suffix:
+        cmd += ["-vf", choice.filter_suffix.lstrip(",")]
+    cmd += choice.encode_args() + ["-f", "null", "-"]
+    start = time.perf_counter()
+    subprocess.run(cmd, check=True, capture_output=True)
+    return seconds * rate / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=int, default=10)
+    parser.add_argument("--size", default="1920x1080")
+    args = parser.parse_args()
+
+    try:
+        encoders, hwaccels = probe_capabilities()
+        selected = select_encoder()
+    except EncoderError as e:
+        print(e)
+        return
+
+    choices = [choice for choice in available_choices(encoders, hwaccels)
+               if choice.name != "libx264" and test_encode(choice)]
+    if "libx264" in encoders:
+        choices += [EncoderChoice(f"libx264 {preset}", "libx264",
+                                  output_args=["-preset", preset, "-crf", CPU_CRF, "-pix_fmt", "yuv420p"])
+                    for preset in CPU_PRESETS]
+
+    print(f"{args.seconds}s of {args.size} @ 30fps")
+    for choice in choices:
+        fps = encode_fps(choice, args.seconds, args.size)
+        marker = " <- selected" if choice.encode_args() == selected.encode_args() else ""
+        print(f"{choice.name:>18} ({choice.codec}): {fps:7.1f} fps{marker}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Per-row folder lookup cost: os.listdir + startswith (old step5) versus FolderIndex.
+
+Builds a synthetic tree of numbered lead folders and resolves every row both
+ways. The old approach is O(rows x folders), so it is timed on a sample of
+rows and extrapolated to the full tree.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_folder_index [--folders 20000] [--sample 200]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from folder_index import FolderIndex
+
+
+def old_lookup(main_folder, row_number):
+    folder_candidates = [
+        f for f in os.listdir(main_folder)
+        if os.path.isdir(os.path.join(main_folder, f)) and f.startswith(str(row_number))
+    ]
+    return os.path.join(main_folder, folder_candidates[0]) if folder_candidates else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--folders", type=int, default=20000)
+    parser.add_argument("--sample", type=int, default=200, help="Rows timed with the old lookup.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as main_folder:
+        for row_number in range(2, args.folders + 2):
+            os.mkdir(os.path.join(main_folder, f"{row_number} - Lead {row_number}"))
+
+        rows = list(range(2, args.folders + 2))
+        sample = random.Random(0).sample(rows, min(args.sample, len(rows)))
+
+        start = time.perf_counter()
+        wrong = sum(1 for row_number in sample
+                    if not old_lookup(main_folder, row_number).split(os.sep)[-1].startswith(f"{row_number} - "))
+        old_per_row = (time.perf_counter() - start) / len(sample)
+
+        start = time.perf_counter()
+        index = FolderIndex(main_folder)
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        for row_number in rows:
+            index.path(row_number)
+        lookups = time.perf_counter() - start
+
+    print(f"{args.folders} folders")
+    print(f"old listdir per row: {old_per_row * 1000:.2f} ms/row, "
+          f"~{old_per_row * len(rows):.1f}s for all rows, {wrong}/{len(sample)} sampled rows matched the wrong folder")
+    print(f"index: {build * 1000:.1f} ms to build, {lookups / len(rows) * 1e6:.2f} us/row lookup, "
+          f"{build + lookups:.3f}s for all rows")
+
+
+if __name__ == "__main__":
+    main()
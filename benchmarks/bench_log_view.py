@@ -0,0 +1,60 @@
+"""
+Memory of the status log over a long run: unbounded list versus LogBuffer.
+
+Simulates a run of --rows rows logging --lines messages each (the old GUIs
+kept every line in the widget) and reports Python heap usage after each
+quarter of the run, plus the time spent per message including the
+rotating log file (inflated by tracemalloc's own overhead).
+
+Usage (from the repository root):
+    python -m benchmarks.bench_log_view [--rows 10000] [--lines 20]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from log_view import LogBuffer
+
+
+def run(sink, rows, lines, drain=None):
+    samples = []
+    start = time.perf_counter()
+    for row in range(rows):
+        for i in range(lines):
+            sink(f"Row {row}: step {i} finished for https://www.linkedin.com/in/lead-{row}/ in 0.42s")
+        if drain:
+            drain()
+        if (row + 1) % (rows // 4 or 1) == 0:
+            samples.append(tracemalloc.get_traced_memory()[0] / 1e6)
+    return samples, (time.perf_counter() - start) / (rows * lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--lines", type=int, default=20)
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    kept = []
+    samples, per_message = run(kept.append, args.rows, args.lines)
+    print(f"unbounded: heap {' -> '.join(f'{mb:.0f}' for mb in samples)} MB, {per_message * 1e6:.1f} us/message")
+    del kept
+
+    with tempfile.TemporaryDirectory() as folder:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0] / 1e6
+        log = LogBuffer(log_file=os.path.join(folder, "bench.log"))
+        # Stand-in for the UI timer: drain the pending lines once per row.
+        samples, per_message = run(log.write, args.rows, args.lines, drain=log.take_pending)
+        print(f"LogBuffer: heap {' -> '.join(f'{mb - baseline:.1f}' for mb in samples)} MB, "
+              f"{per_message * 1e6:.1f} us/message (with rotating file)")
+        for handler in log.logger.handlers:
+            handler.close()
+
+
+if __name__ == "__main__":
+    main()
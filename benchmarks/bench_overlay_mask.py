@@ -0,0 +1,90 @@
+"""
+Step6 compositing cost: per-pixel geq circle versus the precomputed alphamerge mask.
+
+Synthetic screen-recording and avatar clips are generated with lavfi, both
+filter graphs are encoded with the same libx264 settings, and the new output
+is compared with the old one by SSIM (1.0 = identical).
+
+Usage (from the repository root):
+    python -m benchmarks.bench_overlay_mask [--seconds 10] [--size 1920x1080]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import tempfile
+import time
+
+from overlay_mask import circle_mask_path
+
+ENCODE_ARGS = ["-c:v", "libx264", "-preset", "ultrafast", "-crf", "16", "-pix_fmt", "yuv420p"]
+
+GEQ_GRAPH = (
+    "[1:v][0:v]scale2ref=w=iw*0.14:h=iw*0.14[ovrl][base];"
+    "[ovrl]format=rgba,"
+    "geq=a='if(gt(pow(X-(W/2),2)+pow(Y-(H/2),2),(W/2)*(W/2)),0,255)':"
+    "r='r(X,Y)':g='g(X,Y)':b='b(X,Y)'[circ];"
+    "[base][circ]overlay=main_w-overlay_w-543:270:shortest=1"
+)
+
+MASK_GRAPH = (
+    "[1:v]scale={size}:{size},format=yuva420p[ovrl];"
+    "[2:v]format=gray[mask];"
+    "[ovrl][mask]alphamerge[circ];"
+    "[0:v][circ]overlay=main_w-overlay_w-543:270:shortest=1"
+)
+
+
+def ffmpeg(*args):
+    subprocess.run(["ffmpeg", "-hide_banner", "-v", "error", "-y", *args], check=True)
+
+
+def encode(inputs, graph, output):
+    cmd = []
+    for path in inputs:
+        cmd += ["-i", path]
+    start = time.perf_counter()
+    ffmpeg(*cmd, "-filter_complex", graph, *ENCODE_ARGS, output)
+    return time.perf_counter() - start
+
+
+def ssim(distorted, reference):
+    result = subprocess.run(["ffmpeg", "-hide_banner", "-i", distorted, "-i", reference,
+                             "-lavfi", "ssim", "-f", "null", "-"], capture_output=True, text=True)
+    match = re.search(r"All:([\d.]+)", result.stderr)
+    return float(match.group(1)) if match else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=int, default=10)
+    parser.add_argument("--size", default="1920x1080")
+    args = parser.parse_args()
+    width = int(args.size.split("x")[0])
+
+    with tempfile.TemporaryDirectory() as folder:
+        screen = os.path.join(folder, "screen.mp4")
+        avatar = os.path.join(folder, "avatar.mp4")
+        ffmpeg("-f", "lavfi", "-i", f"testsrc2=size={args.size}:rate=30:duration={args.seconds}",
+               *ENCODE_ARGS, screen)
+        ffmpeg("-f", "lavfi", "-i", "mandelbrot=size=720x720:rate=30", "-t", str(args.seconds),
+               *ENCODE_ARGS, avatar)
+
+        geq_out = os.path.join(folder, "geq.mp4")
+        mask_out = os.path.join(folder, "mask.mp4")
+        geq_time = encode([screen, avatar], GEQ_GRAPH, geq_out)
+        size = int(width * 0.14)
+        mask = circle_mask_path(size, folder)
+        mask_time = encode([screen, avatar, mask], MASK_GRAPH.format(size=size), mask_out)
+
+        frames = args.seconds * 30
+        print(f"{args.seconds}s of {args.size}, {size}px overlay")
+        print(f"  geq:        {geq_time:.2f}s ({frames / geq_time:.1f} fps)")
+        print(f"  alphamerge: {mask_time:.2f}s ({frames / mask_time:.1f} fps), "
+              f"{geq_time / mask_time:.1f}x faster")
+        print(f"  SSIM alphamerge vs geq: {ssim(mask_out, geq_out)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Compares the in-page smooth scroll against the legacy 10ms scrollBy loop.
+
+Opens a tall synthetic page in Chrome and reports WebDriver command counts
+and frame-time variance for both approaches.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_scroll [--scrolls 20] [--headless]
+"""
+
+import argparse
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+import page_scroll
+
+TALL_PAGE = "data:text/html,<html><body style='margin:0'><div style='height:200000px;background:linear-gradient(white,gray)'></div></body></html>"
+
+
+def run(driver, scroll_fn, scrolls, distance):
+    stats = page_scroll.ScrollStats()
+    driver.get(TALL_PAGE)
+    for _ in range(scrolls):
+        scroll_fn(driver, distance, duration=1, stats=stats)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scrolls", type=int, default=20)
+    parser.add_argument("--distance", type=int, default=500)
+    parser.add_argument("--headless", action="store_true")
+    args = parser.parse_args()
+
+    chrome_options = Options()
+    if args.headless:
+        chrome_options.add_argument("--headless=new")
+    driver = webdriver.Chrome(
+        service=Service(ChromeDriverManager().install()),
+        options=chrome_options
+    )
+    try:
+        legacy = run(driver, page_scroll.legacy_smooth_scroll, args.scrolls, args.distance)
+        in_page = run(driver, page_scroll.smooth_scroll, args.scrolls, args.distance)
+    finally:
+        driver.quit()
+
+    print(legacy.format_summary("legacy scrollBy loop"))
+    print(in_page.format_summary("in-page requestAnimationFrame"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Measures HeyGen submissions per minute against the local mock server.
+
+Runs the same batch twice: one video at a time (submit, wait for the render,
+then the next, like the UI flow) and through the quota-aware scheduler.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_submissions [--videos 30] [--quota 5] [--render-seconds 2]
+"""
+
+import argparse
+import time
+
+from heygen_client import HeyGenClient
+from heygen_scheduler import SubmissionScheduler, SubmissionJob
+from mock_heygen import MockHeyGenServer
+
+
+def sequential(client, jobs, poll_interval):
+    start = time.monotonic()
+    for job in jobs:
+        video_id = client.generate_video(job.script, job.title)
+        while client.video_status(video_id).get("status") != "completed":
+            time.sleep(poll_interval)
+    elapsed = time.monotonic() - start
+    return len(jobs) / elapsed * 60
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--videos", type=int, default=30)
+    parser.add_argument("--quota", type=int, default=5, help="Concurrent renders allowed by the mock.")
+    parser.add_argument("--render-seconds", type=float, default=2.0)
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    args = parser.parse_args()
+
+    jobs = [SubmissionJob(i, f"Script for lead {i}", f"{i} - Lead") for i in range(args.videos)]
+
+    with MockHeyGenServer(render_seconds=args.render_seconds, max_concurrent_renders=args.quota) as mock:
+        client = HeyGenClient("test-key", "avatar", "voice", base_url=mock.url, max_workers=args.quota + 1)
+        try:
+            seq_rate = sequential(client, jobs, args.poll_interval)
+
+            batches = []
+            scheduler = SubmissionScheduler(
+                client, max_in_flight=args.quota, poll_interval=args.poll_interval,
+                rate_limit_backoff=args.poll_interval,
+            )
+            scheduler.run(jobs, batches.append)
+        finally:
+            client.close()
+
+    print(f"sequential: {seq_rate:.1f} submissions/min")
+    print(f"scheduler:  {scheduler.format_stats()}")
+
+
+if __name__ == "__main__":
+    main()
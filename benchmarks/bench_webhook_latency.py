@@ -0,0 +1,78 @@
+"""
+Render-complete to file-on-disk latency in step5: polling only versus webhooks.
+
+Each video's latency is measured from the moment the mock server marks its
+render finished to the mtime of the downloaded file. The webhook runs poll
+at the slow fallback interval, and can drop a share of the callbacks to show
+that polling still picks those videos up.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_webhook_latency [--videos 20] [--max-render 6] [--drop-rate 0.2]
+"""
+
+import argparse
+import os
+import random
+import socket
+import tempfile
+import time
+
+from benchmarks.bench_downloads import submit_videos
+from mock_heygen import MockHeyGenServer
+from video_downloader import DownloadEngine, DownloadJob
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run(args, webhook, drop_rate=0.0):
+    durations = random.Random(0)
+    port = free_port() if webhook else None
+    with MockHeyGenServer(render_seconds=lambda: durations.uniform(0.5, args.max_render),
+                          video_size=args.video_size) as mock, tempfile.TemporaryDirectory() as folder:
+        if webhook:
+            mock.webhook_url = f"http://127.0.0.1:{port}/heygen/webhook"
+            mock.webhook_drop_rate = drop_rate
+        engine = DownloadEngine("", base_url=mock.url, min_interval=args.poll_interval,
+                                max_interval=args.max_interval, webhook_port=port,
+                                fallback_interval=args.fallback_interval)
+        # Renders take at least 0.5s, so the receiver is up before the first callback.
+        ids = submit_videos(mock, args.videos)
+        jobs = [DownloadJob(i, video_id, os.path.join(folder, f"{i}.mp4")) for i, video_id in enumerate(ids)]
+        try:
+            stats = engine.run(jobs)
+        finally:
+            engine.close()
+        latencies = sorted(os.path.getmtime(job.dest_path) - mock.videos[job.video_id]["ready_at"]
+                           for job in jobs if os.path.exists(job.dest_path))
+        return latencies, stats, dict(mock.request_counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--videos", type=int, default=20)
+    parser.add_argument("--max-render", type=float, default=6.0)
+    parser.add_argument("--video-size", type=int, default=500_000)
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Minimum poll delay, polling only (s).")
+    parser.add_argument("--max-interval", type=float, default=8.0)
+    parser.add_argument("--fallback-interval", type=float, default=8.0, help="Minimum poll delay with webhooks (s).")
+    parser.add_argument("--drop-rate", type=float, default=0.2)
+    args = parser.parse_args()
+
+    for label, webhook, drop_rate in (("polling", False, 0.0),
+                                      ("webhook", True, 0.0),
+                                      (f"webhook {args.drop_rate:.0%} lost", True, args.drop_rate)):
+        start = time.monotonic()
+        latencies, stats, counts = run(args, webhook, drop_rate)
+        elapsed = time.monotonic() - start
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        print(f"{label:>18}: {len(latencies)}/{args.videos} files in {elapsed:.1f}s, "
+              f"latency mean {sum(latencies) / len(latencies):.2f}s p95 {p95:.2f}s, "
+              f"{counts.get('status', 0)} status requests, {stats['webhook_events']} webhook events")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Work-queue throughput with 1..N worker processes on one machine, plus a crash test.
+
+Each job sleeps for --latency seconds, standing in for a network-bound stage
+(a search, OCR or API call), so throughput should grow close to linearly with
+the number of worker processes. The crash test kills one of two workers
+mid-run and checks that its leased job is picked up again once the lease
+expires.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_work_queue [--jobs 200] [--latency 0.05] [--max-workers 8]
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from work_queue import Worker, WorkQueue
+
+
+def slow_handler(payload, checkpoint):
+    time.sleep(payload["latency"])
+    return {"pid": os.getpid()}
+
+
+def worker_process(db_path, lease_seconds):
+    Worker(WorkQueue(db_path, lease_seconds=lease_seconds), "bench", slow_handler, poll_interval=0.05).run()
+
+
+def fill(db_path, jobs, latency, lease_seconds=30):
+    queue = WorkQueue(db_path, lease_seconds=lease_seconds)
+    queue.enqueue_many("bench", [(i, {"latency": latency}) for i in range(jobs)])
+    return queue
+
+
+def throughput(folder, workers, jobs, latency):
+    db_path = os.path.join(folder, f"queue_{workers}.db")
+    queue = fill(db_path, jobs, latency)
+    start = time.monotonic()
+    processes = [multiprocessing.Process(target=worker_process, args=(db_path, 30)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    elapsed = time.monotonic() - start
+    return queue.counts("bench").get("done", 0) / elapsed
+
+
+def crash_test(folder, latency):
+    db_path = os.path.join(folder, "crash.db")
+    lease = 1.0
+    queue = fill(db_path, 40, latency, lease_seconds=lease)
+    processes = [multiprocessing.Process(target=worker_process, args=(db_path, lease)) for _ in range(2)]
+    for process in processes:
+        process.start()
+    time.sleep(latency * 5)
+    processes[0].kill()
+    for process in processes[1:]:
+        process.join()
+    counts = queue.counts("bench")
+    retried = queue._connection().execute(
+        "SELECT COUNT(*) FROM jobs WHERE stage = 'bench' AND attempts > 1").fetchone()[0]
+    return counts, retried
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated network time per job (s).")
+    parser.add_argument("--max-workers", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        base = None
+        workers = 1
+        while workers <= args.max_workers:
+            rate = throughput(folder, workers, args.jobs, args.latency)
+            base = base or rate
+            print(f"{workers:>2} workers: {rate:7.1f} jobs/s ({rate / base:.1f}x)")
+            workers *= 2
+
+        counts, retried = crash_test(folder, args.latency)
+        print(f"crash test: {counts}, {retried} job(s) re-leased after the killed worker's lease expired")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+Benchmark suite for the pipeline's CPU and I/O hot paths, saved as JSON for comparison.
+
+Every case runs on seeded synthetic fixtures, so two runs on the same machine
+measure the same work:
+    csv_load_<rows>, csv_rewrite_<rows>  reading and rewriting the lead CSV (steps 1-5)
+    downscale_<size>                     step3's downscale_image_to_threshold on a large screenshot
+    screenshot_<format>                  step2's crop + encode + write through ScreenshotWriter
+    ocr_parse                            step3's formatting of OCR.space responses
+    prompt_assembly                      step3's combined OCR text and ChatGPT prompt per lead
+    step6_render                         step6's filter graph and encoder on short generated clips
+
+Each case runs --repeat times and its median is kept. With --compare, cases
+whose median is more than --threshold slower than the baseline file are
+flagged and the exit status is 1. Cases whose dependencies (Pillow, step3's
+imports, ffmpeg) are missing are reported as skipped.
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks [--only csv,ocr] [--rows 1000,100000,1000000] [--repeat 3]
+                                        [--output results.json] [--compare baseline.json] [--threshold 0.15]
+"""
+
+import argparse
+import csv
+import importlib
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from fake_services import COMPANIES, FIRST_NAMES, LAST_NAMES, ROLES, WORDS, ocr_payload
+
+RESULTS_DIR = os.path.join("benchmarks", "results")
+SEED = 0
+
+
+class Skip(Exception):
+    """Raised by a case's setup when a dependency is missing."""
+
+
+def require(module):
+    try:
+        return importlib.import_module(module)
+    except Exception as e:
+        # step3 also fails here without its API client libraries.
+        raise Skip(f"{module}: {e}")
+
+
+def timed(func):
+    start = time.perf_counter()
+    extra = func() or {}
+    return time.perf_counter() - start, extra
+
+
+# ----------------------------------------------------------------------
+# Fixtures
+# ----------------------------------------------------------------------
+def lead_rows(count, rng):
+    """Header plus 'count' rows with all eight columns the pipeline fills in."""
+    scripts = [" ".join(rng.choice(WORDS) for _ in range(70)) for _ in range(200)]
+    yield ["First Name", "Last Name", "Company", "Title", "URL", "Profile Folder", "OpenAI Response", "Video ID"]
+    for row_number in range(2, count + 2):
+        first, last, company = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), rng.choice(COMPANIES)
+        title = f"{first} {last} - {rng.choice(ROLES)} - {company} | LinkedIn"
+        yield [first, last, company, title,
+               f"https://www.linkedin.com/in/{first.lower()}-{last.lower()}-{rng.getrandbits(32):08x}/",
+               f"{row_number} - {title}", rng.choice(scripts), f"{rng.getrandbits(128):032x}"]
+
+
+def screenshot_image(width, height, rng):
+    """A screenshot-like RGB image: flat background with blocks of noise standing in for text and photos."""
+    from PIL import Image
+    image = Image.new("RGB", (width, height), (243, 242, 239))
+    tile = Image.frombytes("RGB", (width // 8, height // 16), rng.randbytes(width // 8 * (height // 16) * 3))
+    tile = tile.resize((width // 2, height // 4), Image.NEAREST)
+    for y in range(0, height, height // 4 + height // 8):
+        image.paste(tile, (width // 8, y))
+    return image
+
+
+def ocr_response(rng, lines=60):
+    """An OCR.space /parse/image response body, as step3 receives it."""
+    return json.dumps(ocr_payload(rng, lines))
+
+
+# ----------------------------------------------------------------------
+# Cases: each returns [(name, run)], where run() returns (seconds, extra metrics)
+# ----------------------------------------------------------------------
+def csv_cases(folder, args):
+    cases = []
+    for count in args.rows:
+        path = os.path.join(folder, f"leads_{count}.csv")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(lead_rows(count, random.Random(SEED)))
+        size_mb = round(os.path.getsize(path) / 1e6, 1)
+
+        def load(path=path, size_mb=size_mb):
+            def run():
+                with open(path, mode="r", encoding="utf-8-sig") as f:
+                    rows = list(csv.reader(f))
+                return {"rows": len(rows) - 1, "file_mb": size_mb}
+            return timed(run)
+
+        def rewrite(path=path, size_mb=size_mb):
+            with open(path, mode="r", encoding="utf-8-sig") as f:
+                rows = list(csv.reader(f))
+            out_path = path + ".out"
+
+            def run():
+                with open(out_path, mode="w", newline="", encoding="utf-8") as f:
+                    csv.writer(f).writerows(rows)
+                return {"rows": len(rows) - 1, "file_mb": size_mb}
+            result = timed(run)
+            os.remove(out_path)
+            return result
+
+        cases += [(f"csv_load_{count}", load), (f"csv_rewrite_{count}", rewrite)]
+    return cases
+
+
+def downscale_cases(folder, args):
+    require("PIL")
+    step3 = require("step3_new")
+    cases = []
+    for width, height in ((2880, 1800), (3840, 2160)):
+        image = screenshot_image(width, height, random.Random(SEED))
+
+        def run(image=image):
+            buffer = step3.downscale_image_to_threshold(image, 1024 * 1024)
+            return {"output_kb": buffer.tell() // 1024}
+        cases.append((f"downscale_{width}x{height}", lambda run=run: timed(run)))
+    return cases
+
+
+def screenshot_cases(folder, args):
+    require("PIL")
+    from screenshot_writer import FORMATS, ScreenshotWriter, screenshot_crop_box
+    image = screenshot_image(2880, 1800, random.Random(SEED))
+    crop_box = screenshot_crop_box(*image.size)
+    frames = 10
+    cases = []
+    for image_format in FORMATS:
+        def run(image_format=image_format):
+            out_dir = tempfile.mkdtemp(dir=folder)
+            writer = ScreenshotWriter(image_format=image_format).start()
+            for i in range(frames):
+                writer.submit(image, os.path.join(out_dir, f"screenshot_{i}{writer.extension}"), crop_box)
+            writer.close()
+            written = sum(entry.stat().st_size for entry in os.scandir(out_dir))
+            shutil.rmtree(out_dir)
+            return {"frames": frames, "encode_ms_per_frame": round(writer.stats()["encode_seconds"] / frames * 1000, 1),
+                    "kb_per_frame": written // frames // 1024}
+        cases.append((f"screenshot_{image_format}", lambda run=run: timed(run)))
+    return cases
+
+
+def ocr_cases(folder, args):
+    step3 = require("step3_new")
+    from prompt_budget import count_tokens, join_sections, ocr_text, trim_sections
+    rng = random.Random(SEED)
+    leads = [[ocr_response(rng) for _ in range(12)] for _ in range(100)]
+    responses = [response for lead in leads for response in lead]
+
+    def parse():
+        for response in responses:
+            ocr_text(response)
+        return {"responses": len(responses)}
+
+    def assemble():
+        chars = tokens = 0
+        for lead in leads:
+            # Same assembly as build_profile_script, up to the token count.
+            prompt = step3.build_prompt(join_sections(trim_sections([ocr_text(response) for response in lead])))
+            chars += len(prompt)
+            tokens += count_tokens(prompt, step3.OPENAI_MODEL)
+        return {"leads": len(leads), "prompt_chars_per_lead": chars // len(leads),
+                "prompt_tokens_per_lead": tokens // len(leads)}
+
+    return [("ocr_parse", lambda: timed(parse)), ("prompt_assembly", lambda: timed(assemble))]
+
+
+def render_cases(folder, args):
+    if not shutil.which("ffmpeg") or not shutil.which("ffprobe"):
+        raise Skip("ffmpeg/ffprobe not on PATH")
+    require("PIL")
+    from ffmpeg_encoders import select_encoder
+    from media_probe import probe
+    from overlay_graph import build_filter_graph, render_command
+    from overlay_mask import circle_mask_path
+    from render_scheduler import RenderJob
+
+    seconds, rate = 5, 30
+    screen_path = os.path.join(folder, "screen.mp4")
+    heygen_path = os.path.join(folder, "heygen.mp4")
+    encode = ["-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", "-c:a", "aac"]
+    for path, video in ((screen_path, f"testsrc2=size=1920x1080:rate={rate}"),
+                        (heygen_path, f"mandelbrot=size=720x720:rate={rate}")):
+        subprocess.run(["ffmpeg", "-hide_banner", "-v", "error", "-y", "-f", "lavfi", "-i", video,
+                        "-f", "lavfi", "-i", "sine=frequency=440", "-t", str(seconds), *encode, path], check=True)
+    encoder = select_encoder()
+    job = RenderJob("2 - Bench Lead", probe(screen_path), probe(heygen_path), os.path.join(folder, "out.mp4"))
+    filter_complex, overlay_size = build_filter_graph(job, encoder)
+    mask_path = circle_mask_path(overlay_size, folder)
+    command = render_command(job, encoder, filter_complex, mask_path, os.cpu_count() or 1)
+
+    def run():
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        return {"encoder": encoder.name, "frames": seconds * rate}
+
+    def case():
+        elapsed, extra = timed(run)
+        extra["fps"] = round(extra["frames"] / elapsed, 1)
+        return elapsed, extra
+
+    return [("step6_render", case)]
+
+
+GROUPS = [
+    ("csv", csv_cases),
+    ("downscale", downscale_cases),
+    ("screenshot", screenshot_cases),
+    ("ocr", ocr_cases),
+    ("render", render_cases),
+]
+
+
+# ----------------------------------------------------------------------
+# Running, saving and comparing
+# ----------------------------------------------------------------------
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(args):
+    results = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": git_commit(),
+               "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                           "processor": platform.processor() or platform.machine(), "cpus": os.cpu_count()},
+               "repeat": args.repeat, "cases": {}, "skipped": {}}
+    with tempfile.TemporaryDirectory() as folder:
+        for group, make_cases in GROUPS:
+            if args.only and not any(name in group for name in args.only):
+                continue
+            try:
+                cases = make_cases(folder, args)
+            except Skip as e:
+                results["skipped"][group] = str(e)
+                print(f"{group:<22} skipped ({e})")
+                continue
+            for name, case in cases:
+                runs, extra = [], {}
+                for _ in range(args.repeat):
+                    elapsed, extra = case()
+                    runs.append(round(elapsed, 6))
+                results["cases"][name] = {"median": statistics.median(runs), "min": min(runs), "runs": runs, **extra}
+                details = ", ".join(f"{key} {value}" for key, value in extra.items())
+                print(f"{name:<22} {statistics.median(runs) * 1000:>10.1f} ms   {details}")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Prints the change per case against 'baseline'; returns the names of regressed cases."""
+    regressions = []
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} ({baseline.get('created')}):")
+    for name, case in results["cases"].items():
+        before = baseline.get("cases", {}).get(name)
+        if not before:
+            continue
+        change = case["median"] / before["median"] - 1 if before["median"] else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{name:<22} {before['median'] * 1000:>10.1f} -> {case['median'] * 1000:>10.1f} ms {change:>+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--only", type=lambda s: [n.strip() for n in s.split(",") if n.strip()],
+                        help="Comma-separated case groups: " + ", ".join(group for group, _ in GROUPS))
+    parser.add_argument("--rows", type=lambda s: [int(n) for n in s.split(",")], default=[1000, 100000, 1000000],
+                        help="CSV sizes in rows.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help=f"JSON results file (default {RESULTS_DIR}/<time>.json).")
+    parser.add_argument("--compare", help="Earlier results file to compare with.")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Slowdown flagged as a regression.")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = run_suite(args)
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved {output}")
+
+    if baseline is not None and compare(results, baseline, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
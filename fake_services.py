@@ -0,0 +1,332 @@
+"""
+Local stand-ins for every external service the pipeline calls, for load tests.
+
+One HTTP server answers the serper.dev, OCR.space, OpenAI and LinkedIn
+requests; HeyGen is served by mock_heygen on a second port. Each service has
+a log-normal response latency, a share of HTTP 500 errors and of HTTP 429
+rate limits, and a payload size, all configurable:
+
+    serper    POST /search                -> "organic" results linking to the fake LinkedIn pages
+    openai    POST /v1/chat/completions   -> a chat completion of 'words' words
+    ocr       POST /parse/image           -> an OCR.space response of 'lines' lines
+    linkedin  GET  /in/<slug>/            -> an HTML page of 'page_kb' KB
+    heygen    (mock_heygen)               -> renders of 'render_seconds', videos of 'video_size' bytes
+
+The steps are pointed at the fakes through their base-URL environment
+variables (printed on start):
+
+    python fake_services.py --port 8900 --set ocr.latency=0.5 --set openai.rate_limit_rate=0.1
+    SERPER_BASE_URL=... OCR_API_URL=... OPENAI_BASE_URL=... HEYGEN_API_BASE=... python step3_new.py
+
+load_driver.py runs synthetic leads through them and reports per-stage throughput.
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from mock_heygen import MockHeyGenServer
+
+FIRST_NAMES = ["Jane", "John", "María", "Wei", "Olu", "Priya", "Lukas", "Chloé", "Kenji", "Ana"]
+LAST_NAMES = ["Doe", "Smith", "García", "Chen", "Adeyemi", "Patel", "Müller", "Martin", "Sato", "Silva"]
+COMPANIES = ["Acme Inc.", "Globex LLC", "Initech", "Umbrella Corp", "Stark Industries", "Wayne Enterprises"]
+ROLES = ["Software Engineer", "Head of Sales", "Founder & CEO", "Product Manager", "Data Scientist"]
+WORDS = ("experience led team growth product customers launched revenue strategy engineering "
+         "university boston startup platform scaled partnerships market global hiring cloud").split()
+
+# Per-service defaults: latency (median s), jitter (log-normal sigma), error_rate,
+# rate_limit_rate, plus the service's payload settings.
+DEFAULT_CONFIG = {
+    "serper": {"latency": 0.4, "results": 10},
+    "linkedin": {"latency": 0.8, "page_kb": 400},
+    "ocr": {"latency": 1.5, "lines": 60},
+    "openai": {"latency": 4.0, "words": 90},
+    "heygen": {"latency": 0.2, "render_seconds": 30.0, "video_size": 5 * 1024 * 1024,
+               "max_concurrent_renders": None},
+}
+FAULT_KEYS = ("latency", "jitter", "error_rate", "rate_limit_rate")
+INT_SETTINGS = ("results", "page_kb", "lines", "words", "video_size", "max_concurrent_renders")
+
+
+class Faults:
+    """
+    :param latency: Median response delay (s).
+    :param jitter: Sigma of the log-normal delay (0 = always 'latency').
+    :param error_rate: Share of requests answered with HTTP 500.
+    :param rate_limit_rate: Share of requests answered with HTTP 429.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.5, error_rate=0.0, rate_limit_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self):
+        """Sleeps for one sampled latency; returns 429, 500 or None (answer normally)."""
+        with self._lock:
+            delay = self.latency * self.rng.lognormvariate(0, self.jitter) if self.latency else 0.0
+            roll = self.rng.random()
+        if delay:
+            time.sleep(delay)
+        if roll < self.rate_limit_rate:
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 500
+        return None
+
+
+def ocr_payload(rng, lines=60):
+    """An OCR.space /parse/image response as step3 requests it (no overlay)."""
+    text = "\r\n".join(" ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 12))) for _ in range(lines))
+    return {
+        "ParsedResults": [{
+            "TextOverlay": {"Lines": [], "HasOverlay": False, "Message": "Text overlay is not provided as it is not requested"},
+            "TextOrientation": "0", "FileParseExitCode": 1, "ParsedText": text,
+            "ErrorMessage": "", "ErrorDetails": "",
+        }],
+        "OCRExitCode": 1, "IsErroredOnProcessing": False, "ProcessingTimeInMilliseconds": "1453",
+        "SearchablePDFURL": "Searchable PDF not generated as it was not requested.",
+    }
+
+
+def merge_config(overrides=None):
+    """DEFAULT_CONFIG with {service: {key: value}} overrides applied."""
+    config = {service: dict(values) for service, values in DEFAULT_CONFIG.items()}
+    for service, values in (overrides or {}).items():
+        if service not in config:
+            raise ValueError(f"Unknown service: {service}")
+        config[service].update(values)
+    return config
+
+
+class FakeServices:
+    """
+    :param config: {service: {setting: value}} overrides of DEFAULT_CONFIG.
+    :param seed: Seed for latencies, faults and payloads, so runs are repeatable.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, heygen_port=0, config=None, seed=0):
+        self.config = merge_config(config)
+        self.faults = {
+            service: Faults(seed=seed + i, **{k: v for k, v in values.items() if k in FAULT_KEYS})
+            for i, (service, values) in enumerate(self.config.items())
+        }
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        # HeyGen requests are counted by the mock itself (self.heygen.request_counts).
+        self.stats = {service: {"requests": 0, "429": 0, "500": 0} for service in self.config if service != "heygen"}
+
+        handler = type("FakeServicesHandler", (_Handler,), {"fake": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+        heygen = self.config["heygen"]
+        render_rng = random.Random(seed)
+        render_seconds = heygen["render_seconds"]
+        self.heygen = MockHeyGenServer(
+            host, heygen_port,
+            render_seconds=lambda: render_seconds * render_rng.lognormvariate(0, 0.3),
+            video_size=heygen["video_size"],
+            max_concurrent_renders=heygen["max_concurrent_renders"],
+            faults=self.faults["heygen"],
+        )
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self):
+        """Environment variables pointing the steps at these fakes."""
+        return {
+            "SERPER_BASE_URL": self.url,
+            "OCR_API_URL": self.url + "/parse/image",
+            "OPENAI_BASE_URL": self.url + "/v1",
+            "HEYGEN_API_BASE": self.heygen.url,
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        self.heygen.start()
+        return self
+
+    def stop(self):
+        self.heygen.stop()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def count(self, service, key="requests"):
+        with self._lock:
+            self.stats[service][key] += 1
+
+    def random(self):
+        with self._lock:
+            return random.Random(self.rng.getrandbits(64))
+
+    # ------------------------------------------------------------------
+    # Payloads
+    # ------------------------------------------------------------------
+    def serper_results(self, query):
+        rng = self.random()
+        words = [w for w in query.split() if not w.startswith("site:")]
+        name = " ".join(words[:2]) or "Jane Doe"
+        company = " ".join(words[2:]) or rng.choice(COMPANIES)
+        slug = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+        organic = []
+        for position in range(1, self.config["serper"]["results"] + 1):
+            suffix = "" if position == 1 else f"-{rng.getrandbits(24):06x}"
+            organic.append({
+                "title": f"{name} - {rng.choice(ROLES)} - {company if position == 1 else rng.choice(COMPANIES)} | LinkedIn",
+                "link": f"{self.url}/in/{slug}{suffix}/",
+                "snippet": " ".join(rng.choice(WORDS) for _ in range(25)),
+                "position": position,
+            })
+        return {"searchParameters": {"q": query, "type": "search"}, "organic": organic}
+
+    def linkedin_page(self, slug):
+        rng = self.random()
+        paragraph = "<p>" + " ".join(rng.choice(WORDS) for _ in range(150)) + "</p>\n"
+        body = paragraph * max(1, self.config["linkedin"]["page_kb"] * 1024 // len(paragraph))
+        return f"<html><head><title>{slug} | LinkedIn</title></head><body>\n{body}</body></html>"
+
+    def chat_completion(self, request):
+        rng = self.random()
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in request.get("messages", []))
+        content = " ".join(rng.choice(WORDS) for _ in range(self.config["openai"]["words"]))
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}", "object": "chat.completion", "created": int(time.time()),
+            "model": request.get("model", "gpt-3.5-turbo"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_chars // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (prompt_chars + len(content)) // 4},
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    fake = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json"):
+        data = (json.dumps(body) if content_type == "application/json" else body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        if status == 429:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _fault(self, service):
+        """Applies the service's latency; answers and returns True for an injected 429 or 500."""
+        self.fake.count(service)
+        status = self.fake.faults[service].draw()
+        if status is None:
+            return False
+        self.fake.count(service, str(status))
+        message = "Too many requests" if status == 429 else "Internal server error"
+        self._send(status, {"error": {"message": message, "code": status}})
+        return True
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if path == "/search":
+            if self._fault("serper"):
+                return
+            try:
+                query = json.loads(raw or b"{}").get("q", "")
+            except ValueError:
+                query = ""
+            self._send(200, self.fake.serper_results(query))
+        elif path == "/parse/image":
+            if self._fault("ocr"):
+                return
+            self._send(200, ocr_payload(self.fake.random(), self.fake.config["ocr"]["lines"]))
+        elif path == "/v1/chat/completions":
+            if self._fault("openai"):
+                return
+            try:
+                request = json.loads(raw or b"{}")
+            except ValueError:
+                request = {}
+            self._send(200, self.fake.chat_completion(request))
+        else:
+            self._send(404, {"error": "Not found"})
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        match = re.fullmatch(r"/in/([^/]+)/?", path)
+        if not match:
+            self._send(404, {"error": "Not found"})
+            return
+        if self._fault("linkedin"):
+            return
+        self._send(200, self.fake.linkedin_page(match.group(1)), content_type="text/html")
+
+
+def parse_settings(settings):
+    """["ocr.latency=0.5", ...] -> {"ocr": {"latency": 0.5}}."""
+    overrides = {}
+    for setting in settings or []:
+        key, _, value = setting.partition("=")
+        service, _, name = key.partition(".")
+        if not name or not value:
+            raise ValueError(f"Expected service.setting=value, got {setting!r}")
+        if value == "none":
+            overrides.setdefault(service, {})[name] = None
+        else:
+            overrides.setdefault(service, {})[name] = int(value) if name in INT_SETTINGS else float(value)
+    return overrides
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-ins for the pipeline's external services.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--heygen-port", type=int, default=8901)
+    parser.add_argument("--set", action="append", metavar="SERVICE.SETTING=VALUE",
+                        help="e.g. ocr.latency=0.5, openai.rate_limit_rate=0.1, heygen.render_seconds=10")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        config = parse_settings(args.set)
+        services = FakeServices(args.host, args.port, args.heygen_port, config, args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+    services.start()
+    print("Fake services running; point the steps at them with:")
+    for name, value in services.env().items():
+        print(f"  {name}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        services.stop()
+
+
+if __name__ == "__main__":
+    main()
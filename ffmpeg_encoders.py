@@ -0,0 +1,144 @@
+"""
+H.264 encoder selection for step6.
+
+`ffmpeg -encoders` and `ffmpeg -hwaccels` are read once, the hardware paths
+the build supports are tried in order of speed with a short test encode (a
+listed encoder can still lack the GPU or driver it needs), and the first one
+that works is used. libx264 with a fast preset is the CPU-only fallback, so
+the same script runs on macOS (VideoToolbox), NVIDIA (NVENC), Intel (Quick
+Sync) and other Linux VAAPI boxes.
+"""
+
+import os
+import subprocess
+import threading
+
+# Preset and quality for the libx264 fallback. "veryfast" is most of
+# "ultrafast"'s speed at a much smaller file for screen recordings.
+CPU_PRESET = "veryfast"
+CPU_CRF = "20"
+# Render node used for VAAPI encoding.
+VAAPI_DEVICE = "/dev/dri/renderD128"
+
+
+class EncoderError(Exception):
+    pass
+
+
+class EncoderChoice:
+    """
+    One way of encoding the step6 output.
+
+    :param name: Short name ("nvenc", "libx264", ...), also accepted by select_encoder.
+    :param codec: Value for -c:v.
+    :param decode_args: Hardware decoding options placed before the first -i.
+    :param input_args: Other options placed before the first -i (e.g. the device).
+    :param output_args: Encoder options placed after -c:v.
+    :param filter_suffix: Appended to the filter graph's output (e.g. upload to the GPU).
+    """
+
+    def __init__(self, name, codec, decode_args=(), input_args=(), output_args=(),
+                 filter_suffix=""):
+        self.name = name
+        self.codec = codec
+        self.decode_args = list(decode_args)
+        self.input_args = list(input_args)
+        self.output_args = list(output_args)
+        self.filter_suffix = filter_suffix
+
+    def encode_args(self):
+        return ["-c:v", self.codec] + self.output_args
+
+    def __repr__(self):
+        return f"EncoderChoice({self.name!r}, {self.codec!r})"
+
+
+# Fastest first.
+ENCODER_CHOICES = [
+    EncoderChoice("videotoolbox", "h264_videotoolbox",
+                  decode_args=["-hwaccel", "videotoolbox"], output_args=["-b:v", "8M"]),
+    EncoderChoice("nvenc", "h264_nvenc",
+                  output_args=["-preset", "p4", "-rc", "vbr", "-cq", "23"]),
+    EncoderChoice("qsv", "h264_qsv",
+                  output_args=["-preset", "veryfast", "-global_quality", "23"]),
+    EncoderChoice("vaapi", "h264_vaapi",
+                  input_args=["-vaapi_device", VAAPI_DEVICE], output_args=["-qp", "23"],
+                  filter_suffix=",format=nv12,hwupload"),
+    EncoderChoice("libx264", "libx264",
+                  output_args=["-preset", CPU_PRESET, "-crf", CPU_CRF, "-pix_fmt", "yuv420p"]),
+]
+
+
+def _list(ffmpeg, option):
+    try:
+        output = subprocess.run([ffmpeg, "-hide_banner", option], capture_output=True,
+                                text=True, timeout=30).stdout
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise EncoderError(f"Could not run {ffmpeg}: {e}")
+    return output.splitlines()
+
+
+def probe_capabilities(ffmpeg="ffmpeg"):
+    """Returns (encoder names, hwaccel names) supported by this ffmpeg build."""
+    encoders = set()
+    for line in _list(ffmpeg, "-encoders"):
+        # " V....D h264_nvenc  NVIDIA NVENC H.264 encoder"
+        parts = line.split()
+        if len(parts) >= 2 and len(parts[0]) == 6 and parts[0][0] in "VAS":
+            encoders.add(parts[1])
+    hwaccels = {line.strip() for line in _list(ffmpeg, "-hwaccels")
+                if line.strip() and not line.startswith("Hardware")}
+    return encoders, hwaccels
+
+
+def available_choices(encoders, hwaccels):
+    """ENCODER_CHOICES entries the build lists, fastest first."""
+    choices = []
+    for choice in ENCODER_CHOICES:
+        if choice.codec not in encoders:
+            continue
+        if choice.name == "vaapi" and ("vaapi" not in hwaccels or not os.path.exists(VAAPI_DEVICE)):
+            continue
+        choices.append(choice)
+    return choices
+
+
+def test_encode(choice, ffmpeg="ffmpeg"):
+    """True if 'choice' can encode a few frames of a synthetic clip on this machine."""
+    cmd = [ffmpeg, "-hide_banner", "-v", "error"] + choice.input_args
+    cmd += ["-f", "lavfi", "-i", "testsrc2=size=640x360:rate=30", "-frames:v", "10"]
+    if choice.filter_suffix:
+        cmd += ["-vf", choice.filter_suffix.lstrip(",")]
+    cmd += choice.encode_args() + ["-f", "null", "-"]
+    try:
+        return subprocess.run(cmd, capture_output=True, timeout=60).returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+
+_selected = {}
+_select_lock = threading.Lock()
+
+
+def select_encoder(ffmpeg="ffmpeg", preferred=None):
+    """
+    Returns the fastest EncoderChoice that works here. 'preferred' (a choice
+    name) is used when it is available and passes the test encode. The result
+    is cached, so the probe runs once per process.
+    """
+    with _select_lock:
+        if (ffmpeg, preferred) not in _selected:
+            _selected[(ffmpeg, preferred)] = _select(ffmpeg, preferred)
+        return _selected[(ffmpeg, preferred)]
+
+
+def _select(ffmpeg, preferred):
+    encoders, hwaccels = probe_capabilities(ffmpeg)
+    choices = available_choices(encoders, hwaccels)
+    if preferred:
+        choices.sort(key=lambda choice: choice.name != preferred)
+    for choice in choices:
+        if test_encode(choice, ffmpeg):
+            return choice
+    raise EncoderError("No working H.264 encoder found (tried: "
+                       + ", ".join(choice.codec for choice in choices) + ").")
@@ -0,0 +1,83 @@
+"""
+ffmpeg "-progress pipe:1" parsing and throttled progress display for step6.
+
+ffmpeg writes a block of key=value lines per update, ending with
+"progress=continue" (or "progress=end"). iter_progress() reads those blocks
+with a plain blocking iterator, so a finished stream ends the loop instead
+of spinning on empty reads.
+
+Render threads only store the latest progress of their job on a
+ProgressBoard. A single Tk after() loop drains the board at a fixed rate
+and updates the widgets of the jobs that changed, so the UI cost stays
+bounded however many renders run and however often ffmpeg reports.
+"""
+
+import threading
+
+# Widget refreshes per second, for all jobs together.
+UI_UPDATE_HZ = 10
+
+
+def iter_progress(lines, other=None):
+    """
+    Yields one dict per progress block read from 'lines' (e.g. process.stdout).
+    Lines that are not key=value (log output) are appended to 'other' if given.
+    """
+    block = {}
+    for line in lines:
+        line = line.strip()
+        key, sep, value = line.partition("=")
+        if not sep:
+            if line and other is not None:
+                other.append(line)
+            continue
+        block[key] = value
+        if key == "progress":
+            yield block
+            block = {}
+
+
+def out_time_seconds(block):
+    """Output timestamp of a progress block in seconds, or None."""
+    # out_time_ms is in microseconds as well (a long-standing ffmpeg quirk).
+    for key in ("out_time_us", "out_time_ms"):
+        value = block.get(key)
+        if value and value != "N/A":
+            try:
+                return max(0, int(value)) / 1_000_000.0
+            except ValueError:
+                pass
+    return None
+
+
+class ProgressBoard:
+    """Latest progress per job, written by render threads and drained by the UI."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def update(self, name, progress, remaining):
+        # Later updates replace earlier ones, so a slow UI never falls behind.
+        with self._lock:
+            self._pending[name] = (progress, remaining)
+
+    def drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+
+def start_ui_pump(root, board, apply, hz=UI_UPDATE_HZ):
+    """
+    Calls apply(name, progress, remaining) for every job updated since the
+    last tick, from the Tk thread, 'hz' times a second.
+    """
+    interval_ms = max(1, int(1000 / hz))
+
+    def tick():
+        for name, (progress, remaining) in board.drain().items():
+            apply(name, progress, remaining)
+        root.after(interval_ms, tick)
+
+    root.after(interval_ms, tick)
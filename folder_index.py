@@ -0,0 +1,66 @@
+"""
+One-time index of the per-lead folders ("12 - Jane Doe") used by steps 3, 5 and 6.
+
+The folder tree is scanned once and each folder's numeric prefix (the CSV
+row number) is parsed, so looking up a row is a dict lookup instead of a
+directory listing per row. Matching is on the parsed number, so row 1 no
+longer picks up "10 - ..." or "11 - ...".
+"""
+
+import os
+import re
+
+_ROW_PREFIX_RE = re.compile(r"^\s*(\d+)\s*-")
+
+
+def parse_row_number(name):
+    """Returns the leading row number of a folder name like "12 - Jane Doe", or None."""
+    match = _ROW_PREFIX_RE.match(name)
+    return int(match.group(1)) if match else None
+
+
+class FolderIndex:
+    def __init__(self, root):
+        self.root = root
+        self.by_row = {}       # row number -> (folder name, folder path)
+        self.duplicates = []   # folder names whose row number was already taken
+        self.unparsed = []     # folder names without a numeric prefix
+
+        entries = sorted((e.name, e.path) for e in os.scandir(root) if e.is_dir())
+        for name, path in entries:
+            row_number = parse_row_number(name)
+            if row_number is None:
+                self.unparsed.append(name)
+            elif row_number in self.by_row:
+                self.duplicates.append(name)
+            else:
+                self.by_row[row_number] = (name, path)
+
+    def __len__(self):
+        return len(self.by_row)
+
+    def path(self, row_number):
+        """Folder path for 'row_number', or None."""
+        entry = self.by_row.get(row_number)
+        return entry[1] if entry else None
+
+    def items(self):
+        """(row number, folder name, folder path) tuples in row order."""
+        return [(row_number, name, path) for row_number, (name, path) in sorted(self.by_row.items())]
+
+
+_cache = {}
+
+
+def get_index(root):
+    """
+    Returns a FolderIndex for 'root', reusing the previous scan while the
+    directory's modification time is unchanged.
+    """
+    root = os.path.abspath(root)
+    mtime = os.stat(root).st_mtime_ns
+    cached = _cache.get(root)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, FolderIndex(root))
+        _cache[root] = cached
+    return cached[1]
@@ -0,0 +1,102 @@
+"""
+HeyGen HTTP API client used by step4 (video generation) and step5 (status).
+
+Submits scripts straight to the video generation endpoint instead of driving
+the HeyGen web UI, so many rows can be submitted concurrently without a
+dedicated desktop. The base URL can be pointed at mock_heygen for local runs.
+"""
+
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+
+HEYGEN_API_BASE = os.environ.get("HEYGEN_API_BASE", "https://api.heygen.com")
+GENERATE_ENDPOINT = "/v2/video/generate"
+STATUS_ENDPOINT = "/v1/video_status.get"
+
+
+class HeyGenError(Exception):
+    """Raised when the HeyGen API rejects a request or returns no video id."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def rate_limited(self):
+        """True for quota / concurrency rejections that are worth retrying later."""
+        return self.status_code == 429
+
+
+class HeyGenClient:
+    def __init__(self, api_key, avatar_id, voice_id, base_url=HEYGEN_API_BASE,
+                 timeout=30, max_workers=8, dimension=(1280, 720)):
+        self.avatar_id = avatar_id
+        self.voice_id = voice_id
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.dimension = dimension
+
+        # One keep-alive session shared by all worker threads.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "x-api-key": api_key,
+            "Content-Type": "application/json",
+        })
+
+    def generate_video(self, script, title=""):
+        """
+        Submits a single avatar video with 'script' as the spoken text.
+        Returns the new video id.
+        """
+        if not script.strip():
+            raise HeyGenError("Script is empty.")
+        payload = {
+            "title": title,
+            "video_inputs": [{
+                "character": {
+                    "type": "avatar",
+                    "avatar_id": self.avatar_id,
+                    "avatar_style": "normal",
+                },
+                "voice": {
+                    "type": "text",
+                    "input_text": script,
+                    "voice_id": self.voice_id,
+                },
+            }],
+            "dimension": {"width": self.dimension[0], "height": self.dimension[1]},
+        }
+        response = self.session.post(self.base_url + GENERATE_ENDPOINT, json=payload, timeout=self.timeout)
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        if response.status_code != 200 or body.get("error"):
+            raise HeyGenError(
+                f"HTTP {response.status_code}: {body.get('error') or response.text[:200]}",
+                status_code=response.status_code,
+            )
+        video_id = (body.get("data") or {}).get("video_id")
+        if not video_id:
+            raise HeyGenError(f"No video_id in response: {response.text[:200]}")
+        return video_id
+
+    def video_status(self, video_id):
+        """
+        Returns the 'data' block of the status endpoint, e.g.
+        {"status": "completed", "video_url": "...", "thumbnail_url": "..."}.
+        """
+        response = self.session.get(
+            self.base_url + STATUS_ENDPOINT, params={"video_id": video_id}, timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json().get("data", {})
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,168 @@
+"""
+Clipboard-free data hand-off for step4's HeyGen UI automation.
+
+Text goes into the page through the DOM of the focused element via Selenium,
+and the created video id is read from the response to the video generate
+(submit) POST request in Chrome's network log instead of the system clipboard. Ids that
+only appear elsewhere (other requests, the page URL) also belong to
+thumbnails and older videos, so one of those is used only if it is the single
+id not stored for another row that the API reports as created after the
+submit. A stale or ambiguous value is reported rather than silently written
+to the CSV.
+"""
+
+import json
+import re
+from urllib.parse import urlparse
+
+# HeyGen video ids are 32 lowercase hex characters.
+VIDEO_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+_VIDEO_ID_IN_TEXT_RE = re.compile(r'"video_id"\s*:\s*"([0-9a-f]{32})"')
+_VIDEO_ID_IN_URL_RE = re.compile(r"(?:/videos?/|[?&]video_id=|[?&]vid=)([0-9a-f]{32})")
+# Path of the request that creates a video (API: /v2/video/generate; the web app posts to .../video/generate
+# or .../video/submit). Other POSTs (telemetry, lists, drafts) can carry video ids too.
+_SUBMIT_URL_RE = re.compile(r"/videos?/(?:generate|submit)(?:[/?#]|$)")
+# Allowed difference between this machine's clock and HeyGen's created_at (s).
+CLOCK_SKEW_SECONDS = 30
+
+# Replaces the contents of the focused field and returns what it now holds.
+# contenteditable editors get execCommand('insertText') so their own input
+# handlers run; inputs/textareas use the native value setter plus an input event.
+INSERT_TEXT_JS = """
+var text = arguments[0];
+var el = document.activeElement;
+if (!el || el === document.body) {
+    return null;
+}
+if (el.isContentEditable) {
+    el.focus();
+    document.execCommand('selectAll', false, null);
+    document.execCommand('insertText', false, text);
+    return el.innerText;
+}
+var proto = el.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+var setter = Object.getOwnPropertyDescriptor(proto, 'value').set;
+setter.call(el, text);
+el.dispatchEvent(new Event('input', {bubbles: true}));
+el.dispatchEvent(new Event('change', {bubbles: true}));
+return el.value;
+"""
+
+
+class HandoffError(Exception):
+    """Raised when text could not be injected or no valid video id was found."""
+
+
+def _normalize(text):
+    return " ".join((text or "").split())
+
+
+def insert_text(driver, text):
+    """
+    Puts 'text' into the element that currently has focus in the page and
+    verifies it landed there.
+    """
+    result = driver.execute_script(INSERT_TEXT_JS, text)
+    if result is None:
+        raise HandoffError("No focused text field to insert into.")
+    if _normalize(result) != _normalize(text):
+        raise HandoffError("Focused field does not contain the inserted text.")
+
+
+def clear_network_log(driver):
+    """Drops buffered performance-log entries so only later requests are inspected."""
+    try:
+        driver.get_log("performance")
+    except Exception:
+        pass
+
+
+def _ids_from_network_log(driver):
+    """
+    Returns (submitted, mentioned): ids in the responses to generate/submit POST
+    requests, and ids in any other request URL or video response.
+    """
+    submitted, mentioned = [], []
+    submits = set()
+    for entry in driver.get_log("performance"):
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        method = message.get("method")
+        params = message.get("params", {})
+        if method == "Network.requestWillBeSent":
+            request = params.get("request", {})
+            if request.get("method") == "POST" and _SUBMIT_URL_RE.search(urlparse(request.get("url", "")).path):
+                submits.add(params.get("requestId"))
+            match = _VIDEO_ID_IN_URL_RE.search(request.get("url", ""))
+            if match:
+                mentioned.append(match.group(1))
+        elif method == "Network.responseReceived":
+            is_submit = params.get("requestId") in submits
+            if not is_submit and "video" not in params.get("response", {}).get("url", ""):
+                continue
+            try:
+                body = driver.execute_cdp_cmd(
+                    "Network.getResponseBody", {"requestId": params["requestId"]}
+                ).get("body", "")
+            except Exception:
+                continue
+            (submitted if is_submit else mentioned).extend(_VIDEO_ID_IN_TEXT_RE.findall(body))
+    return submitted, mentioned
+
+
+def _ids_from_page(driver):
+    # Only the current location: links on the page point at older videos too.
+    match = _VIDEO_ID_IN_URL_RE.search(driver.current_url or "")
+    return [match.group(1)] if match else []
+
+
+def read_video_id(driver, known_ids=(), submitted_at=None, created_at=None):
+    """
+    Returns the id of the video created since the last clear_network_log call.
+
+    An id from the generate/submit request's response is used directly (if
+    several different new ids came back, nothing is used). Failing that,
+    ids from other requests and the page URL are considered, but only when
+    'submitted_at' (time.time() just before the submit) and 'created_at'
+    (callable(video_id) -> the API's creation time, or None if unknown) are
+    given: exactly one of them may have been created since the submit.
+    Ids in 'known_ids' (already stored for other rows) are never returned.
+    """
+    known = set(known_ids)
+    try:
+        submitted, mentioned = _ids_from_network_log(driver)
+    except Exception:
+        submitted, mentioned = [], []
+    try:
+        mentioned += _ids_from_page(driver)
+    except Exception:
+        pass
+
+    submitted = [video_id for video_id in dict.fromkeys(submitted) if VIDEO_ID_RE.match(video_id)]
+    stale = {video_id for video_id in submitted if video_id in known}
+    created = [video_id for video_id in submitted if video_id not in known]
+    if len(created) == 1:
+        return created[0]
+    if len(created) > 1:
+        raise HandoffError(f"Several submit responses with different video ids: {', '.join(created)}")
+
+    candidates = [video_id for video_id in dict.fromkeys(mentioned)
+                  if VIDEO_ID_RE.match(video_id) and video_id not in known and video_id not in stale]
+    if candidates and (created_at is None or submitted_at is None):
+        raise HandoffError("No submit response in the network log, and without an API key the "
+                           f"other video ids cannot be dated: {', '.join(candidates)}")
+    fresh = []
+    for video_id in candidates:
+        created_time = created_at(video_id)
+        if created_time is not None and created_time >= submitted_at - CLOCK_SKEW_SECONDS:
+            fresh.append(video_id)
+    if len(fresh) == 1:
+        return fresh[0]
+    if len(fresh) > 1:
+        raise HandoffError(f"Several videos created since the submit: {', '.join(fresh)}")
+    rejected = stale | set(candidates)
+    if rejected:
+        raise HandoffError(f"Only stale or older video ids found: {', '.join(sorted(rejected))}")
+    raise HandoffError("No video id found in the network log or page.")
@@ -0,0 +1,229 @@
+"""
+Quota-aware HeyGen submission scheduler for step4's API mode.
+
+Keeps up to max_in_flight renders running at once: a slot is taken when a
+job is submitted and freed when its render completes or fails, and the next
+highest-priority job is submitted as soon as a slot opens. A render whose status
+cannot be read (a 4xx such as a deleted video or a wrong key, or repeated
+errors) or that runs longer than max_render_seconds also frees its slot. HTTP 429 quota
+rejections put the job back in the queue and pause submissions briefly.
+Accepted video ids are handed to a persist callback in batches.
+"""
+
+import heapq
+import itertools
+import queue
+import time
+import concurrent.futures
+
+import requests
+
+from tracing import tracer
+
+
+class SubmissionJob:
+    def __init__(self, key, script, title="", priority=0, trace_id=None):
+        self.key = key
+        self.script = script
+        self.title = title
+        self.priority = priority
+        self.attempts = 0
+        # Lead the submit spans belong to (its CSV row number); defaults to key.
+        self.trace_id = key if trace_id is None else trace_id
+
+
+class SubmissionScheduler:
+    """
+    :param client: A heygen_client.HeyGenClient (anything with generate_video and video_status).
+    :param max_in_flight: Number of renders allowed to run on HeyGen at once.
+    :param poll_interval: Seconds between status checks of the in-flight renders.
+    :param batch_size: Persist accepted ids once this many are waiting...
+    :param batch_seconds: ...or once the oldest unsaved id is this old.
+    :param rate_limit_backoff: Seconds to pause submissions after a 429.
+    :param max_attempts: Give up on a job after this many rate-limited submissions.
+    :param max_status_errors: Free a render's slot after this many failed status checks in a row.
+    :param max_render_seconds: Free a render's slot once it has been in flight this long.
+    :param on_event: Optional callback(message) for status lines.
+    """
+
+    def __init__(self, client, max_in_flight=5, poll_interval=5.0, batch_size=10,
+                 batch_seconds=10.0, rate_limit_backoff=10.0, max_attempts=20,
+                 max_status_errors=5, max_render_seconds=3600.0, on_event=None):
+        self.client = client
+        self.max_in_flight = max_in_flight
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.batch_seconds = batch_seconds
+        self.rate_limit_backoff = rate_limit_backoff
+        self.max_attempts = max_attempts
+        self.max_status_errors = max_status_errors
+        self.max_render_seconds = max_render_seconds
+        self.on_event = on_event or (lambda message: None)
+
+        self.stats = {
+            "submitted": 0,
+            "failed_submissions": 0,
+            "rate_limited": 0,
+            "renders_completed": 0,
+            "renders_failed": 0,
+            "renders_abandoned": 0,
+            "max_in_flight_seen": 0,
+            "persist_batches": 0,
+            "elapsed_seconds": 0.0,
+            "submissions_per_minute": 0.0,
+        }
+
+    def run(self, jobs, persist):
+        """
+        Submits all 'jobs' (SubmissionJob instances, lowest priority value first).
+        Returns once every job has been accepted or given up on; renders still in
+        flight at that point are left to finish on HeyGen.
+
+        :param persist: Callback(list of (key, video_id)) used to save accepted ids.
+        :return: Dict mapping job key -> video id.
+        """
+        order = itertools.count()
+        pending = [(job.priority, next(order), job) for job in jobs]
+        heapq.heapify(pending)
+
+        events = queue.Queue()
+        in_flight = {}        # video_id -> job
+        accepted_at = {}      # video_id -> monotonic time it was accepted
+        status_errors = {}    # video_id -> failed status checks in a row
+        submitting = 0
+        unsaved = []
+        first_unsaved_at = None
+        paused_until = 0.0
+        next_poll = time.monotonic() + self.poll_interval
+        polling = False
+        results = {}
+        start = time.monotonic()
+
+        def submit(job):
+            try:
+                with tracer.span(job.trace_id, "submit", attempt=job.attempts):
+                    video_id = self.client.generate_video(job.script, job.title)
+                events.put(("accepted", job, video_id))
+            except Exception as e:
+                events.put(("rejected", job, e))
+
+        def poll(video_ids):
+            # (video_id, status, error): status None with an error when the check failed.
+            checked = []
+            for video_id in video_ids:
+                try:
+                    checked.append((video_id, self.client.video_status(video_id).get("status"), None))
+                except Exception as e:
+                    checked.append((video_id, None, e))
+            events.put(("polled", checked, None))
+
+        def release(video_id, outcome):
+            job = in_flight.pop(video_id)
+            accepted_at.pop(video_id, None)
+            status_errors.pop(video_id, None)
+            self.stats[{"completed": "renders_completed", "failed": "renders_failed"}.get(
+                outcome, "renders_abandoned")] += 1
+            self.on_event(f"Row {job.key}: render {outcome}, slot freed")
+
+        def flush():
+            nonlocal unsaved, first_unsaved_at
+            if unsaved:
+                persist(unsaved)
+                self.stats["persist_batches"] += 1
+                unsaved = []
+                first_unsaved_at = None
+
+        workers = max(1, self.max_in_flight) + 1
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            while pending or submitting:
+                now = time.monotonic()
+
+                # Fill every free slot.
+                while pending and now >= paused_until and len(in_flight) + submitting < self.max_in_flight:
+                    _, _, job = heapq.heappop(pending)
+                    job.attempts += 1
+                    submitting += 1
+                    executor.submit(submit, job)
+
+                if in_flight and not polling and now >= next_poll:
+                    polling = True
+                    executor.submit(poll, list(in_flight))
+
+                wake_times = []
+                if in_flight and not polling:
+                    wake_times.append(next_poll)
+                if pending and now < paused_until:
+                    wake_times.append(paused_until)
+                if unsaved:
+                    wake_times.append(first_unsaved_at + self.batch_seconds)
+                timeout = max(0.01, min(wake_times) - now) if wake_times else None
+                try:
+                    kind, payload, extra = events.get(timeout=timeout)
+                except queue.Empty:
+                    kind = None
+
+                if kind == "accepted":
+                    submitting -= 1
+                    job, video_id = payload, extra
+                    in_flight[video_id] = job
+                    accepted_at[video_id] = time.monotonic()
+                    results[job.key] = video_id
+                    unsaved.append((job.key, video_id))
+                    if first_unsaved_at is None:
+                        first_unsaved_at = time.monotonic()
+                    self.stats["submitted"] += 1
+                    self.stats["max_in_flight_seen"] = max(self.stats["max_in_flight_seen"], len(in_flight))
+                    self.on_event(f"Row {job.key}: submitted, Video ID {video_id} ({len(in_flight)} in flight)")
+                elif kind == "rejected":
+                    submitting -= 1
+                    job, error = payload, extra
+                    if getattr(error, "rate_limited", False) and job.attempts < self.max_attempts:
+                        self.stats["rate_limited"] += 1
+                        paused_until = time.monotonic() + self.rate_limit_backoff
+                        heapq.heappush(pending, (job.priority, next(order), job))
+                        self.on_event(f"Row {job.key}: quota reached, retrying in {self.rate_limit_backoff:.0f}s")
+                    else:
+                        self.stats["failed_submissions"] += 1
+                        self.on_event(f"Row {job.key}: submission failed: {error}")
+                elif kind == "polled":
+                    polling = False
+                    next_poll = time.monotonic() + self.poll_interval
+                    now = time.monotonic()
+                    for video_id, status, error in payload:
+                        if video_id not in in_flight:
+                            continue
+                        if status in ("completed", "failed"):
+                            release(video_id, status)
+                        elif error is not None:
+                            status_errors[video_id] = status_errors.get(video_id, 0) + 1
+                            code = getattr(getattr(error, "response", None), "status_code", None)
+                            if isinstance(error, requests.HTTPError) and code and 400 <= code < 500 and code != 429:
+                                release(video_id, f"status unavailable (HTTP {code})")
+                            elif status_errors[video_id] >= self.max_status_errors:
+                                release(video_id, f"status unavailable after {status_errors[video_id]} errors: {error}")
+                        else:
+                            status_errors.pop(video_id, None)
+                            if now - accepted_at[video_id] >= self.max_render_seconds:
+                                release(video_id, f"still {status} after {self.max_render_seconds:.0f}s")
+
+                if unsaved and (len(unsaved) >= self.batch_size
+                                or time.monotonic() - first_unsaved_at >= self.batch_seconds):
+                    flush()
+
+            flush()
+
+        elapsed = time.monotonic() - start
+        self.stats["elapsed_seconds"] = round(elapsed, 2)
+        self.stats["submissions_per_minute"] = round(self.stats["submitted"] / elapsed * 60, 2) if elapsed else 0.0
+        return results
+
+    def format_stats(self):
+        s = self.stats
+        return (
+            f"{s['submitted']} submitted in {s['elapsed_seconds']}s "
+            f"({s['submissions_per_minute']}/min), {s['failed_submissions']} failed, "
+            f"{s['renders_abandoned']} renders given up on, "
+            f"{s['rate_limited']} quota retries, peak {s['max_in_flight_seen']} in flight, "
+            f"{s['persist_batches']} CSV batches"
+        )
+
@@ -0,0 +1,181 @@
+"""
+Fuzzy deduplication of lead rows (first name, last name, company) before step1 searches them.
+
+Names and companies are normalized: case, accents and punctuation are dropped,
+common nicknames are mapped to one given name and legal suffixes ("Inc.",
+"LLC", "GmbH", ...) are removed from companies. Rows are then put into blocks
+that share the prefixes of two of their three fields, and only rows within a
+block are compared, so a large CSV is not compared all-pairs. Rows whose names and company are similar
+enough are joined into one cluster; step1 searches each cluster once and
+writes the result to every row in it.
+
+Usage:
+    python lead_dedup.py leads.csv [--threshold 0.88]   # prints the duplicate clusters
+"""
+
+import argparse
+import csv
+import difflib
+import re
+import unicodedata
+
+# Minimum similarity (0-1) of first name, last name and company for two rows to be the same lead.
+DEFAULT_THRESHOLD = 0.88
+# Characters of each name used in the block keys.
+BLOCK_PREFIX = 3
+
+NICKNAMES = {
+    "abby": "abigail", "alex": "alexander", "andy": "andrew", "drew": "andrew", "ben": "benjamin",
+    "bill": "william", "billy": "william", "will": "william", "liam": "william", "bob": "robert",
+    "bobby": "robert", "rob": "robert", "robbie": "robert", "cathy": "catherine", "kate": "catherine",
+    "katie": "catherine", "chris": "christopher", "dan": "daniel", "danny": "daniel", "dave": "david",
+    "ed": "edward", "eddie": "edward", "ted": "edward", "jen": "jennifer", "jenny": "jennifer",
+    "jim": "james", "jimmy": "james", "jamie": "james", "joe": "joseph", "joey": "joseph",
+    "jon": "jonathan", "johnny": "john", "jack": "john", "kim": "kimberly", "liz": "elizabeth",
+    "beth": "elizabeth", "betty": "elizabeth", "lizzie": "elizabeth", "matt": "matthew",
+    "mike": "michael", "mikey": "michael", "nate": "nathan", "nick": "nicholas", "pat": "patrick",
+    "peggy": "margaret", "maggie": "margaret", "meg": "margaret", "pete": "peter", "rich": "richard",
+    "rick": "richard", "dick": "richard", "sam": "samuel", "steve": "steven", "stephen": "steven",
+    "sue": "susan", "susie": "susan", "tom": "thomas", "tommy": "thomas", "tony": "anthony",
+    "vicky": "victoria", "zach": "zachary", "greg": "gregory", "jeff": "jeffrey", "josh": "joshua",
+    "ken": "kenneth", "larry": "lawrence", "ron": "ronald", "tim": "timothy", "becky": "rebecca",
+}
+
+COMPANY_SUFFIXES = {
+    "inc", "incorporated", "llc", "llp", "lp", "ltd", "limited", "corp", "corporation", "co",
+    "company", "plc", "gmbh", "ag", "sa", "sas", "srl", "bv", "nv", "pty", "pte", "oy", "ab", "as",
+    "group", "holdings", "the",
+}
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def fold_words(text):
+    """Lowercase words of 'text' (accents removed, punctuation as spaces; letters of any script are kept)."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return _NON_WORD.sub(" ", text.replace("&", " and ")).split()
+
+
+def normalize_name(name):
+    words = fold_words(name)
+    if not words:
+        return ""
+    # Nicknames only matter for the given name ("Bob" vs "Robert"); middle names are kept.
+    words[0] = NICKNAMES.get(words[0], words[0])
+    return " ".join(words)
+
+
+def normalize_company(company):
+    words = [w for w in fold_words(company) if w not in COMPANY_SUFFIXES]
+    return " ".join(words)
+
+
+def normalize_lead(first_name, last_name, company):
+    return normalize_name(first_name), " ".join(fold_words(last_name)), normalize_company(company)
+
+
+def similarity(a, b):
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    return difflib.SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+def _similar(a, b, threshold):
+    """similarity(a, b) >= threshold, skipping the full comparison when the cheap upper bounds rule it out."""
+    if a == b:
+        return True
+    if not a or not b or 2 * min(len(a), len(b)) / (len(a) + len(b)) < threshold:
+        return False
+    matcher = difflib.SequenceMatcher(None, a, b, autojunk=False)
+    return matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold \
+        and matcher.ratio() >= threshold
+
+
+def same_lead(a, b, threshold=DEFAULT_THRESHOLD):
+    """True if the normalized leads 'a' and 'b' are the same person at the same company."""
+    first_a, last_a, company_a = a
+    first_b, last_b, company_b = b
+    return (_similar(last_a, last_b, threshold) and _similar(first_a, first_b, threshold)
+            and _similar(company_a, company_b, threshold))
+
+
+def _block_keys(lead):
+    """One key per pair of fields, so a typo in any one field still leaves a shared block."""
+    first, last, company = (field[:BLOCK_PREFIX] for field in lead)
+    return [("first-last", first, last), ("first-company", first, company), ("last-company", last, company)]
+
+
+def cluster_leads(leads, threshold=DEFAULT_THRESHOLD):
+    """
+    Groups duplicate leads.
+
+    :param leads: List of (first name, last name, company) tuples.
+    :param threshold: Minimum similarity for two leads to be joined.
+    :return: List of clusters, each a sorted list of indexes into 'leads', in order of their first index.
+    """
+    normalized = [normalize_lead(*lead) for lead in leads]
+    parent = list(range(len(leads)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        i, j = find(i), find(j)
+        if i != j:
+            parent[max(i, j)] = min(i, j)
+
+    # Identical normalized leads are joined without comparing (their searches would be identical).
+    exact = {}
+    for i, lead in enumerate(normalized):
+        if lead[0] or lead[1]:
+            union(i, exact.setdefault(lead, i))
+
+    # Only the first row of each exact group takes part in the fuzzy comparison, and only
+    # if it has all three fields: two "Jane Doe"s without a company are kept apart.
+    blocks = {}
+    for lead, i in exact.items():
+        if not all(lead):
+            continue
+        for key in _block_keys(lead):
+            blocks.setdefault(key, []).append(i)
+    compared = set()
+    for members in blocks.values():
+        for x, i in enumerate(members):
+            for j in members[x + 1:]:
+                if (i, j) in compared or find(i) == find(j):
+                    continue
+                compared.add((i, j))
+                if same_lead(normalized[i], normalized[j], threshold):
+                    union(i, j)
+
+    clusters = {}
+    for i in range(len(leads)):
+        clusters.setdefault(find(i), []).append(i)
+    return sorted(clusters.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List the duplicate leads in a step1 CSV.")
+    parser.add_argument("csv_file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    with open(args.csv_file, mode="r", encoding="utf-8-sig") as f:
+        rows = list(csv.reader(f))[1:]
+    rows = [(row_number, row) for row_number, row in enumerate(rows, start=2) if len(row) >= 3]
+    clusters = cluster_leads([row[:3] for _, row in rows], args.threshold)
+
+    for cluster in clusters:
+        if len(cluster) > 1:
+            print(", ".join(f"row {rows[i][0]}: {' '.join(rows[i][1][:3])}" for i in cluster))
+    print(f"{len(rows)} leads, {len(clusters)} unique; {len(rows) - len(clusters)} searches avoided.")
+
+
+if __name__ == "__main__":
+    main()
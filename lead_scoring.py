@@ -0,0 +1,118 @@
+"""
+Scores step1's search results so the best LinkedIn profile is kept, with a confidence.
+
+Every organic result of a query is scored on:
+    URL shape    /in/<slug> profiles score 1, old /pub/ profiles 0.8; company pages, posts,
+                 articles and job listings score 0
+    name         whether the lead's first name and last name are found in the result title or
+                 profile slug (accents, case and nicknames ignored; middle names not required;
+                 letters of any script are compared)
+    company      share of the company's words found in the title or snippet
+    rank         a small bonus for the search engine's own order
+The confidence is URL shape x name x (0.6 + 0.3 company + 0.1 rank), so a result
+missing half the name can never score above 0.5.
+
+step1 writes the confidence to CSV column 9 ("Match Confidence"); steps 2, 3 and
+4 skip rows below MIN_MATCH_CONFIDENCE (set the environment variable to change
+it, 0 to turn skipping off). Rows without a confidence are never skipped.
+"""
+
+import os
+from urllib.parse import unquote, urlparse
+
+from lead_dedup import NICKNAMES, fold_words, normalize_company
+
+# Header of the confidence column; readers find the column by this name.
+MATCH_CONFIDENCE_FIELD = "Match Confidence"
+MIN_MATCH_CONFIDENCE = float(os.environ.get("MIN_MATCH_CONFIDENCE", "0.55"))
+
+COMPANY_WEIGHT = 0.3
+RANK_WEIGHT = 0.1
+
+
+def url_shape_score(link):
+    """How likely 'link' is a person's profile, from its path alone."""
+    path = urlparse(link or "").path.lower()
+    if path.startswith("/in/"):
+        return 1.0
+    if path.startswith("/pub/"):
+        return 0.8
+    return 0.0
+
+
+def _name_words(text):
+    return {NICKNAMES.get(word, word) for word in fold_words(text)}
+
+
+def _lead_words(lead):
+    """The lead's required name parts (each a set of acceptable words) and its company words."""
+    first_name, last_name, company = lead
+    first_words = fold_words(first_name)
+    name_parts = []
+    if first_words:
+        # Only the given name is required: "Mary Ann Smith" matches a "Mary Smith" profile.
+        name_parts.append({NICKNAMES.get(first_words[0], first_words[0])})
+    last_words = _name_words(last_name)
+    if last_words:
+        # Any part of a compound last name ("García López") is enough.
+        name_parts.append(last_words)
+    return name_parts, set(normalize_company(company).split())
+
+
+def _score(name_parts, company_words, result, position, count):
+    shape = url_shape_score(result.get("link"))
+    if not shape or not name_parts:
+        return 0.0
+    title = result.get("title") or ""
+    slug = unquote(urlparse(result.get("link") or "").path.strip("/").split("/")[-1])
+    profile_words = _name_words(title) | _name_words(slug.replace("-", " "))
+    name = sum(1 for part in name_parts if part & profile_words) / len(name_parts)
+    if company_words:
+        text_words = set(fold_words(f"{title} {result.get('snippet') or ''}"))
+        company = len(company_words & text_words) / len(company_words)
+    else:
+        company = 0.0
+    rank = 1.0 - position / count
+    return shape * name * (1.0 - COMPANY_WEIGHT - RANK_WEIGHT + COMPANY_WEIGHT * company + RANK_WEIGHT * rank)
+
+
+def best_matches(leads, results):
+    """
+    Picks the best search result for each lead.
+
+    :param leads: List of (first name, last name, company) tuples.
+    :param results: List with each lead's organic search results (dicts with title, link, snippet).
+    :return: List of (title, url, confidence); (None, None, 0.0) for a lead without results.
+    """
+    matches = []
+    for lead, organic in zip(leads, results):
+        if not organic:
+            matches.append((None, None, 0.0))
+            continue
+        name_parts, company_words = _lead_words(lead)
+        scores = [_score(name_parts, company_words, result, position, len(organic))
+                  for position, result in enumerate(organic)]
+        # Ties (e.g. all zero) keep the search engine's order.
+        best = max(range(len(organic)), key=lambda i: (scores[i], -i))
+        matches.append((organic[best].get("title"), organic[best].get("link"), scores[best]))
+    return matches
+
+
+def format_confidence(confidence):
+    return f"{confidence:.2f}"
+
+
+def confidence_column(header):
+    """Index of the confidence column in 'header', or None for CSVs written before it existed."""
+    return header.index(MATCH_CONFIDENCE_FIELD) if MATCH_CONFIDENCE_FIELD in header else None
+
+
+def low_confidence(row, column, minimum=MIN_MATCH_CONFIDENCE):
+    """The row's confidence if it is below 'minimum', else None (also for rows without one)."""
+    if column is None or column >= len(row):
+        return None
+    try:
+        confidence = float(row[column])
+    except ValueError:
+        return None
+    return confidence if confidence < minimum else None
@@ -0,0 +1,245 @@
+"""
+Load driver: pushes synthetic leads through the pipeline against fake_services.
+
+Starts the fake services, points the steps at them through their base-URL
+variables and runs each lead through the steps' own functions:
+    search     step1 search_linkedin
+    page_load  HTTP fetch of the profile URL (step2 drives a desktop browser, which is not load-tested)
+    script     step3 build_profile_script (OCR of every screenshot, then the ChatGPT call)
+    submit     HeyGen video generation (429s are retried after a second)
+    download   step5 DownloadEngine: render wait and download, once every lead is submitted
+
+Leads move to the next stage as soon as they finish the previous one, with
+--workers threads per stage. Spans go to a trace file in the run folder and
+the report gives per-stage throughput and latency percentiles.
+
+Usage:
+    python load_driver.py --leads 200 [--stages search,page_load,script,submit,download] [--workers 8]
+                          [--set openai.latency=1 --set ocr.rate_limit_rate=0.05 ...] [--out run_folder]
+"""
+
+import argparse
+import concurrent.futures
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from fake_services import COMPANIES, FIRST_NAMES, LAST_NAMES, FakeServices, parse_settings
+
+STAGES = ("search", "page_load", "script", "submit", "download")
+# Span stages in report order (script covers ocr and llm; download covers render_wait).
+REPORT_STAGES = ("search", "page_load", "ocr", "llm", "submit", "render_wait", "download")
+SUBMIT_ATTEMPTS = 10
+
+
+def make_leads(count, folder, screenshots, screenshot_kb, seed):
+    """Synthetic CSV rows, each with a lead folder holding 'screenshots' files as step2 leaves them."""
+    rng = random.Random(seed)
+    leads = []
+    for row_number in range(2, count + 2):
+        lead_folder = os.path.join(folder, f"{row_number} - Lead {row_number}")
+        os.makedirs(lead_folder)
+        for i in range(screenshots):
+            with open(os.path.join(lead_folder, f"screenshot_{row_number}_{i}.png"), "wb") as f:
+                f.write(rng.randbytes(screenshot_kb * 1024))
+        leads.append({"row": row_number, "first_name": rng.choice(FIRST_NAMES),
+                      "last_name": rng.choice(LAST_NAMES), "company": rng.choice(COMPANIES),
+                      "folder": lead_folder})
+    return leads
+
+
+def stage_functions(stages, services, workers):
+    """{stage: callable(lead)} for the per-lead stages, importing each step only when it is used."""
+    # Imported here: these modules read the base-URL variables at import time.
+    from tracing import tracer
+    functions = {}
+
+    if "search" in stages:
+        from step1_new import build_query, search_linkedin
+
+        def search(lead):
+            with tracer.span(lead["row"], "search"):
+                title, url = search_linkedin(build_query(lead["first_name"], lead["last_name"], lead["company"]))
+                if not url:
+                    raise RuntimeError("No search result")
+            lead["title"], lead["url"] = title, url
+        functions["search"] = search
+
+    if "page_load" in stages:
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        session.mount("http://", HTTPAdapter(pool_maxsize=workers))
+
+        def page_load(lead):
+            url = lead.get("url") or f"{services.url}/in/lead-{lead['row']}/"
+            with tracer.span(lead["row"], "page_load"):
+                response = session.get(url, timeout=60)
+                response.raise_for_status()
+        functions["page_load"] = page_load
+
+    if "script" in stages:
+        from step3_new import build_profile_script
+
+        def script(lead):
+            text, problem = build_profile_script(lead["folder"])
+            if problem or text.startswith("Error"):
+                raise RuntimeError(problem or text)
+            lead["script"] = text
+        functions["script"] = script
+
+    if "submit" in stages:
+        from heygen_client import HeyGenClient, HeyGenError
+        client = HeyGenClient("", avatar_id="load-test", voice_id="load-test",
+                              base_url=services.heygen.url, max_workers=workers)
+
+        def submit(lead):
+            for attempt in range(1, SUBMIT_ATTEMPTS + 1):
+                try:
+                    with tracer.span(lead["row"], "submit", attempt=attempt):
+                        lead["video_id"] = client.generate_video(lead.get("script") or "Hello there.",
+                                                                 os.path.basename(lead["folder"]))
+                    return
+                except HeyGenError as e:
+                    if not e.rate_limited or attempt == SUBMIT_ATTEMPTS:
+                        raise
+                    time.sleep(1)
+        functions["submit"] = submit
+
+    return functions
+
+
+def run_pipeline(leads, functions, workers):
+    """Runs every lead through 'functions' in order; returns {stage: failures}."""
+    order = list(functions)
+    executors = {stage: concurrent.futures.ThreadPoolExecutor(max_workers=workers) for stage in order}
+    failures = {stage: 0 for stage in order}
+    remaining = [len(leads)]
+    all_done = threading.Event()
+    lock = threading.Lock()
+
+    def finish():
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                all_done.set()
+
+    def run(lead, index):
+        stage = order[index]
+        try:
+            functions[stage](lead)
+        except Exception:
+            with lock:
+                failures[stage] += 1
+            finish()
+            return
+        if index + 1 < len(order):
+            executors[order[index + 1]].submit(run, lead, index + 1)
+        else:
+            lead["done"] = True
+            finish()
+
+    if not leads or not order:
+        return failures
+    for lead in leads:
+        executors[order[0]].submit(run, lead, 0)
+    all_done.wait()
+    for executor in executors.values():
+        executor.shutdown()
+    return failures
+
+
+def run_downloads(leads, services, poll_interval, workers):
+    from video_downloader import DownloadEngine, DownloadJob
+    jobs = []
+    for lead in leads:
+        if lead.get("video_id"):
+            dest_dir = os.path.join(lead["folder"], "HeyGen Video")
+            os.makedirs(dest_dir, exist_ok=True)
+            jobs.append(DownloadJob(lead["row"], lead["video_id"], os.path.join(dest_dir, "video.mp4")))
+    engine = DownloadEngine("", base_url=services.heygen.url, workers=workers,
+                            min_interval=poll_interval, max_interval=max(poll_interval, 30))
+    try:
+        return engine.run(jobs)
+    finally:
+        engine.close()
+
+
+def format_report(spans, wall_seconds, leads, services):
+    from tracing import percentile
+    lines = [f"{'stage':<12}{'ok':>7}{'errors':>8}{'per s':>9}{'p50':>9}{'p95':>9}{'p99':>9}"]
+    for stage in REPORT_STAGES:
+        stage_spans = [span for span in spans if span["stage"] == stage]
+        if not stage_spans:
+            continue
+        ok = [span for span in stage_spans if span["status"] == "ok"]
+        window = max(s["start"] + s["duration"] for s in stage_spans) - min(s["start"] for s in stage_spans)
+        durations = sorted(span["duration"] for span in ok) or [0.0]
+        lines.append(f"{stage:<12}{len(ok):>7}{len(stage_spans) - len(ok):>8}{len(ok) / max(window, 1e-9):>9.2f}"
+                     + "".join(f"{percentile(durations, q):>8.2f}s" for q in (0.5, 0.95, 0.99)))
+    done = sum(1 for lead in leads if lead.get("done"))
+    lines.append(f"{done}/{len(leads)} leads through every per-lead stage in {wall_seconds:.1f}s "
+                 f"({done / max(wall_seconds, 1e-9):.2f} leads/s)")
+    injected = ", ".join(f"{service} {counts['requests']} req ({counts['429']} x 429, {counts['500']} x 500)"
+                         for service, counts in services.stats.items() if counts["requests"])
+    heygen = services.heygen.request_counts
+    lines.append(f"Fake services: {injected or 'no requests'}; heygen {heygen.get('generate', 0)} generate, "
+                 f"{heygen.get('status', 0)} status ({heygen.get('fault_429', 0)} x 429, "
+                 f"{heygen.get('fault_500', 0)} x 500), {heygen.get('download', 0)} downloads")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Push synthetic leads through the pipeline against fake services.")
+    parser.add_argument("--leads", type=int, default=100)
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma-separated subset of " + ", ".join(STAGES))
+    parser.add_argument("--workers", type=int, default=8, help="Threads per stage.")
+    parser.add_argument("--set", action="append", metavar="SERVICE.SETTING=VALUE",
+                        help="Fake service setting, e.g. openai.latency=1 (see fake_services.py).")
+    parser.add_argument("--screenshots", type=int, default=6, help="Screenshots per lead (OCR calls).")
+    parser.add_argument("--screenshot-kb", type=int, default=300)
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Shortest status poll delay (s).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Run folder to keep (lead folders, traces.jsonl); default is a temp folder.")
+    args = parser.parse_args()
+
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    try:
+        config = parse_settings(args.set)
+        services = FakeServices(config=config, seed=args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+
+    folder = args.out or tempfile.mkdtemp(prefix="load_driver_")
+    os.makedirs(folder, exist_ok=True)
+    trace_path = os.path.join(folder, "traces.jsonl")
+    with services:
+        os.environ.update(services.env())
+        os.environ["TRACE_FILE"] = trace_path
+        leads = make_leads(args.leads, folder, args.screenshots, args.screenshot_kb, args.seed)
+        functions = stage_functions(stages, services, args.workers)
+        print(f"Running {len(leads)} leads through {', '.join(stages)} ({args.workers} workers per stage)...")
+
+        start = time.perf_counter()
+        run_pipeline(leads, functions, args.workers)
+        if "download" in stages:
+            run_downloads(leads, services, args.poll_interval, args.workers)
+        wall_seconds = time.perf_counter() - start
+
+    from tracing import read_spans
+    spans = read_spans([trace_path]) if os.path.exists(trace_path) else []
+    print(format_report(spans, wall_seconds, leads, services))
+    if args.out:
+        print(f"Traces: {trace_path}")
+    else:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
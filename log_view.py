@@ -0,0 +1,124 @@
+"""
+Bounded status log shared by the step GUIs.
+
+Messages go into a fixed-size ring buffer and are flushed to the on-screen
+log in batches on a timer, instead of one UI callback per message. The
+widget is capped at the same number of lines, so memory stays flat however
+long a run is. Every message is also written to a rotating log file, which
+keeps the full history on disk.
+
+    log = LogBuffer(log_file=log_path("step2"))
+    attach_qt(log, plain_text_edit)          # PyQt5 QPlainTextEdit
+    attach_tk(log, root, text_widget)        # tkinter Text
+    log.write("message")                     # from any thread
+"""
+
+import collections
+import logging
+import logging.handlers
+import os
+import threading
+
+# Lines kept in memory and on screen.
+DEFAULT_CAPACITY = 2000
+# Delay between UI flushes (ms).
+FLUSH_INTERVAL_MS = 200
+# Rotating log files: folder, size per file and number of old files kept.
+LOG_DIR = "logs"
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+
+def log_path(name):
+    """Path of the rotating log file for 'name' (e.g. "step2")."""
+    return os.path.join(LOG_DIR, f"{name}.log")
+
+
+class LogBuffer:
+    """
+    :param capacity: Lines kept in memory and shown in the attached widget.
+    :param log_file: Rotating file receiving every message (None = no file).
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, log_file=None):
+        self.capacity = capacity
+        self.lines = collections.deque(maxlen=capacity)
+        self._pending = collections.deque(maxlen=capacity)
+        self._reset = False
+        self._lock = threading.Lock()
+
+        self.logger = None
+        if log_file:
+            os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+            self.logger = logging.getLogger(f"log_view.{os.path.abspath(log_file)}")
+            self.logger.propagate = False
+            self.logger.setLevel(logging.INFO)
+            if not self.logger.handlers:
+                handler = logging.handlers.RotatingFileHandler(
+                    log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+                )
+                handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+                self.logger.addHandler(handler)
+
+    def write(self, message):
+        """Records 'message'; safe to call from any thread."""
+        message = str(message)
+        with self._lock:
+            self.lines.append(message)
+            self._pending.append(message)
+        if self.logger:
+            self.logger.info(message)
+
+    def clear(self):
+        """Empties the buffer; the widget is cleared on the next flush."""
+        with self._lock:
+            self.lines.clear()
+            self._pending.clear()
+            self._reset = True
+
+    def take_pending(self):
+        """Returns (lines written since the last call, whether the view must be cleared first)."""
+        with self._lock:
+            pending = list(self._pending)
+            self._pending.clear()
+            reset, self._reset = self._reset, False
+        return pending, reset
+
+
+def attach_qt(log, widget, interval_ms=FLUSH_INTERVAL_MS):
+    """Flushes 'log' into a QPlainTextEdit every interval_ms; returns the QTimer."""
+    from PyQt5.QtCore import QTimer
+
+    widget.setMaximumBlockCount(log.capacity)
+
+    def flush():
+        pending, reset = log.take_pending()
+        if reset:
+            widget.clear()
+        if pending:
+            widget.appendPlainText("\n".join(pending))
+            widget.verticalScrollBar().setValue(widget.verticalScrollBar().maximum())
+
+    timer = QTimer(widget)
+    timer.timeout.connect(flush)
+    timer.start(interval_ms)
+    return timer
+
+
+def attach_tk(log, root, widget, interval_ms=FLUSH_INTERVAL_MS):
+    """Flushes 'log' into a tkinter Text widget every interval_ms, keeping at most log.capacity lines."""
+
+    def flush():
+        pending, reset = log.take_pending()
+        if reset:
+            widget.delete("1.0", "end")
+        if pending:
+            widget.insert("end", "\n".join(pending) + "\n")
+            # "end-1c" sits on the empty line after the final newline.
+            line_count = int(widget.index("end-1c").split(".")[0]) - 1
+            if line_count > log.capacity:
+                widget.delete("1.0", f"{line_count - log.capacity + 1}.0")
+            widget.see("end")
+        root.after(interval_ms, flush)
+
+    root.after(interval_ms, flush)
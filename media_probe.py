@@ -0,0 +1,131 @@
+"""
+Cached ffprobe metadata for step6.
+
+Each input is probed once with JSON output (format and streams together) and
+the useful fields are kept, keyed by the file's path, size and modification
+time. The cache is saved next to the outputs, so unchanged inputs are not
+probed again on the next run.
+"""
+
+import json
+import os
+import subprocess
+import threading
+
+CACHE_NAME = ".media_probe.json"
+
+
+class ProbeError(Exception):
+    pass
+
+
+class MediaInfo:
+    def __init__(self, path, duration, width=None, height=None, fps=None, has_audio=False, video_codec=None):
+        self.path = path
+        self.duration = duration
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.has_audio = has_audio
+        self.video_codec = video_codec
+
+    def to_dict(self):
+        return {key: value for key, value in vars(self).items() if key != "path"}
+
+    @classmethod
+    def from_dict(cls, path, data):
+        return cls(path, **data)
+
+    def __repr__(self):
+        return (f"MediaInfo({os.path.basename(self.path)!r}, {self.duration:.2f}s, "
+                f"{self.width}x{self.height}@{self.fps}, audio={self.has_audio})")
+
+
+def _rate(value):
+    """ffprobe frame rates look like "30000/1001"."""
+    try:
+        num, den = (value or "").split("/")
+        return round(float(num) / float(den), 3) if float(den) else None
+    except ValueError:
+        return None
+
+
+def probe(path, ffprobe="ffprobe"):
+    """Runs ffprobe once on 'path' and returns its MediaInfo."""
+    cmd = [ffprobe, "-v", "error", "-show_format", "-show_streams", "-of", "json", path]
+    try:
+        data = json.loads(subprocess.check_output(cmd, stderr=subprocess.PIPE, text=True))
+    except (OSError, ValueError, subprocess.CalledProcessError) as e:
+        raise ProbeError(f"ffprobe failed for {path}: {e}")
+
+    streams = data.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), {})
+    duration = data.get("format", {}).get("duration") or video.get("duration")
+    if duration is None:
+        raise ProbeError(f"No duration reported for {path}")
+    return MediaInfo(
+        path,
+        duration=float(duration),
+        width=video.get("width"),
+        height=video.get("height"),
+        fps=_rate(video.get("avg_frame_rate")) or _rate(video.get("r_frame_rate")),
+        has_audio=any(s.get("codec_type") == "audio" for s in streams),
+        video_codec=video.get("codec_name"),
+    )
+
+
+class MediaProbeCache:
+    """
+    :param cache_dir: Folder for the persistent cache file (None = memory only).
+    """
+
+    def __init__(self, cache_dir=None, ffprobe="ffprobe"):
+        self.path = os.path.join(cache_dir, CACHE_NAME) if cache_dir else None
+        self.ffprobe = ffprobe
+        self.entries = {}
+        self.stats = {"hits": 0, "probes": 0}
+        self._lock = threading.Lock()
+        if self.path:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    @staticmethod
+    def _key(path):
+        st = os.stat(path)
+        return f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+
+    def get(self, path):
+        """MediaInfo for 'path', probing it only if it is new or changed."""
+        key = self._key(path)
+        with self._lock:
+            cached = self.entries.get(key)
+            if cached is not None:
+                self.stats["hits"] += 1
+                return MediaInfo.from_dict(path, cached)
+        info = probe(path, self.ffprobe)
+        with self._lock:
+            self.entries[key] = info.to_dict()
+            self.stats["probes"] += 1
+        return info
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            # Drop entries for files that no longer exist or have changed.
+            live = {}
+            for key, value in self.entries.items():
+                path = key.rsplit("|", 2)[0]
+                try:
+                    if self._key(path) == key:
+                        live[key] = value
+                except OSError:
+                    pass
+            self.entries = live
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(live, f)
+            os.replace(tmp_path, self.path)
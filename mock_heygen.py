@@ -0,0 +1,338 @@
+"""
+Local stand-in for the HeyGen API, for exercising step4/step5 without spending credits.
+
+Implements the endpoints the pipeline uses:
+  POST /v2/video/generate        -> {"error": null, "data": {"video_id": ...}}
+  GET  /v1/video_status.get      -> {"data": {"status": ..., "video_url": ...}}
+  GET  /videos/<video_id>.mp4    -> synthetic MP4 bytes (HEAD and Range supported)
+
+Each submitted video "renders" for render_seconds (a number, or a callable
+returning one per video) before its status flips to completed. With
+max_concurrent_renders set, submissions beyond that many unfinished renders
+are rejected with HTTP 429, like an account's concurrency quota. With
+interrupt_after set, the first full download of each video is cut off after
+that many bytes, to exercise resumable downloads. With webhook_url set, an
+"avatar_video.success" event is POSTed there when each render finishes;
+webhook_drop_rate is the fraction of those events silently lost. With faults
+set (a fake_services.Faults), API requests get its latency and 429/500 errors.
+
+Usage:
+    python mock_heygen.py --port 8765 --render-seconds 5
+    HEYGEN_API_BASE=http://127.0.0.1:8765 python step4_new.py   # with "Use HeyGen API" checked
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import re
+import threading
+import time
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class MockHeyGenServer:
+    def __init__(self, host="127.0.0.1", port=0, render_seconds=5.0, video_size=1024 * 1024,
+                 api_key=None, max_concurrent_renders=None, interrupt_after=None,
+                 webhook_url=None, webhook_drop_rate=0.0, webhook_secret=None, faults=None):
+        self.render_seconds = render_seconds
+        self.video_size = video_size
+        self.api_key = api_key
+        self.max_concurrent_renders = max_concurrent_renders
+        self.interrupt_after = interrupt_after
+        self._interrupted = set()
+        self.webhook_url = webhook_url
+        self.webhook_drop_rate = webhook_drop_rate
+        self.webhook_secret = webhook_secret
+        self.faults = faults
+        self._drop_credit = 0.0
+        self._timers = []
+
+        self.lock = threading.Lock()
+        self.videos = {}  # video_id -> dict(title, script, submitted_at, ready_at)
+        self.request_counts = {}
+
+        handler = type("MockHeyGenHandler", (_Handler,), {"mock": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        for timer in self._timers:
+            timer.cancel()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def count(self, endpoint):
+        with self.lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+
+    def rendering_count(self):
+        now = time.time()
+        with self.lock:
+            return sum(1 for v in self.videos.values() if v["ready_at"] > now)
+
+    def create_video(self, title, script):
+        """Registers a new render and returns its id, or None if the quota is exhausted."""
+        video_id = uuid.uuid4().hex
+        duration = self.render_seconds() if callable(self.render_seconds) else self.render_seconds
+        now = time.time()
+        with self.lock:
+            if self.max_concurrent_renders is not None:
+                rendering = sum(1 for v in self.videos.values() if v["ready_at"] > now)
+                if rendering >= self.max_concurrent_renders:
+                    return None
+            self.videos[video_id] = {
+                "title": title,
+                "script": script,
+                "submitted_at": now,
+                "ready_at": now + duration,
+            }
+            if self.webhook_url:
+                timer = threading.Timer(duration, self.send_webhook, args=(video_id,))
+                timer.daemon = True
+                self._timers.append(timer)
+                timer.start()
+        return video_id
+
+    def send_webhook(self, video_id):
+        """POSTs the completion event for 'video_id', unless it is one of the dropped share."""
+        with self.lock:
+            # Spread drops evenly so the lost share matches webhook_drop_rate exactly.
+            self._drop_credit += self.webhook_drop_rate
+            dropped = self._drop_credit >= 1.0
+            if dropped:
+                self._drop_credit -= 1.0
+        if dropped:
+            self.count("webhook_dropped")
+            return
+        body = json.dumps({
+            "event_type": "avatar_video.success",
+            "event_data": {"video_id": video_id, "url": f"{self.url}/videos/{video_id}.mp4"},
+        }).encode()
+        headers = {"Content-Type": "application/json"}
+        if self.webhook_secret:
+            headers["Signature"] = hmac.new(self.webhook_secret.encode(), body, hashlib.sha256).hexdigest()
+        request = urllib.request.Request(self.webhook_url, data=body, headers=headers, method="POST")
+        try:
+            urllib.request.urlopen(request, timeout=10).close()
+            self.count("webhook_sent")
+        except OSError:
+            self.count("webhook_failed")
+
+    def status(self, video_id):
+        with self.lock:
+            video = self.videos.get(video_id)
+        if video is None:
+            return None
+        if time.time() >= video["ready_at"]:
+            return "completed"
+        return "processing"
+
+    def should_interrupt(self, video_id):
+        """True the first time a full download of 'video_id' is requested."""
+        if self.interrupt_after is None:
+            return False
+        with self.lock:
+            if video_id in self._interrupted:
+                return False
+            self._interrupted.add(video_id)
+            return True
+
+    def iter_video_bytes(self, video_id, start, end, chunk_size=64 * 1024):
+        """
+        Yields bytes start..end (inclusive) of the synthetic video. The content is a
+        repeating per-video 4 KB pattern, so any range can be produced without
+        holding the whole file in memory and resumed downloads line up.
+        """
+        seed = video_id.encode()
+        block = (seed * (4096 // len(seed) + 1))[:4096]
+        pattern = block * (chunk_size // len(block))
+        position = start
+        while position <= end:
+            offset = position % len(block)
+            length = min(len(pattern) - offset, end - position + 1)
+            yield pattern[offset:offset + length]
+            position += length
+
+
+class _Handler(BaseHTTPRequestHandler):
+    mock = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _fault(self):
+        """Applies injected latency; answers and returns True for an injected 429 or 500."""
+        status = self.mock.faults.draw() if self.mock.faults else None
+        if status is None:
+            return False
+        self.mock.count(f"fault_{status}")
+        self._send_json(status, {"error": "Too many requests" if status == 429 else "Internal server error",
+                                 "data": None})
+        return True
+
+    def _authorized(self):
+        if self.mock.api_key and self.headers.get("x-api-key") != self.mock.api_key:
+            self._send_json(401, {"error": "Unauthorized", "data": None})
+            return False
+        return True
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if path != "/v2/video/generate":
+            self._send_json(404, {"error": "Not found", "data": None})
+            return
+        self.mock.count("generate")
+        if self._fault() or not self._authorized():
+            return
+        try:
+            body = json.loads(raw or b"{}")
+            video_input = body["video_inputs"][0]
+            script = video_input["voice"]["input_text"]
+        except (ValueError, KeyError, IndexError, TypeError):
+            self._send_json(400, {"error": "Invalid video_inputs", "data": None})
+            return
+        video_id = self.mock.create_video(body.get("title", ""), script)
+        if video_id is None:
+            self._send_json(429, {"error": "Concurrent render limit reached", "data": None})
+            return
+        self._send_json(200, {"error": None, "data": {"video_id": video_id}})
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path == "/v1/video_status.get":
+            self.mock.count("status")
+            if self._fault() or not self._authorized():
+                return
+            video_id = parse_qs(parsed.query).get("video_id", [""])[0]
+            status = self.mock.status(video_id)
+            if status is None:
+                self._send_json(404, {"code": 404, "message": "Video not found", "data": None})
+                return
+            with self.mock.lock:
+                created_at = int(self.mock.videos[video_id]["submitted_at"])
+            data = {"id": video_id, "status": status, "created_at": created_at}
+            if status == "completed":
+                data["video_url"] = f"{self.mock.url}/videos/{video_id}.mp4"
+                data["thumbnail_url"] = f"{self.mock.url}/videos/{video_id}.jpg"
+            self._send_json(200, {"code": 100, "data": data, "message": "Success"})
+        elif parsed.path.startswith("/videos/") and parsed.path.endswith(".mp4"):
+            self._send_video(parsed.path[len("/videos/"):-len(".mp4")])
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_HEAD(self):
+        parsed = urlparse(self.path)
+        if parsed.path.startswith("/videos/") and parsed.path.endswith(".mp4"):
+            self._send_video(parsed.path[len("/videos/"):-len(".mp4")], head=True)
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    def _send_video(self, video_id, head=False):
+        if not head:
+            self.mock.count("download")
+        if self.mock.status(video_id) != "completed":
+            self._send_json(404, {"error": "Not found"})
+            return
+        size = self.mock.video_size
+        start, end = 0, size - 1
+        range_header = self.headers.get("Range")
+        if range_header:
+            match = re.match(r"bytes=(\d*)-(\d*)$", range_header.strip())
+            if match and match.group(1):
+                start = int(match.group(1))
+                if match.group(2):
+                    end = min(int(match.group(2)), size - 1)
+            elif match and match.group(2):
+                start = max(0, size - int(match.group(2)))
+            if not match or start >= size or start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        if head:
+            return
+
+        limit = None
+        if not range_header and self.mock.should_interrupt(video_id):
+            limit = self.mock.interrupt_after
+        sent = 0
+        for chunk in self.mock.iter_video_bytes(video_id, start, end):
+            if limit is not None and sent + len(chunk) > limit:
+                self.wfile.write(chunk[:limit - sent])
+                self.close_connection = True
+                return
+            self.wfile.write(chunk)
+            sent += len(chunk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock HeyGen API server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--render-seconds", type=float, default=5.0)
+    parser.add_argument("--video-size", type=int, default=1024 * 1024)
+    parser.add_argument("--max-concurrent-renders", type=int, default=None)
+    parser.add_argument("--interrupt-after", type=int, default=None)
+    parser.add_argument("--webhook-url", default=None, help="e.g. http://127.0.0.1:8787/heygen/webhook")
+    parser.add_argument("--webhook-drop-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = MockHeyGenServer(args.host, args.port, args.render_seconds, args.video_size,
+                              max_concurrent_renders=args.max_concurrent_renders,
+                              interrupt_after=args.interrupt_after,
+                              webhook_url=args.webhook_url,
+                              webhook_drop_rate=args.webhook_drop_rate)
+    print(f"Mock HeyGen API listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
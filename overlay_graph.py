@@ -0,0 +1,67 @@
+"""
+ffmpeg filter graph and command line for step6's avatar overlay render.
+
+Kept out of step6 (which builds its window at import) so the benchmarks can
+render exactly what step6 renders.
+"""
+
+# Overlay (HeyGen avatar) size as a fraction of the screen recording's width.
+DEFAULT_OVERLAY_SCALE = 0.14
+
+
+def build_filter_graph(job, encoder, scale=DEFAULT_OVERLAY_SCALE):
+    """Returns (filter_complex, overlay size) for one render_scheduler.RenderJob."""
+    # The overlay is a square 'scale' of the background video's width; its circular
+    # mask is drawn once per size and shared by every folder.
+    overlay_size = int(job.screen.width * scale)
+
+    # Build the filter chain:
+    # 1. Scale the overlay video (HeyGen) to overlay_size x overlay_size.
+    # 2. Give it an alpha plane and take the alpha from the precomputed circular mask
+    #    (a single PNG frame, repeated by alphamerge for the whole video).
+    # 3. Overlay the circular video onto the background at the fixed offset.
+    filter_complex = (
+        f"[1:v]scale={overlay_size}:{overlay_size},format=yuva420p[ovrl];"
+        "[2:v]format=gray[mask];"
+        "[ovrl][mask]alphamerge[circ];"
+        "[0:v][circ]overlay=main_w-overlay_w-543:270:shortest=1"
+        + encoder.filter_suffix
+        + "[outv]"
+    )
+    return filter_complex, overlay_size
+
+
+def audio_args(job):
+    """Copies the screen recording's audio, or the HeyGen audio if the recording has none."""
+    if job.screen.has_audio:
+        return ["-map", "0:a:0", "-c:a", "copy"]
+    if job.heygen.has_audio:
+        return ["-map", "1:a:0", "-c:a", "copy"]
+    return ["-an"]
+
+
+def render_command(job, encoder, filter_complex, mask_path, threads):
+    """The ffmpeg command rendering 'job' to job.output_path, with progress blocks on stdout."""
+    return (
+        ["ffmpeg", "-y"]                # Overwrite output
+        + ["-nostats", "-loglevel", "error"]  # Keep stdout to progress blocks and errors
+        + encoder.decode_args           # Hardware decoding, where the encoder path has it
+        + encoder.input_args
+        + [
+            "-i", job.screen_video,     # Background video (Screen Recording)
+            "-i", job.heygen_video,     # Overlay video (HeyGen Video)
+            "-i", mask_path,            # Circular alpha mask (PNG)
+            "-filter_complex", filter_complex,
+            "-filter_complex_threads", str(threads),
+            "-map", "[outv]",
+        ]
+        + encoder.encode_args()
+        + [
+            "-threads", str(threads),   # Encoder threads, sized by the scheduler
+        ]
+        + audio_args(job)               # Copy audio (background first)
+        + [
+            "-progress", "pipe:1",      # Send progress info to stdout
+            job.output_path,
+        ]
+    )
@@ -0,0 +1,41 @@
+"""
+Circular alpha masks for the step6 avatar overlay.
+
+The mask used to be computed by a geq expression on every pixel of every
+frame. It only depends on the overlay size, so it is drawn once per size as
+a grayscale PNG and applied with ffmpeg's alphamerge filter instead (which
+repeats the single mask frame for the whole video; FFmpeg 4.3 or newer).
+"""
+
+import os
+import threading
+
+from PIL import Image
+
+_lock = threading.Lock()
+
+
+def draw_circle_mask(size):
+    """
+    Returns a size x size "L" image: 255 inside the inscribed circle, 0 outside.
+    Uses the same test as the old geq expression, so the edge pixels match.
+    """
+    half = size / 2
+    radius_sq = half * half
+    rows = []
+    for y in range(size):
+        dy_sq = (y - half) ** 2
+        rows.append(bytes(0 if (x - half) ** 2 + dy_sq > radius_sq else 255 for x in range(size)))
+    return Image.frombytes("L", (size, size), b"".join(rows))
+
+
+def circle_mask_path(size, cache_dir):
+    """Path of the PNG mask for 'size', drawing it into 'cache_dir' on first use."""
+    path = os.path.join(cache_dir, f"circle_mask_{size}.png")
+    with _lock:
+        if not os.path.exists(path):
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = path + ".tmp.png"
+            draw_circle_mask(size).save(tmp_path)
+            os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,150 @@
+"""
+Smooth scrolling helpers for the LinkedIn recorder (step2).
+
+The ease-out cubic animation runs inside the page with requestAnimationFrame,
+so one scroll is a single WebDriver round-trip instead of one per 10ms tick.
+The old Python-driven loop is kept as legacy_smooth_scroll for comparison.
+"""
+
+import time
+import statistics
+import weakref
+
+
+# WebDriver's default script timeout (s), which covers scrolls of up to
+# DEFAULT_SCRIPT_TIMEOUT - SCRIPT_TIMEOUT_MARGIN seconds.
+DEFAULT_SCRIPT_TIMEOUT = 30
+SCRIPT_TIMEOUT_MARGIN = 10
+# Script timeout this module has raised each driver to (drivers are never lowered).
+_script_timeouts = weakref.WeakKeyDictionary()
+
+# Runs via execute_async_script. arguments[0] is the distance in px (negative
+# scrolls up), arguments[1] the duration in ms, the last argument is the
+# completion callback Selenium injects.
+EASE_OUT_CUBIC_SCROLL_JS = """
+var distance = arguments[0];
+var durationMs = arguments[1];
+var done = arguments[arguments.length - 1];
+var startY = window.pageYOffset;
+var start = null;
+var frames = [];
+
+function easeOutCubic(t) {
+    return 1 - Math.pow(1 - t, 3);
+}
+
+function step(now) {
+    if (start === null) {
+        start = now;
+    }
+    frames.push(now);
+    var t = durationMs > 0 ? Math.min((now - start) / durationMs, 1) : 1;
+    window.scrollTo(0, startY + easeOutCubic(t) * distance);
+    if (t < 1) {
+        window.requestAnimationFrame(step);
+    } else {
+        done({
+            frames: frames,
+            offset: window.pageYOffset,
+            innerHeight: window.innerHeight
+        });
+    }
+}
+
+window.requestAnimationFrame(step);
+"""
+
+
+def ease_out_cubic(t):
+    return 1 - (1 - t) ** 3
+
+
+class ScrollStats:
+    """Collects WebDriver command counts and frame timings across scrolls."""
+
+    def __init__(self):
+        self.scrolls = 0
+        self.commands = 0
+        self.frame_intervals_ms = []
+
+    def record(self, commands, frame_times_ms):
+        self.scrolls += 1
+        self.commands += commands
+        self.frame_intervals_ms.extend(
+            b - a for a, b in zip(frame_times_ms, frame_times_ms[1:])
+        )
+
+    def summary(self):
+        """Returns a dict with command counts and frame-time mean/variance (ms)."""
+        intervals = self.frame_intervals_ms
+        return {
+            "scrolls": self.scrolls,
+            "commands": self.commands,
+            "commands_per_scroll": self.commands / self.scrolls if self.scrolls else 0,
+            "frames": len(intervals),
+            "frame_mean_ms": statistics.fmean(intervals) if intervals else 0.0,
+            "frame_variance_ms2": statistics.pvariance(intervals) if intervals else 0.0,
+            "frame_max_ms": max(intervals) if intervals else 0.0,
+        }
+
+    def format_summary(self, label="scroll"):
+        s = self.summary()
+        return (
+            f"{label}: {s['scrolls']} scrolls, {s['commands']} WebDriver commands "
+            f"({s['commands_per_scroll']:.1f}/scroll), frame mean {s['frame_mean_ms']:.2f}ms, "
+            f"variance {s['frame_variance_ms2']:.2f}ms², max {s['frame_max_ms']:.2f}ms"
+        )
+
+
+def smooth_scroll(driver, distance, duration=1, stats=None):
+    """
+    Scrolls by 'distance' px (negative for up) over 'duration' seconds inside the page.
+    Blocks until the animation's completion callback fires and returns a dict with
+    the final 'offset' (window.pageYOffset) and 'innerHeight'.
+
+    The driver's script timeout is only changed when the scroll would outlast it,
+    and then raised once for all later scrolls; it is never lowered.
+    """
+    commands = 1
+    timeout = duration + SCRIPT_TIMEOUT_MARGIN
+    if timeout > _script_timeouts.get(driver, DEFAULT_SCRIPT_TIMEOUT):
+        driver.set_script_timeout(timeout)
+        _script_timeouts[driver] = timeout
+        commands += 1
+    result = driver.execute_async_script(EASE_OUT_CUBIC_SCROLL_JS, distance, duration * 1000)
+    if stats is not None:
+        stats.record(commands=commands, frame_times_ms=result.get("frames", []))
+    return result
+
+
+def legacy_smooth_scroll(driver, distance, duration=1, stats=None):
+    """
+    The original Python-driven animation: one window.scrollBy round-trip every 10ms.
+    Kept for benchmarking against smooth_scroll.
+    """
+    start_time = time.time()
+    last_scroll_amount = 0
+    frame_times_ms = []
+    commands = 0
+
+    while True:
+        elapsed = time.time() - start_time
+        if elapsed > duration:
+            break
+
+        eased = ease_out_cubic(elapsed / duration)
+        scroll_amount = eased * distance
+        inc = scroll_amount - last_scroll_amount
+        last_scroll_amount = scroll_amount
+
+        driver.execute_script(f"window.scrollBy(0, {inc});")
+        commands += 1
+        frame_times_ms.append((time.time() - start_time) * 1000)
+        time.sleep(0.01)
+
+    offset = driver.execute_script("return window.pageYOffset")
+    inner_height = driver.execute_script("return window.innerHeight")
+    commands += 2
+    if stats is not None:
+        stats.record(commands=commands, frame_times_ms=frame_times_ms)
+    return {"offset": offset, "innerHeight": inner_height}
@@ -0,0 +1,269 @@
+"""
+Command-line front end for running pipeline stages from a shared work queue.
+
+The queue database, the CSV and the main folder live on shared storage; any
+number of machines run `work` for the stages they can handle. Workers write
+their artifacts (ocr_combined.txt, downloaded videos) straight into the lead
+folders and leave their results in the queue; `export` then writes them into
+the CSV in one place, so workers never rewrite the CSV concurrently.
+
+Stages (the network-bound parts of steps 1, 3, 4 and 5):
+    search    serper.dev lookup for each row     -> CSV columns 4-5, match confidence in column 9
+    script    OCR + ChatGPT for each lead folder -> CSV columns 6-7
+    submit    HeyGen API submission              -> CSV column 8
+    download  HeyGen render polling + download   -> <folder>/HeyGen Video/video.mp4
+
+Usage:
+    python pipeline_worker.py enqueue  --db /shared/queue.db --stage search --csv /shared/leads.csv
+    python pipeline_worker.py work     --db /shared/queue.db --stage search --threads 8 [--metrics-port 9464]
+    python pipeline_worker.py status   --db /shared/queue.db
+    python pipeline_worker.py export   --db /shared/queue.db --stage search --csv /shared/leads.csv
+
+Paths in jobs are relative to --main-folder, so each machine can mount the
+shared folder wherever it likes. The submit and download stages read
+HEYGEN_API_KEY (and HEYGEN_AVATAR_ID / HEYGEN_VOICE_ID) from the environment.
+Rows below MIN_MATCH_CONFIDENCE (see lead_scoring.py) are not enqueued for the
+script and submit stages; pass --csv when enqueueing script jobs to apply it.
+"""
+
+import argparse
+import csv
+import os
+import threading
+
+from folder_index import get_index
+from lead_scoring import MATCH_CONFIDENCE_FIELD, best_matches, confidence_column, format_confidence, low_confidence
+from profiling import enable
+from tracing import start_metrics_server, tracer
+from work_queue import Retry, Worker, WorkQueue
+
+STAGES = ("search", "script", "submit", "download")
+# Delay before a still-rendering video is checked again (s); see work_queue.DEFAULT_MAX_RETRIES.
+RENDER_RETRY_SECONDS = 30
+# Delay after the HeyGen API reports its concurrency quota is full (s).
+RATE_LIMIT_RETRY_SECONDS = 60
+
+
+def read_csv(path):
+    with open(path, mode="r", encoding="utf-8-sig") as f:
+        return list(csv.reader(f))
+
+
+def write_csv(path, rows):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, mode="w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(rows)
+    os.replace(tmp_path, path)
+
+
+def pad(row, length):
+    if len(row) < length:
+        row.extend([""] * (length - len(row)))
+    return row
+
+
+# ----------------------------------------------------------------------
+# Enqueue: one job per CSV row / lead folder, keyed by CSV row number
+# ----------------------------------------------------------------------
+def stage_jobs(stage, csv_path=None, main_folder=None):
+    """(key, payload) tuples for every row or folder that still needs 'stage'."""
+    jobs = []
+    rows = read_csv(csv_path) if csv_path else [[]]
+    confidence_col = confidence_column(rows[0])
+    if stage == "script":
+        for row_number, folder, _ in get_index(main_folder).items():
+            if row_number <= len(rows) and low_confidence(rows[row_number - 1], confidence_col) is not None:
+                continue
+            jobs.append((row_number, {"folder": folder}))
+        return jobs
+
+    index = get_index(main_folder) if stage == "download" else None
+    for row_number, row in enumerate(rows[1:], start=2):
+        if stage == "search" and len(row) >= 3:
+            jobs.append((row_number, {"row": row_number, "first_name": row[0], "last_name": row[1],
+                                      "company": row[2]}))
+        elif stage == "submit" and len(row) >= 7 and row[6].strip() and not pad(row, 8)[7].strip() \
+                and low_confidence(row, confidence_col) is None:
+            jobs.append((row_number, {"row": row_number, "script": row[6], "title": row[5]}))
+        elif stage == "download" and len(row) >= 8 and row[7].strip():
+            folder_path = index.path(row_number)
+            if folder_path and not os.path.exists(os.path.join(folder_path, "HeyGen Video", "video.mp4")):
+                jobs.append((row_number, {"row": row_number, "video_id": row[7].strip(),
+                                          "folder": os.path.basename(folder_path)}))
+    return jobs
+
+
+# ----------------------------------------------------------------------
+# Handlers: payload -> JSON result (imports are deferred to the stage used)
+# ----------------------------------------------------------------------
+def make_handler(stage, main_folder=None):
+    if stage == "search":
+        from step1_new import build_query, search_candidates
+
+        def handle(payload, checkpoint):
+            lead = (payload["first_name"], payload["last_name"], payload["company"])
+            with tracer.span(payload.get("row"), "search") as span:
+                organic = search_candidates(build_query(*lead))
+                if not organic:
+                    span.fail("No result found")
+            (title, url, confidence), = best_matches([lead], [organic])
+            if not (title and url):
+                title, url = "No result found", ""
+            return {"title": title, "url": url, "confidence": confidence}
+        return handle
+
+    if stage == "script":
+        from step3_new import build_profile_script
+
+        def handle(payload, checkpoint):
+            script, _ = build_profile_script(os.path.join(main_folder, payload["folder"]))
+            return {"folder": payload["folder"], "script": script}
+        return handle
+
+    if stage == "submit":
+        from heygen_client import HeyGenClient, HeyGenError
+        client = HeyGenClient(os.environ.get("HEYGEN_API_KEY", ""),
+                              avatar_id=os.environ.get("HEYGEN_AVATAR_ID", ""),
+                              voice_id=os.environ.get("HEYGEN_VOICE_ID", ""))
+
+        def handle(payload, checkpoint):
+            if payload.get("video_id"):
+                # An earlier run already paid for this video but did not finish the job.
+                return {"video_id": payload["video_id"]}
+            try:
+                with tracer.span(payload.get("row"), "submit"):
+                    video_id = client.generate_video(payload["script"], payload["title"])
+            except HeyGenError as e:
+                if e.rate_limited:
+                    raise Retry(str(e), delay=RATE_LIMIT_RETRY_SECONDS)
+                raise
+            checkpoint(video_id=video_id)
+            return {"video_id": video_id}
+        return handle
+
+    if stage == "download":
+        from video_downloader import DownloadEngine, DownloadJob
+        engine = DownloadEngine(os.environ.get("HEYGEN_API_KEY", ""))
+
+        def handle(payload, checkpoint):
+            data = engine.fetch_status(payload["video_id"])
+            status = data.get("status")
+            if status in ("processing", "pending", "waiting"):
+                raise Retry(f"video is {status}", delay=RENDER_RETRY_SECONDS)
+            if status != "completed":
+                raise RuntimeError(data.get("error") or f"Unexpected video status: {status}")
+            dest_dir = os.path.join(main_folder, payload["folder"], "HeyGen Video")
+            os.makedirs(dest_dir, exist_ok=True)
+            dest_path = os.path.join(dest_dir, "video.mp4")
+            job = DownloadJob(payload.get("row", payload["folder"]), payload["video_id"], dest_path)
+            size = engine.download(job, data["video_url"])
+            return {"bytes": size}
+        return handle
+
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+# ----------------------------------------------------------------------
+# Export: results -> CSV columns (a single writer)
+# ----------------------------------------------------------------------
+def export_results(stage, results, csv_path):
+    rows = read_csv(csv_path)
+    header = rows[0]
+    columns = {"search": (3, ["Title", "URL", "Profile Folder", "OpenAI Response", "Video ID"]),
+               "script": (5, ["Profile Folder", "OpenAI Response"]),
+               "submit": (7, ["Video ID"])}
+    if stage not in columns:
+        return 0
+    first, names = columns[stage]
+    pad(header, first + len(names))
+    for offset, name in enumerate(names):
+        header[first + offset] = header[first + offset] or name
+    width = len(header)
+    confidence_col = None
+    if stage == "search":
+        # The confidence goes wherever the readers will look for it: the header's column.
+        confidence_col = confidence_column(header)
+        if confidence_col is None:
+            header.append(MATCH_CONFIDENCE_FIELD)
+            confidence_col = len(header) - 1
+        width = len(header)
+
+    updated = 0
+    for key, result in results.items():
+        index = int(key) - 1
+        if result is None or not 1 <= index < len(rows):
+            continue
+        row = pad(rows[index], width if stage == "search" else first + len(names))
+        if stage == "search":
+            row[3], row[4] = result["title"], result["url"]
+            if "confidence" in result:
+                row[confidence_col] = format_confidence(result["confidence"])
+        elif stage == "script":
+            row[5], row[6] = result["folder"], result["script"]
+        elif stage == "submit":
+            row[7] = result["video_id"]
+        updated += 1
+    write_csv(csv_path, rows)
+    return updated
+
+
+def run_workers(queue, stage, handler, threads):
+    """Runs 'threads' workers in this process until the stage is drained; returns summed stats."""
+    workers = [Worker(queue, stage, handler, on_event=print) for _ in range(threads)]
+    pool = [threading.Thread(target=worker.run) for worker in workers]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return {key: sum(worker.stats[key] for worker in workers) for key in workers[0].stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run pipeline stages from a shared work queue.")
+    parser.add_argument("command", choices=("enqueue", "work", "status", "export", "requeue"))
+    parser.add_argument("--db", required=True, help="Queue database on shared storage.")
+    parser.add_argument("--stage", choices=STAGES)
+    parser.add_argument("--csv", help="Main CSV (enqueue/export).")
+    parser.add_argument("--main-folder", help="Folder holding the per-lead folders, as mounted here.")
+    parser.add_argument("--threads", type=int, default=4, help="Workers in this process (work).")
+    parser.add_argument("--lease", type=float, default=60, help="Lease length in seconds.")
+    parser.add_argument("--profile", action="store_true", help="Profile the stage's hot functions (work).")
+    parser.add_argument("--metrics-port", type=int, help="Serve this worker's stage metrics on /metrics (work).")
+    args = parser.parse_args()
+
+    queue = WorkQueue(args.db, lease_seconds=args.lease)
+    if args.command == "status":
+        for stage in STAGES:
+            counts = queue.counts(stage)
+            if counts:
+                print(f"{stage:>9}: " + ", ".join(f"{state} {count}" for state, count in sorted(counts.items())))
+        return
+    if not args.stage:
+        parser.error("--stage is required")
+    if args.command == "enqueue" and args.stage != "script" and not args.csv:
+        parser.error(f"--csv is required to enqueue {args.stage} jobs")
+    if args.stage in ("script", "download") and args.command in ("enqueue", "work") and not args.main_folder:
+        parser.error(f"--main-folder is required for the {args.stage} stage")
+    if args.command == "export" and not args.csv:
+        parser.error("--csv is required to export")
+
+    if args.command == "enqueue":
+        added = queue.enqueue_many(args.stage, stage_jobs(args.stage, args.csv, args.main_folder))
+        print(f"Queued {added} new {args.stage} jobs.")
+    elif args.command == "work":
+        if args.metrics_port:
+            start_metrics_server(args.metrics_port)
+        if args.profile:
+            enable(f"worker_{args.stage}")
+        stats = run_workers(queue, args.stage, make_handler(args.stage, args.main_folder), args.threads)
+        print(f"{args.stage}: {stats['done']} done, {stats['failed']} failed, {stats['retried']} retried, "
+              f"{stats['lost']} lost to other workers.")
+    elif args.command == "export":
+        updated = export_results(args.stage, queue.results(args.stage), args.csv)
+        print(f"Wrote {updated} {args.stage} results to {args.csv}.")
+    elif args.command == "requeue":
+        print(f"Requeued {queue.requeue_failed(args.stage)} failed {args.stage} jobs.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Opt-in cProfile hooks for the step scripts.
+
+Hot functions are decorated with @profiled. Normally the decorator only
+checks a flag; once a step is started with --profile, each call runs under
+a cProfile profiler belonging to the calling thread, so worker threads are
+profiled separately. At exit every thread's profile is written to
+logs/profiles/<stage>-<thread>-<pid>.prof, merged into <stage>.prof and
+summarised in <stage>-summary.txt.
+
+    python step3_new.py --profile
+    python profiling.py summary            # merges every stage's .prof into summary.txt
+    python -m pstats logs/profiles/step3.prof
+
+On Python 3.12+ only one cProfile profiler can run at a time, so calls made
+while another thread is being profiled run unprofiled (they are counted in
+the summary).
+"""
+
+import argparse
+import atexit
+import cProfile
+import functools
+import glob
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+
+from log_view import LOG_DIR
+
+PROFILE_DIR = os.path.join(LOG_DIR, "profiles")
+# Functions listed in the text summaries.
+SUMMARY_LIMIT = 40
+
+_stage = None
+_local = threading.local()
+_profiles = []            # (thread name, profiler) for every profiled thread
+_lock = threading.Lock()
+_skipped = 0
+
+
+def enable(stage):
+    """Turns profiling on for this process; profiles are written at exit under 'stage'."""
+    global _stage
+    if _stage is None:
+        atexit.register(write_profiles)
+    _stage = stage
+
+
+def enable_from_argv(stage, argv=None):
+    """Enables profiling if '--profile' is on the command line (and removes it, e.g. for QApplication)."""
+    argv = sys.argv if argv is None else argv
+    if "--profile" not in argv:
+        return False
+    argv.remove("--profile")
+    enable(stage)
+    return True
+
+
+def profiled(func):
+    """Profiles calls to 'func' in the calling thread while profiling is enabled."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _stage is None or getattr(_local, "depth", 0):
+            # Off, or already inside a profiled call on this thread.
+            return func(*args, **kwargs)
+        profiler = getattr(_local, "profiler", None)
+        if profiler is None:
+            profiler = _local.profiler = cProfile.Profile()
+            with _lock:
+                _profiles.append((threading.current_thread().name, profiler))
+        try:
+            profiler.enable()
+        except ValueError:
+            global _skipped
+            with _lock:
+                _skipped += 1
+            return func(*args, **kwargs)
+        _local.depth = 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.depth = 0
+            profiler.disable()
+
+    return wrapper
+
+
+def format_summary(stats, title, limit=SUMMARY_LIMIT):
+    out = io.StringIO()
+    out.write(f"{title}\n\n")
+    stats.stream = out
+    stats.sort_stats("cumulative").print_stats(limit)
+    stats.sort_stats("tottime").print_stats(limit)
+    return out.getvalue()
+
+
+def write_profiles(folder=PROFILE_DIR):
+    """Writes each thread's profile, the stage's merged profile and its text summary; returns the merged path."""
+    with _lock:
+        profiles = list(_profiles)
+    if _stage is None or not profiles:
+        return None
+    os.makedirs(folder, exist_ok=True)
+    merged = None
+    for thread_name, profiler in profiles:
+        if not profiler.getstats():
+            # Every call on this thread was skipped.
+            continue
+        safe_name = re.sub(r"[^\w.-]+", "_", thread_name)
+        path = os.path.join(folder, f"{_stage}-{safe_name}-{os.getpid()}.prof")
+        profiler.dump_stats(path)
+        if merged is None:
+            merged = pstats.Stats(path)
+        else:
+            merged.add(path)
+    if merged is None:
+        return None
+
+    merged_path = os.path.join(folder, f"{_stage}.prof")
+    merged.dump_stats(merged_path)
+    title = f"{_stage}: {len(profiles)} profiled threads, {_skipped} calls skipped"
+    with open(os.path.join(folder, f"{_stage}-summary.txt"), "w", encoding="utf-8") as f:
+        f.write(format_summary(merged, title))
+    return merged_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge the per-stage profiles into one summary.")
+    parser.add_argument("command", choices=("summary",))
+    parser.add_argument("--dir", default=PROFILE_DIR, help="Folder holding the .prof files.")
+    parser.add_argument("--limit", type=int, default=SUMMARY_LIMIT, help="Functions listed per table.")
+    args = parser.parse_args()
+
+    # Merged per-stage files only: the per-thread ones are already folded into them.
+    paths = sorted(p for p in glob.glob(os.path.join(args.dir, "*.prof")) if "-" not in os.path.basename(p))
+    if not paths:
+        parser.error(f"no stage profiles in {args.dir}; run a step with --profile first")
+    stats = pstats.Stats(paths[0])
+    for path in paths[1:]:
+        stats.add(path)
+    summary_path = os.path.join(args.dir, "summary.txt")
+    stages = ", ".join(os.path.splitext(os.path.basename(p))[0] for p in paths)
+    with open(summary_path, "w", encoding="utf-8") as f:
+        f.write(format_summary(stats, f"Merged profile of {stages}", args.limit))
+    print(f"Wrote {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Token-budgeted prompt assembly for step3's script call.
+
+OCR.space responses are trimmed to their text (the JSON envelope, blank lines
+and lines repeated by overlapping screenshots are dropped) before they reach
+the prompt. Tokens are counted locally with tiktoken when it is installed,
+otherwise estimated from the text length.
+
+A profile whose prompt fits PROMPT_TOKEN_BUDGET is sent in one call, as
+before. A longer one goes through map-reduce: the screenshots are grouped
+into chunks of about CHUNK_TOKENS, each chunk is summarized in parallel, and
+the script is written from the summaries (summaries that are still too long
+are summarized again). Every profile's prompt sizes, call count and latency
+are returned for logging and tracing.
+
+Usage:
+    python prompt_budget.py ocr_combined.txt [--budget 6000]   # prints the token count and the path it would take
+"""
+
+import argparse
+import concurrent.futures
+import json
+import math
+import os
+import threading
+import time
+
+try:
+    import tiktoken
+except ImportError:  # Token counts fall back to a length estimate
+    tiktoken = None
+
+# Largest prompt (instructions + OCR text) sent in a single call, in tokens.
+PROMPT_TOKEN_BUDGET = int(os.environ.get("PROMPT_TOKEN_BUDGET", "6000"))
+# Target size of one map-step chunk, in tokens.
+CHUNK_TOKENS = 2500
+# Chunk summaries requested at the same time.
+MAP_WORKERS = 4
+# Times the summaries are summarized again before the prompt is sent regardless of its size.
+MAX_REDUCE_ROUNDS = 3
+# Characters per token for the estimate when tiktoken is missing (English text).
+CHARS_PER_TOKEN = 4
+
+SUMMARY_INSTRUCTIONS = (
+    "The below text is the OCR output of some screenshots from someone's LinkedIn profile. "
+    "List every fact that could be used in a personal networking message: their name, current role and company, "
+    "past roles, education, locations, achievements, posts and interests. "
+    "Use short bullet points, keep names, numbers and places exactly as written, and leave out "
+    "LinkedIn interface text, ads and other people's profiles. Output only the list. The OCR output is below:\n\n"
+)
+SUMMARIES_HEADER = "Summaries of the profile's screenshots (the full OCR text was too long to include):\n\n"
+
+_encodings = {}
+
+
+def count_tokens(text, model="gpt-3.5-turbo"):
+    if tiktoken is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    encoding = _encodings.get(model)
+    if encoding is None:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        _encodings[model] = encoding
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def ocr_text(ocr_response):
+    """The recognized text of an OCR.space response (its error message if it has none; raw text if not JSON)."""
+    try:
+        data = json.loads(ocr_response)
+    except (TypeError, json.JSONDecodeError):
+        return str(ocr_response).strip()
+    if not isinstance(data, dict):
+        return str(ocr_response).strip()
+    texts = [result.get("ParsedText", "") for result in data.get("ParsedResults") or []]
+    text = "\n".join(t for t in texts if t and t.strip())
+    if text:
+        return text
+    error = data.get("ErrorMessage") or "no text recognized"
+    return f"OCR error: {' '.join(error) if isinstance(error, list) else error}"
+
+
+def trim_sections(texts):
+    """Drops blank lines and lines already seen in an earlier screenshot (scrolling overlap)."""
+    seen = set()
+    sections = []
+    for text in texts:
+        lines = []
+        for line in text.splitlines():
+            line = " ".join(line.split())
+            if line and line not in seen:
+                seen.add(line)
+                lines.append(line)
+        sections.append("\n".join(lines))
+    return sections
+
+
+def join_sections(sections, label="Screenshot"):
+    return "".join(f"{label} {i}:\n{section}\n\n" for i, section in enumerate(sections, start=1) if section)
+
+
+def chunk_sections(sections, limit, model="gpt-3.5-turbo"):
+    """Groups consecutive sections into chunks of at most about 'limit' tokens (long sections are split by line)."""
+    pieces = []
+    for section in sections:
+        if count_tokens(section, model) <= limit:
+            pieces.append(section)
+            continue
+        lines, size = [], 0
+        for line in section.splitlines():
+            tokens = count_tokens(line, model) + 1
+            if lines and size + tokens > limit:
+                pieces.append("\n".join(lines))
+                lines, size = [], 0
+            lines.append(line)
+            size += tokens
+        if lines:
+            pieces.append("\n".join(lines))
+
+    chunks, current, size = [], [], 0
+    for piece in pieces:
+        tokens = count_tokens(piece, model)
+        if current and size + tokens > limit:
+            chunks.append(current)
+            current, size = [], 0
+        current.append(piece)
+        size += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def write_script(sections, complete, build_prompt, model="gpt-3.5-turbo", budget=PROMPT_TOKEN_BUDGET,
+                 chunk_tokens=CHUNK_TOKENS, workers=MAP_WORKERS):
+    """
+    Writes the script for one profile within the token budget.
+
+    :param sections: Trimmed OCR text of each screenshot, in order.
+    :param complete: Callable(prompt) -> response text; exceptions propagate.
+    :param build_prompt: Callable(ocr_text) -> the full script prompt.
+    :param model: Model name, for token counting.
+    :param budget: Largest prompt sent in one call (tokens).
+    :param chunk_tokens: Target size of one map-step chunk (tokens).
+    :param workers: Chunk summaries requested at the same time.
+    :return: (script, stats) where stats has mode, rounds, calls, prompt_tokens (all calls),
+             final_prompt_tokens and seconds.
+    """
+    start = time.perf_counter()
+    stats = {"mode": "single", "calls": 0, "prompt_tokens": 0, "rounds": 0}
+    lock = threading.Lock()
+
+    def call(prompt):
+        tokens = count_tokens(prompt, model)
+        with lock:
+            stats["calls"] += 1
+            stats["prompt_tokens"] += tokens
+        return complete(prompt)
+
+    prompt = build_prompt(join_sections(sections))
+    tokens = count_tokens(prompt, model)
+    if tokens > budget:
+        stats["mode"] = "map-reduce"
+        limit = max(1, min(chunk_tokens, budget - count_tokens(SUMMARY_INSTRUCTIONS, model)))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            while tokens > budget and stats["rounds"] < MAX_REDUCE_ROUNDS:
+                chunks = chunk_sections(sections, limit, model)
+                sections = list(executor.map(call, [SUMMARY_INSTRUCTIONS + "\n\n".join(chunk) for chunk in chunks]))
+                stats["rounds"] += 1
+                prompt = build_prompt(SUMMARIES_HEADER + join_sections(sections, label="Part"))
+                tokens = count_tokens(prompt, model)
+
+    stats["final_prompt_tokens"] = tokens
+    script = call(prompt)
+    stats["seconds"] = time.perf_counter() - start
+    return script, stats
+
+
+def format_stats(stats):
+    text = (f"{stats['mode']}, {stats['calls']} calls, {stats['prompt_tokens']} prompt tokens "
+            f"(final prompt {stats['final_prompt_tokens']})")
+    if "seconds" in stats:
+        text += f", {stats['seconds']:.1f}s"
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the token count and prompt path for a profile's OCR text.")
+    parser.add_argument("ocr_file", help="A lead folder's ocr_combined.txt.")
+    parser.add_argument("--budget", type=int, default=PROMPT_TOKEN_BUDGET)
+    parser.add_argument("--chunk-tokens", type=int, default=CHUNK_TOKENS)
+    parser.add_argument("--model", default="gpt-3.5-turbo")
+    args = parser.parse_args()
+
+    with open(args.ocr_file, encoding="utf-8") as f:
+        text = f.read()
+    counter = "tiktoken" if tiktoken is not None else f"estimate ({CHARS_PER_TOKEN} chars/token)"
+    tokens = count_tokens(text, args.model)
+    print(f"{tokens} tokens of OCR text (without the instructions), counted with {counter}.")
+    if tokens <= args.budget:
+        print(f"Within the {args.budget}-token budget: one call.")
+    else:
+        chunks = chunk_sections([text], args.chunk_tokens, args.model)
+        print(f"Over the {args.budget}-token budget: {len(chunks)} chunk summaries, then the script.")
+
+
+if __name__ == "__main__":
+    main()
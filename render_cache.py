@@ -0,0 +1,74 @@
+"""
+Build manifest for step6's "Final Video" folder.
+
+For each output the manifest records the size and modification time of both
+input videos and of the output itself, plus a hash of the ffmpeg settings
+(filter graph and encoder options) used to make it. Like make, an output is
+rendered again only when an input, the settings or the output file changed,
+so a run after adding new leads renders just those leads.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+MANIFEST_NAME = ".render_manifest.json"
+
+
+def file_signature(path):
+    """[size, mtime_ns] of 'path', or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def settings_hash(*parts):
+    """Stable hash of the render settings ('parts' are strings or lists of strings)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(json.dumps(part).encode())
+    return digest.hexdigest()[:16]
+
+
+class RenderManifest:
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.entries = {}
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def _inputs(self, inputs):
+        return {role: file_signature(path) for role, path in inputs.items()}
+
+    def is_current(self, output_path, inputs, settings):
+        """
+        True if 'output_path' was rendered from these exact inputs and settings.
+        'inputs' maps a role ("screen", "heygen") to the input's path.
+        """
+        with self._lock:
+            entry = self.entries.get(os.path.basename(output_path))
+        return (entry is not None
+                and entry["settings"] == settings
+                and entry["inputs"] == self._inputs(inputs)
+                and entry["output"] == file_signature(output_path))
+
+    def record(self, output_path, inputs, settings):
+        """Stores a successful render and writes the manifest."""
+        entry = {
+            "inputs": self._inputs(inputs),
+            "settings": settings,
+            "output": file_signature(output_path),
+        }
+        with self._lock:
+            self.entries[os.path.basename(output_path)] = entry
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, indent=1)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,126 @@
+"""
+Concurrency planning for step6's ffmpeg renders.
+
+ffmpeg is multi-threaded itself, so a fixed pool of 3 renders oversubscribes
+small machines and leaves large ones idle. The number of parallel renders
+and the threads given to each are derived from the core count and the
+encoder: libx264 stops scaling at around THREADS_PER_CPU_JOB threads, while
+hardware encoders are limited by their encode sessions and only need CPU for
+decoding and filtering. Jobs are started longest first, which keeps one long
+video from starting last and stretching the run.
+"""
+
+import os
+import threading
+import time
+import concurrent.futures
+
+# Threads per libx264 render; the core count is split into renders of this size.
+THREADS_PER_CPU_JOB = 8
+# Parallel renders for hardware encoders (consumer NVENC allows ~3-5 sessions).
+HARDWARE_SESSIONS = {"videotoolbox": 3, "nvenc": 3, "qsv": 4, "vaapi": 4}
+
+
+def plan_concurrency(encoder_name, cpu_count=None):
+    """Returns (parallel renders, threads per render) for 'encoder_name' on this machine."""
+    cpu_count = cpu_count or os.cpu_count() or 1
+    if encoder_name in HARDWARE_SESSIONS:
+        jobs = min(HARDWARE_SESSIONS[encoder_name], cpu_count)
+    else:
+        jobs = max(1, cpu_count // THREADS_PER_CPU_JOB)
+    return jobs, max(1, cpu_count // jobs)
+
+
+class RenderJob:
+    """One folder's render; 'screen' and 'heygen' are media_probe.MediaInfo for the two inputs."""
+
+    def __init__(self, name, screen, heygen, output_path):
+        self.name = name
+        self.screen = screen
+        self.heygen = heygen
+        self.output_path = output_path
+
+    @property
+    def screen_video(self):
+        return self.screen.path
+
+    @property
+    def heygen_video(self):
+        return self.heygen.path
+
+    @property
+    def duration(self):
+        # The overlay uses shortest=1, so the output is as long as the shorter input.
+        return min(self.screen.duration, self.heygen.duration)
+
+    @property
+    def inputs(self):
+        return {"screen": self.screen_video, "heygen": self.heygen_video}
+
+
+class RenderScheduler:
+    """
+    :param encoder_name: EncoderChoice.name of the encoder in use.
+    :param cpu_count: Cores to plan for (default: all).
+    :param max_jobs: Upper bound on parallel renders (None = planned value).
+    """
+
+    def __init__(self, encoder_name, cpu_count=None, max_jobs=None):
+        self.cpu_count = cpu_count or os.cpu_count() or 1
+        self.jobs, self.threads = plan_concurrency(encoder_name, self.cpu_count)
+        if max_jobs:
+            self.jobs = min(self.jobs, max_jobs)
+        self._lock = threading.Lock()
+        self.stats = {}
+        self.errors = []          # (job name, exception) for renders that raised
+
+    def run(self, jobs, render):
+        """
+        Runs render(job, threads) for every job, longest duration first.
+        'render' returns the number of frames it encoded (or None). A render that
+        raises is recorded in self.errors and counted as failed; the others go on.
+        """
+        ordered = sorted(jobs, key=lambda job: job.duration, reverse=True)
+        frames = [0]
+        self.errors = []
+
+        def run_one(job):
+            try:
+                encoded = render(job, self.threads)
+            except Exception as e:
+                print(f"Error rendering {job.name}: {e}")
+                with self._lock:
+                    self.errors.append((job.name, e))
+                return
+            with self._lock:
+                frames[0] += encoded or 0
+
+        cpu_start = os.times()
+        start = time.monotonic()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            for future in [executor.submit(run_one, job) for job in ordered]:
+                future.result()
+        wall = time.monotonic() - start
+        cpu_end = os.times()
+        # ffmpeg runs as child processes, so their CPU time shows up once they are reaped.
+        cpu_seconds = ((cpu_end.children_user - cpu_start.children_user)
+                       + (cpu_end.children_system - cpu_start.children_system))
+
+        self.stats = {
+            "renders": len(ordered),
+            "failed": len(self.errors),
+            "parallel": self.jobs,
+            "threads": self.threads,
+            "frames": frames[0],
+            "elapsed_seconds": round(wall, 2),
+            "fps": round(frames[0] / wall, 1) if wall else 0.0,
+            "cpu_seconds": round(cpu_seconds, 1),
+            "utilization": round(cpu_seconds / (wall * self.cpu_count), 3) if wall else 0.0,
+        }
+        return self.stats
+
+    def format_stats(self):
+        s = self.stats
+        return (f"{s['renders']} renders ({s['failed']} failed), {s['parallel']} at a time x {s['threads']} threads: "
+                f"{s['frames']} frames in {s['elapsed_seconds']}s ({s['fps']} fps), "
+                f"CPU utilization {s['utilization']:.0%} of {self.cpu_count} cores")
@@ -0,0 +1,199 @@
+"""
+Background screenshot writer for the LinkedIn recorder (step2).
+
+Captured frames are handed to a bounded queue and cropped, encoded and written
+on a separate thread, so disk and encode time no longer comes out of the
+scroll loop's timing budget. Each file is closed once written and the files
+are fsynced in batches by path; a failed write removes its partial file, so
+step3 never OCRs a truncated screenshot.
+"""
+
+import os
+import queue
+import threading
+import time
+
+# Encoder settings per output format. PNG at compress_level=1 is several times
+# faster than Pillow's default (6); lossless WebP at method=0 is the fastest
+# WebP mode and still produces smaller files than PNG.
+FORMATS = {
+    "png": {"extension": ".png", "format": "PNG", "params": {"compress_level": 1}},
+    "webp": {"extension": ".webp", "format": "WEBP", "params": {"lossless": True, "method": 0}},
+}
+
+_STOP = object()
+
+
+def screenshot_crop_box(width, height):
+    """
+    Crop box (left, top, right, bottom) for a full-screen capture: removes the
+    top 290/1800 (~16.11%) and the right 950/2880 (~32.99%) of the screen,
+    scaled to the actual screenshot size so nothing is squeezed.
+    """
+    crop_top = int(height * (290 / 1800))
+    crop_right = int(width * (950 / 2880))
+    return (0, crop_top, width - crop_right, height)
+
+
+class ScreenshotWriter:
+    """
+    Encodes and writes screenshots on a background thread.
+
+    :param image_format: "png" or "webp".
+    :param max_queue: Maximum number of frames waiting to be written.
+    :param block: When the queue is full, block the caller (backpressure) if True,
+                  otherwise drop the frame.
+    :param fsync_every: Number of written files to collect before fsyncing them.
+    :param on_saved: Optional callback(path) after each file is written.
+    :param on_error: Optional callback(path, exception) when a write fails.
+    """
+
+    def __init__(self, image_format="png", max_queue=16, block=True, fsync_every=10,
+                 on_saved=None, on_error=None):
+        if image_format not in FORMATS:
+            raise ValueError(f"Unsupported screenshot format: {image_format}")
+        self.image_format = image_format
+        self.extension = FORMATS[image_format]["extension"]
+        self.block = block
+        self.fsync_every = max(1, fsync_every)
+        self.on_saved = on_saved
+        self.on_error = on_error
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._known_dirs = set()
+        self._unsynced = []
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.blocked_seconds = 0.0
+        self.high_water = 0
+        self.encode_seconds = 0.0
+        self.fsyncs = 0
+        self.errors = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="screenshot-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, image, path, crop_box=None):
+        """
+        Queues 'image' to be cropped to 'crop_box' (if given) and written to 'path'.
+        Returns False if the frame was dropped because the queue was full.
+        """
+        item = (image, path, crop_box)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            if not self.block:
+                with self._lock:
+                    self.dropped += 1
+                return False
+            wait_start = time.perf_counter()
+            self._queue.put(item)
+            with self._lock:
+                self.blocked += 1
+                self.blocked_seconds += time.perf_counter() - wait_start
+        with self._lock:
+            self.submitted += 1
+            self.high_water = max(self.high_water, self._queue.qsize())
+        return True
+
+    def close(self):
+        """Waits for queued frames to be written and fsyncs anything outstanding."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "format": self.image_format,
+                "submitted": self.submitted,
+                "written": self.written,
+                "dropped": self.dropped,
+                "blocked": self.blocked,
+                "blocked_seconds": round(self.blocked_seconds, 3),
+                "queue_high_water": self.high_water,
+                "queue_capacity": self._queue.maxsize,
+                "encode_seconds": round(self.encode_seconds, 3),
+                "fsyncs": self.fsyncs,
+                "errors": self.errors,
+            }
+
+    def format_stats(self):
+        s = self.stats()
+        return (
+            f"Screenshot writer ({s['format']}): {s['written']}/{s['submitted']} written, "
+            f"{s['dropped']} dropped, {s['blocked']} blocked ({s['blocked_seconds']}s), "
+            f"queue high-water {s['queue_high_water']}/{s['queue_capacity']}, "
+            f"encode {s['encode_seconds']}s, {s['fsyncs']} fsync batches"
+        )
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._sync()
+                return
+            image, path, crop_box = item
+            try:
+                self._write(image, path, crop_box)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                if self.on_error:
+                    self.on_error(path, e)
+            if len(self._unsynced) >= self.fsync_every:
+                self._sync()
+
+    def _write(self, image, path, crop_box):
+        folder = os.path.dirname(path)
+        if folder not in self._known_dirs:
+            os.makedirs(folder, exist_ok=True)
+            self._known_dirs.add(folder)
+
+        encode_start = time.perf_counter()
+        if crop_box is not None:
+            image = image.crop(crop_box)
+        spec = FORMATS[self.image_format]
+        try:
+            with open(path, "wb") as f:
+                image.save(f, format=spec["format"], **spec["params"])
+        except BaseException:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            self.encode_seconds += time.perf_counter() - encode_start
+            self.written += 1
+        self._unsynced.append(path)
+        if self.on_saved:
+            self.on_saved(path)
+
+    def _sync(self):
+        if not self._unsynced:
+            return
+        for path in self._unsynced:
+            try:
+                # Opened for writing (without truncating) because Windows only fsyncs writable handles.
+                fd = os.open(path, os.O_RDWR | getattr(os, "O_BINARY", 0))
+            except OSError:
+                continue
+            try:
+                os.fsync(fd)
+            except OSError:
+                pass
+            finally:
+                os.close(fd)
+        self._unsynced = []
+        with self._lock:
+            self.fsyncs += 1
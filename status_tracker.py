@@ -0,0 +1,271 @@
+"""
+Adaptive HeyGen render-status tracker for step5.
+
+All outstanding video ids sit in one priority queue keyed by their next poll
+time. Poll delays follow the render durations observed so far (checks land
+on quantiles of the observed durations), backing off in proportion to a
+video's age before any render has been seen or once it is slower than all
+of them. A video fails when the status endpoint rejects it (a 4xx other than
+429, e.g. a wrong key or a deleted video). Otherwise it is polled until it
+finishes, however long that takes; max_errors (failed checks in a row) and
+max_age are opt-in limits, and videos dropped by them are reported as
+abandoned rather than failed. State is saved to a JSON file so a restarted
+run keeps each video's age and the learned durations.
+"""
+
+import heapq
+import json
+import os
+import threading
+import time
+import concurrent.futures
+
+from tracing import tracer
+
+# Render durations kept for the adaptive schedule.
+MAX_DURATION_SAMPLES = 200
+# A video is checked when its age reaches these quantiles of the observed durations...
+POLL_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9, 1.0)
+# ...and past the slowest one, after a further BACKOFF_FRACTION of its age.
+BACKOFF_FRACTION = 0.25
+
+
+class StatusTracker:
+    """
+    :param fetch_status: Callable(video_id) -> status 'data' dict (see DownloadEngine.fetch_status).
+    :param state_path: JSON file for state across restarts (None to keep it in memory).
+    :param min_interval: Shortest delay between two checks of one video (s).
+    :param max_interval: Longest delay between two checks of one video (s).
+    :param workers: Status requests made at the same time.
+    :param max_errors: Abandon a video after this many failed status checks in a row (None = never).
+    :param max_age: Abandon a video that has not finished this long after submission (s; None = never).
+    :param on_event: Callback(message) for progress lines.
+    """
+
+    def __init__(self, fetch_status, state_path=None, min_interval=5.0, max_interval=120.0,
+                 workers=8, max_errors=None, max_age=None, on_event=None):
+        self.fetch_status = fetch_status
+        self.state_path = state_path
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.workers = workers
+        self.max_errors = max_errors
+        self.max_age = max_age
+        self.on_event = on_event or (lambda message: None)
+
+        self.lock = threading.Condition()
+        self.heap = []            # (next_poll, sequence, video_id)
+        self.videos = {}          # video_id -> {"key", "first_seen", "polls", "next_poll"}
+        self.durations = []
+        self._saved_videos = {}
+        self._sequence = 0
+        self.stats = {"polls": 0, "pushed": 0, "completed": 0, "failed": 0, "abandoned": 0, "errors": 0}
+        self.abandoned = []       # (key, video_id, reason) of videos dropped by max_errors / max_age
+        self.load()
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+    def load(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.durations = [float(d) for d in state.get("durations", [])][-MAX_DURATION_SAMPLES:]
+        self._saved_videos = state.get("videos", {})
+
+    def save(self):
+        if not self.state_path:
+            return
+        with self.lock:
+            state = {
+                "durations": self.durations,
+                "videos": {video_id: dict(video) for video_id, video in self.videos.items()},
+            }
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+    def add(self, video_id, key):
+        """Tracks 'video_id'; 'key' (e.g. the CSV row number) is passed back to the callbacks."""
+        saved = self._saved_videos.get(video_id, {})
+        now = time.time()
+        video = {
+            "key": key,
+            "first_seen": saved.get("first_seen", now),
+            "polls": saved.get("polls", 0),
+            "errors": saved.get("errors", 0),
+            # A restarted run checks everything once straight away.
+            "next_poll": now,
+        }
+        with self.lock:
+            self.videos[video_id] = video
+            self._push(video_id, video["next_poll"])
+            self.lock.notify()
+
+    def _push(self, video_id, next_poll):
+        self._sequence += 1
+        heapq.heappush(self.heap, (next_poll, self._sequence, video_id))
+
+    def next_delay(self, video, now):
+        """Seconds until the next check of 'video', based on observed render durations."""
+        age = now - video["first_seen"]
+        delay = None
+        if self.durations:
+            samples = sorted(self.durations)
+            for q in POLL_QUANTILES:
+                point = samples[min(len(samples) - 1, int(q * len(samples)))]
+                if point > age + self.min_interval / 2:
+                    delay = point - age
+                    break
+        if delay is None:
+            # No history yet, or slower than every render seen so far: the longer
+            # a render has taken, the longer we wait before asking again.
+            delay = age * BACKOFF_FRACTION
+        return min(max(delay, self.min_interval), self.max_interval)
+
+    def _record_duration(self, video):
+        self.durations.append(time.time() - video["first_seen"])
+        del self.durations[:-MAX_DURATION_SAMPLES]
+
+    def notify(self, video_id):
+        """
+        Checks 'video_id' straight away (e.g. on a webhook). The outcome still comes
+        from the status endpoint, so a pushed event cannot supply the video URL. Thread-safe.
+        """
+        with self.lock:
+            video = self.videos.get(video_id)
+            if video is not None:
+                video["pushed"] = True
+                video["next_poll"] = time.time()
+                self._push(video_id, video["next_poll"])
+                self.stats["pushed"] += 1
+                self.lock.notify()
+
+    def outstanding(self):
+        with self.lock:
+            return len(self.videos)
+
+    # ------------------------------------------------------------------
+    # Main loop
+    # ------------------------------------------------------------------
+    def _poll(self, video_id):
+        try:
+            return video_id, self.fetch_status(video_id), None
+        except Exception as e:
+            return video_id, None, e
+
+    def _handle(self, video_id, data, error, on_ready, on_failed, on_abandoned=None):
+        now = time.time()
+        with self.lock:
+            video = self.videos.get(video_id)
+            if video is None:
+                return
+            video["polls"] += 1
+            self.stats["polls"] += 1
+            status = (data or {}).get("status")
+            response = getattr(error, "response", None)
+            created_at = (data or {}).get("created_at")
+            if isinstance(created_at, (int, float)) and 0 < created_at < video["first_seen"]:
+                # Render age counts from submission when the API reports it.
+                video["first_seen"] = float(created_at)
+
+            code = response.status_code if response is not None else None
+            video["errors"] = video.get("errors", 0) + 1 if error is not None else 0
+
+            if code == 404:
+                del self.videos[video_id]
+                self.stats["failed"] += 1
+                finished = ("failed", video, "Video not found")
+            elif code is not None and 400 <= code < 500 and code != 429:
+                # A wrong key or a rejected id: asking again will not help.
+                del self.videos[video_id]
+                self.stats["failed"] += 1
+                finished = ("failed", video, f"Status request rejected (HTTP {code})")
+            elif error is not None and self.max_errors is not None and video["errors"] >= self.max_errors:
+                del self.videos[video_id]
+                finished = ("abandoned", video, f"Status unavailable after {video['errors']} attempts: {error}")
+            elif error is None and status == "completed":
+                del self.videos[video_id]
+                self._record_duration(video)
+                self.stats["completed"] += 1
+                finished = ("ready", video, data.get("video_url"))
+            elif error is None and status == "failed":
+                del self.videos[video_id]
+                self.stats["failed"] += 1
+                finished = ("failed", video, data.get("error", "Unknown error"))
+            elif error is None and status not in ("processing", "pending", "waiting"):
+                del self.videos[video_id]
+                self.stats["failed"] += 1
+                finished = ("failed", video, f"Unexpected video status: {status}")
+            elif self.max_age is not None and now - video["first_seen"] >= self.max_age:
+                del self.videos[video_id]
+                finished = ("abandoned", video, f"Still not finished after {(now - video['first_seen']) / 60:.0f} minutes")
+            else:
+                finished = None
+            if finished is not None and finished[0] == "abandoned":
+                self.stats["abandoned"] += 1
+                self.abandoned.append((video["key"], video_id, finished[2]))
+            if finished is None:
+                if error is not None:
+                    self.stats["errors"] += 1
+                delay = self.next_delay(video, now)
+                video["next_poll"] = now + delay
+                self._push(video_id, video["next_poll"])
+
+        if finished is None:
+            if error is not None:
+                self.on_event(f"Row {video['key']}: Error fetching video status ({error}); retrying in {delay:.0f}s")
+            else:
+                self.on_event(f"Row {video['key']}: Video is still {status}. Checking again in {delay:.0f}s...")
+            return
+        kind, video, detail = finished
+        # Render wait: from submission (or first sighting) to the final status.
+        tracer.record(video["key"], "render_wait", video["first_seen"], now - video["first_seen"],
+                      "ok" if kind == "ready" else "error", None if kind == "ready" else str(detail),
+                      video_id=video_id, polls=video["polls"], pushed=video.get("pushed", False))
+        if kind == "ready":
+            on_ready(video["key"], video_id, detail)
+        elif kind == "abandoned" and on_abandoned is not None:
+            on_abandoned(video["key"], video_id, detail)
+        else:
+            on_failed(video["key"], video_id, detail)
+
+    def run(self, on_ready, on_failed, on_abandoned=None):
+        """
+        Polls until no videos are outstanding. on_ready(key, video_id, video_url),
+        on_failed(key, video_id, reason) and on_abandoned(key, video_id, reason)
+        (default: on_failed) are called from this thread.
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                with self.lock:
+                    if not self.videos:
+                        break
+                    # Skip heap entries superseded by a later reschedule.
+                    while self.heap and (self.heap[0][2] not in self.videos
+                                         or self.videos[self.heap[0][2]]["next_poll"] != self.heap[0][0]):
+                        heapq.heappop(self.heap)
+                    now = time.time()
+                    if self.heap and self.heap[0][0] > now:
+                        self.lock.wait(timeout=self.heap[0][0] - now)
+                        continue
+                    due = []
+                    while self.heap and self.heap[0][0] <= now:
+                        next_poll, _, video_id = heapq.heappop(self.heap)
+                        video = self.videos.get(video_id)
+                        if video is not None and video["next_poll"] == next_poll:
+                            due.append(video_id)
+
+                for video_id, data, error in executor.map(self._poll, due):
+                    self._handle(video_id, data, error, on_ready, on_failed, on_abandoned)
+                self.save()
+        self.save()
+        return self.stats
@@ -6,14 +6,67 @@ import json
 import os
 import ssl
 import certifi
+from urllib.parse import urlparse
+
+from lead_dedup import cluster_leads
+from lead_scoring import MATCH_CONFIDENCE_FIELD, MIN_MATCH_CONFIDENCE, best_matches, format_confidence
+from profiling import enable_from_argv, profiled
+from tracing import tracer
 
 # ---------------------------
 # Configuration for serper.dev
 # ---------------------------
 SERPER_API_KEY = '2110612bb6edb33596de66cace6357506f26f266'  # <-- Replace with your actual API key
-SERPER_HOST = "google.serper.dev"
+# Base URL of the search API; set SERPER_BASE_URL to use a local stand-in (see fake_services.py).
+SERPER_BASE_URL = os.environ.get("SERPER_BASE_URL", "https://google.serper.dev")
 SERPER_ENDPOINT = "/search"
 
+def build_query(first_name, last_name, company):
+    return f"site:linkedin.com {first_name} {last_name} {company}"
+
+@profiled
+def search_candidates(query):
+    """
+    Uses the serper.dev API to search for the query string.
+    Returns every organic result (dicts with title, link and snippet), or [] if none were found.
+    """
+    # Create a secure SSL context that uses certifi's CA bundle
+    ssl_context = ssl.create_default_context(cafile=certifi.where())
+
+    try:
+        base = urlparse(SERPER_BASE_URL)
+        if base.scheme == "http":
+            conn = http.client.HTTPConnection(base.netloc)
+        else:
+            conn = http.client.HTTPSConnection(base.netloc, context=ssl_context)
+        payload = json.dumps({
+            "q": query,
+            "autocorrect": False
+        })
+        headers = {
+            'X-API-KEY': SERPER_API_KEY,
+            'Content-Type': 'application/json'
+        }
+        conn.request("POST", base.path.rstrip("/") + SERPER_ENDPOINT, payload, headers)
+        res = conn.getresponse()
+        data = res.read()
+        conn.close()
+
+        response_json = json.loads(data.decode("utf-8"))
+
+        return response_json.get('organic') or []
+
+    except Exception as e:
+        print("Error searching with serper.dev:", e)
+        return []
+
+def search_linkedin(query):
+    """Returns the title and URL of the top search result, or (None, None) if not found."""
+    organic = search_candidates(query)
+    if not organic:
+        return None, None
+    return organic[0].get('title'), organic[0].get('link')
+
 class LinkedInScraperApp:
     def __init__(self, master):
         self.master = master
@@ -47,6 +100,7 @@ class LinkedInScraperApp:
         """
         Reads the original CSV, performs a LinkedIn search for each row (based on first name, last name, and company),
         and appends the LinkedIn header (title) and URL as new columns (columns 4 and 5) in the original CSV.
+        The best-scoring result is kept and its match confidence written to column 9.
         """
         if not self.csv_file_path:
             messagebox.showerror("Error", "Please select a CSV file first.")
@@ -62,78 +116,73 @@ class LinkedInScraperApp:
                 messagebox.showerror("Error", "CSV file is empty.")
                 return
 
-            # Assume the first row is a header row; append new headers
-            header = rows[0] + ["Title", "URL"]
-            new_rows = [header]
-
-            # Process each data row (starting from the second row)
-            for row in rows[1:]:
-                # Ensure the row has at least 3 columns; if not, just add two empty columns
-                if len(row) < 3:
-                    row.extend(["", ""])
-                    new_rows.append(row)
-                    continue
-
-                first_name, last_name, current_company = row[0], row[1], row[2]
-                query = f"site:linkedin.com {first_name} {last_name} {current_company}"
+            # Assume the first row is a header row; append new headers. Columns 6-8 are
+            # filled by steps 3 and 4; column 9 is the match confidence of the URL.
+            header = rows[0] + ["Title", "URL", "Profile Folder", "OpenAI Response", "Video ID",
+                                MATCH_CONFIDENCE_FIELD]
 
-                # Use the serper.dev API to get search results
-                top_title, top_url = self.search_linkedin(query)
+            confidence_col = len(header) - 1
 
-                if top_title and top_url:
-                    row.extend([top_title, top_url])
+            # Rows with at least 3 columns are searched; the rest are padded to the header's width.
+            leads = []  # (row number, row)
+            for row_number, row in enumerate(rows[1:], start=2):
+                if len(row) < 3:
+                    row.extend([""] * (len(header) - len(row)))
                 else:
-                    row.extend(["No result found", ""])
+                    leads.append((row_number, row))
+
+            # Duplicate leads (casing, accents, nicknames, company suffixes) are searched once
+            # and the result is written to every row of the cluster.
+            clusters = cluster_leads([row[:3] for _, row in leads])
+            queried = []
+            cluster_results = []
+            for cluster in clusters:
+                row_number, first_row = leads[cluster[0]]
+                first_name, last_name, current_company = first_row[0], first_row[1], first_row[2]
+                query = build_query(first_name, last_name, current_company)
 
-                new_rows.append(row)
+                # Use the serper.dev API to get search results
+                with tracer.span(row_number, "search", rows=len(cluster)) as span:
+                    organic = search_candidates(query)
+                    if not organic:
+                        span.fail("No result found")
+                queried.append((first_name, last_name, current_company))
+                cluster_results.append(organic)
+
+            # Score every result of every query and keep each lead's best profile.
+            matches = best_matches(queried, cluster_results)
+            low = 0
+            for cluster, (top_title, top_url, confidence) in zip(clusters, matches):
+                if top_url and confidence < MIN_MATCH_CONFIDENCE:
+                    low += len(cluster)
+                for i in cluster:
+                    row = leads[i][1]
+                    if top_title and top_url:
+                        row.extend([top_title, top_url])
+                    else:
+                        row.extend(["No result found", ""])
+                    row.extend([""] * (len(header) - len(row)))
+                    row[confidence_col] = format_confidence(confidence)
+
+            new_rows = [header] + rows[1:]
+            avoided = len(leads) - len(clusters)
+            print(f"Searched {len(clusters)} unique leads for {len(leads)} rows ({avoided} searches avoided); "
+                  f"{low} rows below match confidence {MIN_MATCH_CONFIDENCE}.")
 
             # Overwrite the original CSV file with the updated data
             with open(self.csv_file_path, mode='w', newline='', encoding='utf-8') as outfile:
                 writer = csv.writer(outfile)
                 writer.writerows(new_rows)
 
-            messagebox.showinfo("Success", f"Results added to {os.path.basename(self.csv_file_path)}")
+            messagebox.showinfo("Success", f"Results added to {os.path.basename(self.csv_file_path)}\n"
+                                           f"{avoided} duplicate searches avoided; {low} rows below "
+                                           f"match confidence {MIN_MATCH_CONFIDENCE} will be skipped.")
 
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred:\n{str(e)}")
 
-    def search_linkedin(self, query):
-        """
-        Uses the serper.dev API to search for the query string.
-        Returns the title and URL of the top result, or (None, None) if not found.
-        """
-        # Create a secure SSL context that uses certifi's CA bundle
-        ssl_context = ssl.create_default_context(cafile=certifi.where())
-
-        try:
-            conn = http.client.HTTPSConnection(SERPER_HOST, context=ssl_context)
-            payload = json.dumps({
-                "q": query,
-                "autocorrect": False
-            })
-            headers = {
-                'X-API-KEY': SERPER_API_KEY,
-                'Content-Type': 'application/json'
-            }
-            conn.request("POST", SERPER_ENDPOINT, payload, headers)
-            res = conn.getresponse()
-            data = res.read()
-            conn.close()
-
-            response_json = json.loads(data.decode("utf-8"))
-
-            # Check for results
-            if 'organic' in response_json and len(response_json['organic']) > 0:
-                top_result = response_json['organic'][0]
-                return top_result.get('title'), top_result.get('link')
-            else:
-                return None, None
-
-        except Exception as e:
-            print("Error searching with serper.dev:", e)
-            return None, None
-
 if __name__ == "__main__":
+    enable_from_argv("step1")
     root = tk.Tk()
     app = LinkedInScraperApp(root)
     root.mainloop()
\ No newline at end of file
@@ -14,7 +14,7 @@ import pyautogui
 
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QFileDialog, QLineEdit, QMessageBox, QTextEdit
+    QFileDialog, QLineEdit, QMessageBox, QPlainTextEdit
 )
 from PyQt5.QtGui import QFont
 from PyQt5.QtCore import Qt, QTimer
@@ -28,6 +28,16 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 
+from log_view import LogBuffer, attach_qt, log_path
+import page_scroll
+from lead_scoring import confidence_column, low_confidence
+from profiling import enable_from_argv, profiled
+from screenshot_writer import ScreenshotWriter, screenshot_crop_box
+from tracing import tracer
+
+# Screenshot encoding: "png" (compress_level=1) or "webp" (lossless)
+SCREENSHOT_FORMAT = "png"
+
 
 class LinkedInProfileRecorder(QWidget):
     def __init__(self):
@@ -37,12 +47,19 @@ class LinkedInProfileRecorder(QWidget):
         self.csv_data = []
         self.is_running = False
 
-        # For thread-safe status logging
-        self.thread_lock = threading.Lock()
+        # Bounded status log: batched into the status box, full history in logs/step2.log
+        self.log = LogBuffer(log_file=log_path("step2"))
+        self.log_timer = attach_qt(self.log, self.status_text)
 
         # We'll store the page's total scroll height after the first big scroll
         self.page_total_height = 0
 
+        # WebDriver command counts and frame timings for the smooth scrolls
+        self.scroll_stats = page_scroll.ScrollStats()
+
+        # Background writer for screenshots, created per run in process_rows
+        self.screenshot_writer = None
+
     def init_ui(self):
         self.setWindowTitle("LinkedIn Profile Recorder")
         self.resize(600, 400)
@@ -73,7 +90,7 @@ class LinkedInProfileRecorder(QWidget):
         main_layout.addWidget(self.start_button)
 
         # Status Output
-        self.status_text = QTextEdit()
+        self.status_text = QPlainTextEdit()
         self.status_text.setReadOnly(True)
         main_layout.addWidget(self.status_text)
 
@@ -131,45 +148,57 @@ class LinkedInProfileRecorder(QWidget):
         # Define main folders for screenshots and recordings (created in current working directory)
         screenshots_main_folder = os.path.join(os.getcwd(), "Screenshots")
         recordings_main_folder = os.path.join(os.getcwd(), "Recordings")
-        if not os.path.exists(screenshots_main_folder):
-            os.mkdir(screenshots_main_folder)
-        if not os.path.exists(recordings_main_folder):
-            os.mkdir(recordings_main_folder)
-
-        for idx, row in enumerate(self.csv_data, start=1):
-            # Expect at least 5 columns (we need columns 4 and 5)
-            if len(row) < 5:
-                self.append_status(f"Row {idx} invalid (fewer than 5 columns). Skipping.")
-                continue
-
-            # Now expect column 4 (index 3) to be the LinkedIn header and column 5 (index 4) the URL.
-            title, url = row[3], row[4]
-            if not url.startswith("http"):
-                self.append_status(f"Row {idx} has invalid URL: {url}")
-                continue
-
-            self.append_status(f"\nProcessing row {idx}: {title} => {url}")
-
-            # Create a subfolder for screenshots using the row number and LinkedIn header
-            screenshots_subfolder = os.path.join(screenshots_main_folder, f"{idx} - {title}")
-            if not os.path.exists(screenshots_subfolder):
-                os.mkdir(screenshots_subfolder)
-
-            # Create a subfolder for recordings using the row number and LinkedIn header
-            recordings_subfolder = os.path.join(recordings_main_folder, f"{idx} - {title}")
-            if not os.path.exists(recordings_subfolder):
-                os.mkdir(recordings_subfolder)
-            
-            # Create an additional subfolder for screen recordings called "Screen Recording"
-            screen_recording_subfolder = os.path.join(recordings_subfolder, "Screen Recording")
-            if not os.path.exists(screen_recording_subfolder):
-                os.mkdir(screen_recording_subfolder)
-
-            # Record & scroll; pass the screen recording folder and the screenshots folder
-            self.record_linkedin_profile(url, screen_recording_subfolder, screenshots_subfolder, idx)
+        os.makedirs(recordings_main_folder, exist_ok=True)
+
+        # Screenshots are encoded and written on a background thread; the writer
+        # creates each screenshot subfolder the first time it writes into it.
+        self.screenshot_writer = ScreenshotWriter(
+            image_format=SCREENSHOT_FORMAT,
+            on_saved=lambda path: self.append_status(f"Screenshot saved: {path}"),
+            on_error=lambda path, e: self.append_status(f"Error saving screenshot {path}: {e}"),
+        ).start()
+
+        # Rows whose URL step1 matched with low confidence are not recorded.
+        confidence_col = confidence_column(self.csv_data[0]) if self.csv_data else None
+
+        try:
+            for idx, row in enumerate(self.csv_data, start=1):
+                # Expect at least 5 columns (we need columns 4 and 5)
+                if len(row) < 5:
+                    self.append_status(f"Row {idx} invalid (fewer than 5 columns). Skipping.")
+                    continue
+
+                # Now expect column 4 (index 3) to be the LinkedIn header and column 5 (index 4) the URL.
+                title, url = row[3], row[4]
+                if not url.startswith("http"):
+                    self.append_status(f"Row {idx} has invalid URL: {url}")
+                    continue
+                confidence = low_confidence(row, confidence_col)
+                if confidence is not None:
+                    self.append_status(f"Row {idx}: low match confidence ({confidence:.2f}) for {url}. Skipping.")
+                    continue
+
+                self.append_status(f"\nProcessing row {idx}: {title} => {url}")
+
+                # Subfolder for screenshots using the row number and LinkedIn header
+                screenshots_subfolder = os.path.join(screenshots_main_folder, f"{idx} - {title}")
+
+                # Create the recordings subfolder (row number and LinkedIn header)
+                # together with its "Screen Recording" subfolder in one call
+                recordings_subfolder = os.path.join(recordings_main_folder, f"{idx} - {title}")
+                screen_recording_subfolder = os.path.join(recordings_subfolder, "Screen Recording")
+                os.makedirs(screen_recording_subfolder, exist_ok=True)
+
+                # Record & scroll; pass the screen recording folder and the screenshots folder
+                self.record_linkedin_profile(url, screen_recording_subfolder, screenshots_subfolder, idx)
+                self.append_status(self.screenshot_writer.format_stats())
+        finally:
+            self.screenshot_writer.close()
+            self.append_status(self.screenshot_writer.format_stats())
 
         self.append_status("All rows processed.")
 
+    @profiled
     def record_linkedin_profile(self, linkedin_url, recordings_folder, screenshots_folder, row_index):
         """
         Opens Chrome and navigates to the LinkedIn profile URL.
@@ -180,6 +209,7 @@ class LinkedInProfileRecorder(QWidget):
         screen_record_process = None
         output_file = ""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.scroll_stats = page_scroll.ScrollStats()
 
         try:
             self.append_status("Starting recording...")
@@ -236,12 +266,11 @@ class LinkedInProfileRecorder(QWidget):
                 self.append_status("Failed to open a new tab.")
                 return
 
-            # Navigate to LinkedIn URL
-            driver.get(linkedin_url)
-            self.append_status(f"Navigating to LinkedIn profile: {linkedin_url}")
-
-            # Wait for page to load
-            WebDriverWait(driver, 30).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+            # Navigate to LinkedIn URL and wait for the page to load
+            with tracer.span(row_index, "page_load"):
+                driver.get(linkedin_url)
+                self.append_status(f"Navigating to LinkedIn profile: {linkedin_url}")
+                WebDriverWait(driver, 30).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
             self.append_status("LinkedIn profile loaded.")
 
             # Do a big scroll to load dynamic content and get page height
@@ -304,32 +333,34 @@ class LinkedInProfileRecorder(QWidget):
 
             self.append_status(f"Screen recording started => {output_file}")
 
-            # Take the first screenshot immediately
-            self.take_screenshot(screenshots_folder, row_index)
-
-            # Wait 5 seconds before starting to scroll
-            time.sleep(5)
-            self.append_status("Paused for 5 seconds before scrolling.")
-
-            # ~~~ Perform scrolling and take screenshots for up to 25 seconds ~~~
-            record_duration = 25
-            start_time = time.time()
-            bottom_reached = False
-
-            while (time.time() - start_time) < record_duration:
-                if not bottom_reached:
-                    self.smooth_scroll(driver, duration=1, max_scroll=500)
-                    current_scroll_pos = driver.execute_script("return window.pageYOffset")
-                    window_height = driver.execute_script("return window.innerHeight")
-                    if current_scroll_pos + window_height >= self.page_total_height:
-                        bottom_reached = True
-                        self.append_status("Bottom of page reached. Scrolling back up.")
-                        self.smooth_scroll_up(driver, duration=1, total_scroll=current_scroll_pos)
-                time.sleep(1)
-                # Only take screenshots if the bottom has not been reached
-                if not bottom_reached:
-                    self.take_screenshot(screenshots_folder, row_index)
+            with tracer.span(row_index, "capture", url=linkedin_url):
+                # Take the first screenshot immediately
+                self.take_screenshot(screenshots_folder, row_index)
+
+                # Wait 5 seconds before starting to scroll
+                time.sleep(5)
+                self.append_status("Paused for 5 seconds before scrolling.")
+
+                # ~~~ Perform scrolling and take screenshots for up to 25 seconds ~~~
+                record_duration = 25
+                start_time = time.time()
+                bottom_reached = False
+
+                while (time.time() - start_time) < record_duration:
+                    if not bottom_reached:
+                        scroll_result = self.smooth_scroll(driver, duration=1, max_scroll=500)
+                        current_scroll_pos = scroll_result["offset"]
+                        window_height = scroll_result["innerHeight"]
+                        if current_scroll_pos + window_height >= self.page_total_height:
+                            bottom_reached = True
+                            self.append_status("Bottom of page reached. Scrolling back up.")
+                            self.smooth_scroll_up(driver, duration=1, total_scroll=current_scroll_pos)
+                    time.sleep(1)
+                    # Only take screenshots if the bottom has not been reached
+                    if not bottom_reached:
+                        self.take_screenshot(screenshots_folder, row_index)
             # End of scrolling/screenshot loop; the recording continues until ~30 seconds are complete.
+            self.append_status(self.scroll_stats.format_summary("Scroll stats"))
         except Exception as e:
             self.append_status(f"An error occurred: {str(e)}")
         finally:
@@ -377,100 +408,48 @@ class LinkedInProfileRecorder(QWidget):
     def smooth_scroll(self, driver, duration=1, max_scroll=500):
         """
         Smoothly scrolls down by 'max_scroll' px over 'duration' seconds.
-        Uses an ease-out cubic function.
+        The ease-out cubic animation runs in the page (see page_scroll), so this is
+        a single WebDriver round-trip. Returns the final offset and window height.
         """
-        def ease_out_cubic(t):
-            return 1 - (1 - t) ** 3
-
-        start_time = time.time()
-        last_scroll_amount = 0
-
-        while True:
-            elapsed = time.time() - start_time
-            if elapsed > duration:
-                break
-
-            progress = elapsed / duration
-            eased = ease_out_cubic(progress)
-            scroll_amount = eased * max_scroll
-            inc = scroll_amount - last_scroll_amount
-            last_scroll_amount = scroll_amount
-
-            driver.execute_script(f"window.scrollBy(0, {inc});")
-            time.sleep(0.01)
+        return page_scroll.smooth_scroll(driver, max_scroll, duration, stats=self.scroll_stats)
 
     def smooth_scroll_up(self, driver, duration=1, total_scroll=500):
         """
         Smoothly scrolls up by 'total_scroll' px over 'duration' seconds
-        using an ease-out cubic function.
+        using the in-page ease-out cubic animation.
         """
-        def ease_out_cubic(t):
-            return 1 - (1 - t) ** 3
-
-        start_time = time.time()
-        last_scroll_amount = 0
-
-        while True:
-            elapsed = time.time() - start_time
-            if elapsed > duration:
-                break
-
-            progress = elapsed / duration
-            eased = ease_out_cubic(progress)
-            scroll_amount = eased * total_scroll
-            inc = scroll_amount - last_scroll_amount
-            last_scroll_amount = scroll_amount
-
-            # Negative inc to scroll up
-            driver.execute_script(f"window.scrollBy(0, {-inc});")
-            time.sleep(0.01)
+        return page_scroll.smooth_scroll(driver, -total_scroll, duration, stats=self.scroll_stats)
 
+    @profiled
     def take_screenshot(self, folder, row_index):
         """
-        Takes a desktop screenshot using pyautogui, then crops it so that:
+        Takes a desktop screenshot using pyautogui and queues it on the screenshot writer,
+        which crops it so that:
           - The top 16.11% of the screen (approximately 290 pixels on a 1800px tall screen)
             is removed.
           - The right 32.9861% of the screen (approximately 965 pixels on a 2880px wide screen)
             is removed.
         This method uses the actual full screenshot dimensions and calculates the crop box
-        to avoid any squeezing.
+        to avoid any squeezing. Cropping and encoding happen off this thread.
         """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = os.path.join(folder, f"screenshot_{row_index}_{timestamp}.png")
+        filename = os.path.join(folder, f"screenshot_{row_index}_{timestamp}{self.screenshot_writer.extension}")
         try:
             # Capture full screenshot first
             full_img = pyautogui.screenshot()
-            full_width, full_height = full_img.size
-
-            # Calculate crop amounts using percentages
-            top_percent = 290 / 1800      # ~16.11%
-            right_percent = 950 / 2880    # ~32.9861%
-
-            crop_top = int(full_height * top_percent)
-            crop_right = int(full_width * right_percent)
-
-            # Define crop box: (left, top, right, bottom)
-            # We keep the left edge at 0, the top edge at crop_top, 
-            # and crop the right side by crop_right while keeping the bottom edge at full_height.
-            crop_box = (0, crop_top, full_width - crop_right, full_height)
-            cropped = full_img.crop(crop_box)
-            cropped.save(filename)
-            self.append_status(f"Screenshot saved: {filename}")
+            crop_box = screenshot_crop_box(*full_img.size)
+            if not self.screenshot_writer.submit(full_img, filename, crop_box):
+                self.append_status(f"Screenshot dropped (writer queue full): {filename}")
         except Exception as e:
             self.append_status(f"Error taking screenshot: {e}")
 
     def append_status(self, msg):
-        """Thread-safe method to append a message to the status box."""
-        with self.thread_lock:
-            def do_append():
-                self.status_text.append(msg)
-                self.status_text.verticalScrollBar().setValue(
-                    self.status_text.verticalScrollBar().maximum()
-                )
-            QTimer.singleShot(0, do_append)
+        """Thread-safe: queues a message for the status box and the log file."""
+        self.log.write(msg)
 
 
 def main():
+    enable_from_argv("step2")
     app = QApplication(sys.argv)
     window = LinkedInProfileRecorder()
     window.show()
@@ -11,11 +11,10 @@ from shutil import which
 import platform
 
 import pyautogui
-import pyperclip  # For clipboard operations
 
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QFileDialog, QLineEdit, QMessageBox, QTextEdit
+    QFileDialog, QLineEdit, QMessageBox, QPlainTextEdit, QCheckBox
 )
 from PyQt5.QtGui import QFont
 from PyQt5.QtCore import Qt, QTimer
@@ -26,6 +25,22 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 
+import heygen_handoff
+from heygen_client import HeyGenClient
+from heygen_scheduler import SubmissionScheduler, SubmissionJob
+from lead_scoring import confidence_column, low_confidence
+from log_view import LogBuffer, attach_qt, log_path
+from profiling import enable_from_argv, profiled
+from tracing import tracer
+
+# Number of HeyGen renders allowed in flight at once (match your plan's quota)
+API_MAX_IN_FLIGHT = 5
+# Submission order in API mode: a CSV header name or 0-based column index, or None
+# for CSV order. Numeric values submit highest first, text values alphabetically.
+PRIORITY_FIELD = None
+# Accepted video ids are written to the CSV in batches of this many (or every 10s)
+CSV_BATCH_SIZE = 10
+
 
 class HeyGenAutomation(QWidget):
     def __init__(self):
@@ -35,8 +50,9 @@ class HeyGenAutomation(QWidget):
         self.csv_data = []
         self.is_running = False
 
-        # For thread-safe status logging
-        self.thread_lock = threading.Lock()
+        # Bounded status log: batched into the status box, full history in logs/step4.log
+        self.log = LogBuffer(log_file=log_path("step4"))
+        self.log_timer = attach_qt(self.log, self.status_text)
 
         # Will hold our Selenium driver reference
         self.driver = None
@@ -66,6 +82,22 @@ class HeyGenAutomation(QWidget):
         csv_layout.addWidget(csv_button)
         main_layout.addLayout(csv_layout)
 
+        # HeyGen API mode: submit videos over HTTP instead of driving the web UI
+        self.api_checkbox = QCheckBox("Use HeyGen API (no UI automation)")
+        main_layout.addWidget(self.api_checkbox)
+        api_layout = QHBoxLayout()
+        self.api_key_edit = QLineEdit()
+        self.api_key_edit.setPlaceholderText("HeyGen API key")
+        self.api_key_edit.setEchoMode(QLineEdit.Password)
+        self.avatar_edit = QLineEdit()
+        self.avatar_edit.setPlaceholderText("Avatar ID")
+        self.voice_edit = QLineEdit()
+        self.voice_edit.setPlaceholderText("Voice ID")
+        api_layout.addWidget(self.api_key_edit)
+        api_layout.addWidget(self.avatar_edit)
+        api_layout.addWidget(self.voice_edit)
+        main_layout.addLayout(api_layout)
+
         # Start Button
         self.start_button = QPushButton("Start")
         self.start_button.setFont(QFont("Arial", 14))
@@ -73,7 +105,7 @@ class HeyGenAutomation(QWidget):
         main_layout.addWidget(self.start_button)
 
         # Status Output
-        self.status_text = QTextEdit()
+        self.status_text = QPlainTextEdit()
         self.status_text.setReadOnly(True)
         main_layout.addWidget(self.status_text)
 
@@ -108,12 +140,24 @@ class HeyGenAutomation(QWidget):
             QMessageBox.critical(self, "Error", "CSV is empty.")
             return
 
+        # Widgets are read here on the GUI thread; the worker only gets the values.
+        use_api = self.api_checkbox.isChecked()
+        api_key = self.api_key_edit.text().strip()
+        avatar_id = self.avatar_edit.text().strip()
+        voice_id = self.voice_edit.text().strip()
+        if use_api and not (api_key and avatar_id and voice_id):
+            QMessageBox.critical(self, "Error", "API mode needs an API key, avatar ID and voice ID.")
+            return
+
         self.append_status(f"Loaded {len(self.csv_data)} rows (including header) from CSV.")
         self.is_running = True
         self.start_button.setEnabled(False)
 
         # Run the main loop in a separate thread
-        thread = threading.Thread(target=self.process_csv, args=(csv_file,))
+        if use_api:
+            thread = threading.Thread(target=self.process_csv_api, args=(csv_file, api_key, avatar_id, voice_id))
+        else:
+            thread = threading.Thread(target=self.process_csv, args=(csv_file, api_key))
         thread.start()
         # Poll the thread
         self.poll_thread(thread)
@@ -127,12 +171,13 @@ class HeyGenAutomation(QWidget):
             self.start_button.setEnabled(True)
             self.append_status("Process complete!")
 
-    def process_csv(self, csv_file):
+    @profiled
+    def process_csv(self, csv_file, api_key=""):
         """
         1) Launches Chrome in fullscreen, hides the automation banner, goes to heygen.com.
         2) Iterates each data row in the CSV (skipping header).
-        3) For the first row, do all steps (1–19). For subsequent rows, skip step 1.
-        4) Copies a "Video ID" from step 18, appends it to the CSV in a new "Video ID" column.
+        3) For the first row, do all steps. For subsequent rows, skip step 1.
+        4) Reads the new "Video ID" from the page's network log, appends it to the CSV in a new "Video ID" column.
         5) **After each row**, update (rewrite) the CSV so progress is saved as we go.
         """
         try:
@@ -146,6 +191,8 @@ class HeyGenAutomation(QWidget):
                 headers.extend([""] * (8 - len(headers)))
             # Set the 8th column header to "Video ID"
             headers[7] = "Video ID"
+            confidence_col = confidence_column(headers)
+            first_row = True
 
             # 3. For each data row (index 1..N-1):
             for idx in range(1, len(self.csv_data)):
@@ -153,18 +200,23 @@ class HeyGenAutomation(QWidget):
                 # Ensure the row has at least 7 columns (for the subfolder name and script)
                 if len(row_data) < 7:
                     row_data.extend([""] * (7 - len(row_data)))
+                if self.skip_low_confidence(row_data, idx, confidence_col):
+                    continue
                 self.append_status(f"\nProcessing row {idx} -> {row_data}")
 
-                # If idx == 1 => first data row => do full steps;
-                # if idx > 1 => skip step 1.
-                skip_step_1 = (idx > 1)
+                # The first processed row does the full steps; later rows skip step 1.
+                skip_step_1 = not first_row
+                first_row = False
 
                 # In the new CSV:
                 # - Column 6 (index 5) is the screenshot subfolder name.
                 # - Column 7 (index 6) is the HeyGen script.
                 # We will use row_data[6] for step 10 (pasting the script)
                 # and row_data[5] for step 14 (typing the subfolder name).
-                video_id = self.perform_heygen_steps(row_data, idx, skip_first_step=skip_step_1)
+                with tracer.span(idx + 1, "submit", mode="browser") as span:
+                    video_id = self.perform_heygen_steps(row_data, idx, api_key, skip_first_step=skip_step_1)
+                    if video_id is None:
+                        span.fail("No video id captured")
 
                 # Store the result in our in-memory CSV data as column 8 (index 7)
                 if video_id is not None:
@@ -173,9 +225,7 @@ class HeyGenAutomation(QWidget):
                     row_data[7] = video_id
 
                 # 4. **Rewrite CSV after each row** so progress is saved incrementally.
-                with open(csv_file, "w", newline="", encoding='utf-8-sig') as f:
-                    writer = csv.writer(f)
-                    writer.writerows(self.csv_data)
+                self.write_csv(csv_file)
                 self.append_status(f"Row {idx} updated in CSV.")
 
         except Exception as e:
@@ -187,6 +237,103 @@ class HeyGenAutomation(QWidget):
                 self.driver = None
                 self.append_status("Chrome driver closed.")
 
+    @profiled
+    def process_csv_api(self, csv_file, api_key, avatar_id, voice_id):
+        """
+        Submits every data row to the HeyGen API through the quota-aware scheduler:
+          - Column 6 (index 5) is used as the video title.
+          - Column 7 (index 6) is the script.
+        Rows are submitted in PRIORITY_FIELD order as render slots free up. Returned
+        video ids are stored in column 8 (index 7) and the CSV is rewritten in batches.
+        """
+        client = HeyGenClient(
+            api_key=api_key,
+            avatar_id=avatar_id,
+            voice_id=voice_id,
+            max_workers=API_MAX_IN_FLIGHT + 1,
+        )
+
+        def persist(batch):
+            for idx, video_id in batch:
+                self.csv_data[idx][7] = video_id
+            self.write_csv(csv_file)
+            self.append_status(f"Saved {len(batch)} video IDs to CSV.")
+
+        try:
+            headers = self.csv_data[0]
+            if len(headers) < 8:
+                headers.extend([""] * (8 - len(headers)))
+            headers[7] = "Video ID"
+            priority_column = self.priority_column(headers)
+            confidence_col = confidence_column(headers)
+
+            jobs = []
+            for idx in range(1, len(self.csv_data)):
+                row_data = self.csv_data[idx]
+                if len(row_data) < 8:
+                    row_data.extend([""] * (8 - len(row_data)))
+                if not row_data[6].strip():
+                    self.append_status(f"Row {idx}: no script in column 7. Skipping.")
+                    continue
+                if row_data[7].strip():
+                    # Already submitted by an earlier (partial) run; resubmitting would bill it twice.
+                    self.append_status(f"Row {idx}: video ID already in column 8. Skipping.")
+                    continue
+                if self.skip_low_confidence(row_data, idx, confidence_col):
+                    continue
+                priority = self.row_priority(row_data, priority_column)
+                jobs.append(SubmissionJob(idx, row_data[6], row_data[5], priority, trace_id=idx + 1))
+
+            self.append_status(f"Submitting {len(jobs)} videos to the HeyGen API "
+                               f"({API_MAX_IN_FLIGHT} renders in flight)...")
+            scheduler = SubmissionScheduler(
+                client,
+                max_in_flight=API_MAX_IN_FLIGHT,
+                batch_size=CSV_BATCH_SIZE,
+                on_event=self.append_status,
+            )
+            scheduler.run(jobs, persist)
+            self.append_status(scheduler.format_stats())
+        except Exception as e:
+            self.append_status(f"An error occurred: {e}")
+        finally:
+            client.close()
+
+    def skip_low_confidence(self, row_data, idx, confidence_col):
+        """True (and logged) if step1 matched the row's LinkedIn URL with low confidence."""
+        confidence = low_confidence(row_data, confidence_col)
+        if confidence is None:
+            return False
+        self.append_status(f"Row {idx}: low match confidence ({confidence:.2f}). Skipping.")
+        return True
+
+    def priority_column(self, headers):
+        """Resolve PRIORITY_FIELD to a column index (or None)."""
+        if PRIORITY_FIELD is None:
+            return None
+        if isinstance(PRIORITY_FIELD, int):
+            return PRIORITY_FIELD
+        if PRIORITY_FIELD in headers:
+            return headers.index(PRIORITY_FIELD)
+        self.append_status(f"Priority field '{PRIORITY_FIELD}' not found in headers; using CSV order.")
+        return None
+
+    def row_priority(self, row_data, priority_column):
+        """Sort key for a row: numbers highest first, then text alphabetically."""
+        if priority_column is None or priority_column >= len(row_data):
+            return (0, 0, "")
+        value = row_data[priority_column].strip()
+        try:
+            return (0, -float(value), "")
+        except ValueError:
+            return (1, 0, value.lower())
+
+    def write_csv(self, csv_file):
+        """Rewrite the CSV with the current in-memory data."""
+        with open(csv_file, "w", newline="", encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerows(self.csv_data)
+
     def launch_chrome_and_open_heygen(self):
         """Initialize ChromeDriver with fullscreen, hide automation banner, go to heygen.com."""
         self.append_status("Launching Chrome...")
@@ -202,6 +349,8 @@ class HeyGenAutomation(QWidget):
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option('useAutomationExtension', False)
         chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+        # Network log lets us read the created video id without the clipboard.
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
 
         self.driver = webdriver.Chrome(
             service=Service(ChromeDriverManager().install()),
@@ -223,12 +372,13 @@ class HeyGenAutomation(QWidget):
         self.append_status("Navigated to heygen.com.")
         time.sleep(5)  # Let the page load for a few seconds
 
-    def perform_heygen_steps(self, row_data, row_index, skip_first_step=False):
+    def perform_heygen_steps(self, row_data, row_index, api_key="", skip_first_step=False):
         """
-        Performs the 19 steps with pyautogui, pulling data from row_data.
+        Performs the UI steps with pyautogui, pulling data from row_data.
         For subsequent runs (skip_first_step=True), we skip Step 1.
-        
-        Returns the "video_id" from Step 18, or None if something fails.
+        Text is entered and the video id read back through self.driver (see heygen_handoff).
+
+        Returns the validated "video_id", or None if something fails.
         """
 
         # Helper for smooth clicking.
@@ -238,11 +388,6 @@ class HeyGenAutomation(QWidget):
             pyautogui.click()
             time.sleep(after_click_wait)
 
-        # Helper for smooth hovering (no click).
-        def smooth_hover(x, y, move_duration=1.0, after_hover_wait=2.0):
-            pyautogui.moveTo(x, y, duration=move_duration)
-            time.sleep(after_hover_wait)
-
         # Step 1 (only if not skipping).
         if not skip_first_step:
             # Step 1: Click on 830, 830. Then wait 2 seconds.
@@ -269,21 +414,13 @@ class HeyGenAutomation(QWidget):
         # Step 8: Click on 250, 330. Then wait 2 seconds.
         smooth_click(250, 330, move_duration=1.0, after_click_wait=2)
 
-        # Step 9: Press Cmd + A to select all. Then wait 2 seconds.
-        if platform.system() == "Darwin":
-            pyautogui.hotkey("command", "a")
-        else:
-            pyautogui.hotkey("ctrl", "a")
-        time.sleep(2)
-
-        # Step 10: Paste the value from row_data[6] (the script) then wait 2 seconds.
-        text_for_script = row_data[6]
-        pyperclip.copy(text_for_script)
-        time.sleep(1)  # Allow clipboard to update
-        if platform.system() == "Darwin":
-            pyautogui.hotkey("command", "v")
-        else:
-            pyautogui.hotkey("ctrl", "v")
+        # Steps 9-10: Replace the focused script field's contents with row_data[6]
+        # through the DOM (no select-all/paste, no clipboard). Then wait 2 seconds.
+        try:
+            heygen_handoff.insert_text(self.driver, row_data[6])
+        except heygen_handoff.HandoffError as e:
+            self.append_status(f"Row {row_index}: could not enter script: {e}")
+            return None
         time.sleep(2)
 
         # Step 11: Click on 627, 282. Then wait 30 seconds.
@@ -295,45 +432,59 @@ class HeyGenAutomation(QWidget):
         # Step 13: Click on 917, 319. Then wait 2 seconds.
         smooth_click(917, 319, move_duration=1.0, after_click_wait=2)
 
-        # Step 14: Type the value from row_data[5] (the subfolder name) then wait 2 seconds.
-        text_for_subfolder = row_data[5]
-        pyautogui.typewrite(text_for_subfolder, interval=0.02)
+        # Step 14: Enter the value from row_data[5] (the subfolder name) then wait 2 seconds.
+        try:
+            heygen_handoff.insert_text(self.driver, row_data[5])
+        except heygen_handoff.HandoffError as e:
+            self.append_status(f"Row {row_index}: could not enter title: {e}")
+            return None
         time.sleep(2)
 
-        # Step 15: Click on 902, 744. Then wait 20 seconds.
+        # Step 15: Click on 902, 744 to submit. Then wait 20 seconds.
+        # Only network traffic from here on is searched for the new video id.
+        heygen_handoff.clear_network_log(self.driver)
+        submitted_at = time.time()
         smooth_click(902, 744, move_duration=1.0, after_click_wait=20)
 
-        # Step 16: Click on 557, 748. Then wait 2 seconds.
-        smooth_click(557, 748, move_duration=1.0, after_click_wait=2)
-
-        # Step 17: Hover to 475, 748. Do not click. Wait 2 seconds.
-        smooth_hover(475, 748, move_duration=1.0, after_hover_wait=2)
-
-        # Step 18: Hover to 475, 701. Wait 1 second, then click.
-        pyautogui.moveTo(475, 701, duration=1.0)
-        time.sleep(1)
-        pyautogui.click()
-        time.sleep(1)
-
-        # "Copy Video ID" from the clipboard.
-        video_id = pyperclip.paste().strip()
-        self.append_status(f"Copied Video ID: {video_id}")
+        # Steps 16-18 used to copy the Video ID to the clipboard; read it from the
+        # submit request's response instead, and reject ids already stored for
+        # other rows (other ids on the page are used only if the API dates them
+        # after the submit, which needs a key).
+        known_ids = [
+            row[7].strip() for i, row in enumerate(self.csv_data)
+            if i not in (0, row_index) and len(row) > 7 and row[7].strip()
+        ]
+        try:
+            video_id = heygen_handoff.read_video_id(
+                self.driver, known_ids=known_ids, submitted_at=submitted_at,
+                created_at=(lambda candidate: self.video_created_at(api_key, candidate)) if api_key else None,
+            )
+        except heygen_handoff.HandoffError as e:
+            self.append_status(f"Row {row_index}: no valid Video ID: {e}")
+            return None
+        self.append_status(f"Captured Video ID: {video_id}")
 
         # Step 19: Return the video_id so the caller can store it.
         return video_id
 
+    def video_created_at(self, api_key, video_id):
+        """The API's creation time (Unix seconds) of 'video_id', or None if it is unknown."""
+        client = HeyGenClient(api_key=api_key, avatar_id="", voice_id="")
+        try:
+            created_at = client.video_status(video_id).get("created_at")
+        except Exception:
+            return None
+        finally:
+            client.close()
+        return created_at if isinstance(created_at, (int, float)) else None
+
     def append_status(self, msg):
-        """Thread-safe method to append a message to the status box."""
-        with self.thread_lock:
-            def do_append():
-                self.status_text.append(msg)
-                self.status_text.verticalScrollBar().setValue(
-                    self.status_text.verticalScrollBar().maximum()
-                )
-            QTimer.singleShot(0, do_append)
+        """Thread-safe: queues a message for the status box and the log file."""
+        self.log.write(msg)
 
 
 def main():
+    enable_from_argv("step4")
     app = QApplication(sys.argv)
     window = HeyGenAutomation()
     window.show()
@@ -2,8 +2,35 @@ import tkinter as tk
 from tkinter import filedialog, messagebox
 import csv
 import os
-import requests
-import time
+import threading
+
+from folder_index import get_index
+from log_view import LogBuffer, attach_tk, log_path
+from profiling import enable_from_argv, profiled
+from video_downloader import DownloadEngine, DownloadJob
+
+# Bounds for the adaptive delay between status checks of one video (seconds).
+# Videos are polled until they complete or fail; there is no attempt cap.
+MIN_POLL_INTERVAL = 5
+MAX_POLL_INTERVAL = 120
+# Optional limits (None = off): abandon a video after this many failed status
+# checks in a row, or once it has rendered for this many seconds. Abandoned rows
+# are listed when the run ends and are picked up again by the next run.
+MAX_STATUS_ERRORS = None
+MAX_RENDER_AGE = None
+# Poll state (video ages, observed render times) kept in the main folder across runs.
+STATUS_STATE_FILE = ".video_status_state.json"
+# Concurrent connections allowed to any one host (API and video storage).
+MAX_CONNECTIONS_PER_HOST = 4
+# Parallel ranged segments for very large videos (1 = single stream).
+DOWNLOAD_SEGMENTS = 1
+# Port for HeyGen completion webhooks (None = poll only). The endpoint
+# http://<public host>:<port>/heygen/webhook must be registered with HeyGen.
+WEBHOOK_PORT = None
+# Without a secret the receiver only listens on 127.0.0.1 (reach it through a local tunnel).
+WEBHOOK_SECRET = None
+# Shortest delay between status checks while webhooks are enabled (seconds).
+WEBHOOK_FALLBACK_INTERVAL = 60
 
 def select_csv_file():
     file_path = filedialog.askopenfilename(filetypes=[("CSV Files", "*.csv")])
@@ -17,6 +44,11 @@ def select_main_folder():
         main_folder_path.set(folder_path)
         folder_label.config(text=folder_path)
 
+def log(message):
+    """Queue a line for the progress box and the log file; safe to call from worker threads."""
+    log_buffer.write(message)
+
+@profiled
 def download_videos():
     csv_path = csv_file_path.get()
     main_folder = main_folder_path.get()
@@ -26,9 +58,6 @@ def download_videos():
         messagebox.showerror("Error", "Please select both the CSV file and the main folder.")
         return
 
-    # Use the x-api-key header instead of an Authorization Bearer token.
-    headers = {"x-api-key": api_key} if api_key else {}
-
     try:
         with open(csv_path, newline='', encoding='utf-8') as csvfile:
             reader = csv.reader(csvfile)
@@ -42,100 +71,75 @@ def download_videos():
         return
 
     total_rows = len(all_rows) - 1  # Excluding header.
-    progress_text.delete("1.0", tk.END)
-    progress_text.insert(tk.END, f"Starting download for {total_rows} videos...\n\n")
+    log_buffer.clear()
+    log(f"Starting download for {total_rows} videos...\n")
 
-    # Process each video (starting from row 2, because row 1 is header).
+    # Build one job per row (starting from row 2, because row 1 is header).
+    folder_index = get_index(main_folder)
+    jobs = []
     for row_number, row in enumerate(all_rows[1:], start=2):
         if len(row) < 8:
-            progress_text.insert(tk.END, f"Row {row_number}: Not enough columns. Skipping.\n")
+            log(f"Row {row_number}: Not enough columns. Skipping.")
             continue
 
         video_id = row[7].strip()  # 8th column (index 7)
         if not video_id:
-            progress_text.insert(tk.END, f"Row {row_number}: No video ID found. Skipping.\n")
-            continue
-
-        # --- Step 1: Query the Video Status Endpoint ---
-        video_status_url = f"https://api.heygen.com/v1/video_status.get?video_id={video_id}"
-        progress_text.insert(tk.END, f"Row {row_number}: Querying video status at:\n{video_status_url}\n")
-        progress_text.update_idletasks()
-
-        max_attempts = 12  # wait up to 60 seconds (12*5 seconds)
-        attempt = 0
-        video_url = None
-
-        while attempt < max_attempts:
-            try:
-                status_response = requests.get(video_status_url, headers=headers)
-                status_response.raise_for_status()
-                status_json = status_response.json()
-            except Exception as e:
-                progress_text.insert(tk.END, f"Row {row_number}: Error fetching video status: {e}\n")
-                break
-
-            # Expected JSON structure:
-            # { "data": { "status": "...", "video_url": "...", "thumbnail_url": "..." } }
-            data = status_json.get("data", {})
-            video_status = data.get("status")
-            if video_status == "completed":
-                video_url = data.get("video_url")
-                progress_text.insert(tk.END, f"Row {row_number}: Video completed!\nVideo URL: {video_url}\n")
-                break
-            elif video_status in ["processing", "pending"]:
-                progress_text.insert(tk.END, f"Row {row_number}: Video is still {video_status}. Checking again in 5 seconds...\n")
-                progress_text.update_idletasks()
-                time.sleep(5)
-                attempt += 1
-                continue
-            elif video_status == "failed":
-                error_message = data.get("error", "Unknown error")
-                progress_text.insert(tk.END, f"Row {row_number}: Video generation failed: {error_message}\n")
-                break
-            else:
-                progress_text.insert(tk.END, f"Row {row_number}: Unexpected video status: {video_status}\n")
-                break
-
-        if not video_url:
-            progress_text.insert(tk.END, f"Row {row_number}: Video URL not retrieved, skipping.\n\n")
-            continue
-
-        # --- Step 2: Download the Video ---
-        progress_text.insert(tk.END, f"Row {row_number}: Downloading video from:\n{video_url}\n")
-        progress_text.update_idletasks()
-        try:
-            video_response = requests.get(video_url)
-            video_response.raise_for_status()
-        except Exception as e:
-            progress_text.insert(tk.END, f"Row {row_number}: Error downloading video: {e}\n")
+            log(f"Row {row_number}: No video ID found. Skipping.")
             continue
 
-        # --- Step 3: Save the Video in the Correct Subfolder ---
-        # Find a subfolder in the main folder that starts with the row number.
-        folder_candidates = [
-            f for f in os.listdir(main_folder)
-            if os.path.isdir(os.path.join(main_folder, f)) and f.startswith(str(row_number))
-        ]
-        if not folder_candidates:
-            progress_text.insert(tk.END, f"Row {row_number}: No subfolder starting with '{row_number}' found. Skipping.\n")
+        # Find the subfolder in the main folder numbered with this row.
+        subfolder_path = folder_index.path(row_number)
+        if subfolder_path is None:
+            log(f"Row {row_number}: No subfolder numbered '{row_number}' found. Skipping.")
             continue
-        subfolder_path = os.path.join(main_folder, folder_candidates[0])
 
         # Create the "HeyGen Video" folder inside the subfolder.
         heyg_folder = os.path.join(subfolder_path, "HeyGen Video")
         os.makedirs(heyg_folder, exist_ok=True)
-
         video_file_path = os.path.join(heyg_folder, "video.mp4")
-        try:
-            with open(video_file_path, "wb") as video_file:
-                video_file.write(video_response.content)
-            progress_text.insert(tk.END, f"Row {row_number}: Video saved to:\n{video_file_path}\n\n")
-        except Exception as e:
-            progress_text.insert(tk.END, f"Row {row_number}: Error saving video: {e}\n\n")
+        if os.path.exists(video_file_path):
+            log(f"Row {row_number}: Video already downloaded. Skipping.")
             continue
-
-    progress_text.insert(tk.END, "Download process completed.\n")
-    messagebox.showinfo("Done", "Download process completed.")
+        jobs.append(DownloadJob(row_number, video_id, video_file_path))
+
+    download_button.config(state=tk.DISABLED)
+    threading.Thread(target=run_downloads, args=(jobs, api_key, os.path.join(main_folder, STATUS_STATE_FILE)), daemon=True).start()
+
+@profiled
+def run_downloads(jobs, api_key, state_path):
+    """Worker thread: poll every pending video at once and download each as soon as it completes."""
+    engine = DownloadEngine(
+        api_key,
+        max_per_host=MAX_CONNECTIONS_PER_HOST,
+        min_interval=MIN_POLL_INTERVAL,
+        max_interval=MAX_POLL_INTERVAL,
+        state_path=state_path,
+        segments=DOWNLOAD_SEGMENTS,
+        webhook_port=WEBHOOK_PORT,
+        webhook_secret=WEBHOOK_SECRET,
+        fallback_interval=WEBHOOK_FALLBACK_INTERVAL,
+        max_status_errors=MAX_STATUS_ERRORS,
+        max_render_age=MAX_RENDER_AGE,
+        on_event=log,
+    )
+    try:
+        stats = engine.run(jobs)
+    finally:
+        engine.close()
+    log(f"Download process completed: {stats['downloaded']} downloaded, "
+        f"{stats['failed']} failed, {stats['abandoned']} abandoned in {stats['elapsed_seconds']}s.")
+    abandoned_rows = ", ".join(str(row_number) for row_number, _, _ in engine.abandoned)
+
+    def done():
+        download_button.config(state=tk.NORMAL)
+        if abandoned_rows:
+            messagebox.showwarning("Done", "Download process completed. Gave up waiting for the videos of "
+                                           f"rows {abandoned_rows}; run it again later to download them.")
+        else:
+            messagebox.showinfo("Done", "Download process completed.")
+    root.after(0, done)
+
+enable_from_argv("step5")
 
 # Set up the Tkinter GUI.
 root = tk.Tk()
@@ -177,4 +181,8 @@ download_button.grid(row=4, column=0, columnspan=2, pady=10)
 progress_text = tk.Text(frame, width=70, height=18)
 progress_text.grid(row=5, column=0, columnspan=2, pady=10)
 
+# Bounded progress log: batched into the box above, full history in logs/step5.log
+log_buffer = LogBuffer(log_file=log_path("step5"))
+attach_tk(log_buffer, root, progress_text)
+
 root.mainloop()
\ No newline at end of file
@@ -6,8 +6,35 @@ import threading
 import time
 import concurrent.futures
 
+from ffmpeg_encoders import EncoderError, select_encoder
+from ffmpeg_progress import ProgressBoard, iter_progress, out_time_seconds, start_ui_pump
+from folder_index import get_index, parse_row_number
+from media_probe import MediaProbeCache, ProbeError
+from overlay_graph import audio_args, build_filter_graph, render_command
+from overlay_mask import circle_mask_path
+from profiling import enable_from_argv, profiled
+from render_cache import RenderManifest, settings_hash
+from render_scheduler import RenderJob, RenderScheduler
+from tracing import tracer
+
+# Force an encoder ("videotoolbox", "nvenc", "qsv", "vaapi" or "libx264");
+# None picks the fastest one that works on this machine.
+PREFERRED_ENCODER = None
+# Overlay (HeyGen avatar) size as a fraction of the screen recording's width.
+OVERLAY_SCALE = 0.14
+# Folder inside "Final Video" holding the generated circle masks.
+MASK_CACHE_DIR = ".masks"
+# Cap on simultaneous renders (None = sized from the core count and encoder).
+MAX_PARALLEL_RENDERS = None
+# ffprobe calls made at the same time while preparing the folders.
+PROBE_WORKERS = 8
+# Input files picked up from "HeyGen Video" and "Screen Recording".
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.m4v', '.mkv', '.webm')
+
 # Global dictionary to hold progress widgets per folder
 folder_widgets = {}
+# Latest progress per folder, written by render threads and drained by the UI pump.
+progress_board = ProgressBoard()
 
 def select_main_folder():
     folder = filedialog.askdirectory(title="Select Main Videos Folder")
@@ -20,14 +47,15 @@ def select_main_folder():
         folder_widgets.clear()
 
 def update_folder_progress(folder_name, progress, remaining):
-    # Called from worker threads via root.after to update the widgets
+    # Called on the Tk thread by the progress pump (ffmpeg_progress.start_ui_pump)
     if folder_name in folder_widgets:
         progress_bar, progress_label = folder_widgets[folder_name]
         progress_bar['value'] = progress
         progress_label.config(text=f"{progress:.1f}%  ETA: {remaining:.1f}s")
 
-def process_single_folder(subfolder_name, subfolder_path, global_output_dir):
-    """Processes a single folder and saves the final video in the global output directory."""
+@profiled
+def prepare_folder(subfolder_name, subfolder_path, global_output_dir, probe_cache):
+    """Finds a folder's two input videos and probes them; returns a RenderJob or None."""
     heygen_dir = os.path.join(subfolder_path, "HeyGen Video")
     screen_dir = os.path.join(subfolder_path, "Screen Recording")
 
@@ -35,9 +63,12 @@ def process_single_folder(subfolder_name, subfolder_path, global_output_dir):
         print(f"Skipping folder {subfolder_name}: Missing required subfolders.")
         return
 
-    # Get one video file from each folder (assuming one per folder)
-    heygen_files = [f for f in os.listdir(heygen_dir) if os.path.isfile(os.path.join(heygen_dir, f))]
-    screen_files = [f for f in os.listdir(screen_dir) if os.path.isfile(os.path.join(screen_dir, f))]
+    # Get one finished video file from each folder (assuming one per folder); partial
+    # downloads (.part) and other files are ignored.
+    heygen_files = sorted(f for f in os.listdir(heygen_dir)
+                          if f.lower().endswith(VIDEO_EXTENSIONS) and os.path.isfile(os.path.join(heygen_dir, f)))
+    screen_files = sorted(f for f in os.listdir(screen_dir)
+                          if f.lower().endswith(VIDEO_EXTENSIONS) and os.path.isfile(os.path.join(screen_dir, f)))
     if not heygen_files or not screen_files:
         print(f"Skipping folder {subfolder_name}: Could not find a video file in one or both subfolders.")
         return
@@ -48,75 +79,73 @@ def process_single_folder(subfolder_name, subfolder_path, global_output_dir):
     # Use the global output directory instead of creating one in each subfolder.
     output_path = os.path.join(global_output_dir, f"{subfolder_name}.mp4")
 
-    # Get the total duration of the screen video via ffprobe.
-    ffprobe_cmd = [
-        "ffprobe",
-        "-v", "error",
-        "-show_entries", "format=duration",
-        "-of", "default=noprint_wrappers=1:nokey=1",
-        screen_video
-    ]
+    # Both inputs are probed once; unchanged files come from the probe cache.
     try:
-        duration_output = subprocess.check_output(ffprobe_cmd, stderr=subprocess.STDOUT, text=True)
-        total_duration = float(duration_output.strip())
-    except Exception as e:
-        print(f"Error obtaining duration for folder {subfolder_name}: {e}")
+        screen_info = probe_cache.get(screen_video)
+        heygen_info = probe_cache.get(heygen_video)
+    except (OSError, ProbeError) as e:
+        print(f"Error probing videos for folder {subfolder_name}: {e}")
         return
+    if not screen_info.width:
+        print(f"Skipping folder {subfolder_name}: No video stream in {screen_video}.")
+        return
+
+    return RenderJob(subfolder_name, screen_info, heygen_info, output_path)
 
-    # Build the filter chain:
-    # 1. Use scale2ref to scale the overlay video (HeyGen) relative to the background (Screen Recording)
-    #    so that its width and height become 14% of the background video's width.
-    # 2. Convert the scaled overlay to RGBA and apply a circular mask.
-    #    The geq filter uses the overlay's width (W) to compute the center (W/2, H/2) and radius (W/2).
-    # 3. Overlay the circular video onto the background with a 20px margin from the top and right.
-    filter_complex = (
-        "[1:v][0:v]scale2ref=w=iw*0.14:h=iw*0.14[ovrl][base];"
-        "[ovrl]format=rgba,"
-        "geq=a='if(gt(pow(X-(W/2),2)+pow(Y-(H/2),2),(W/2)*(W/2)),0,255)':"
-        "r='r(X,Y)':g='g(X,Y)':b='b(X,Y)'[circ];"
-        "[base][circ]overlay=main_w-overlay_w-543:270:shortest=1"
-    )
-
-    # Construct FFmpeg command with hardware acceleration and progress reporting.
-    ffmpeg_cmd = [
-        "ffmpeg",
-        "-y",                          # Overwrite output
-        "-hwaccel", "videotoolbox",    # Use VideoToolbox for hardware decoding
-        "-i", screen_video,            # Background video (Screen Recording)
-        "-i", heygen_video,            # Overlay video (HeyGen Video)
-        "-filter_complex", filter_complex,
-        "-c:v", "h264_videotoolbox",   # Use VideoToolbox encoder for H.264
-        "-c:a", "copy",                # Copy audio from background
-        "-progress", "pipe:1",         # Send progress info to stdout
-        output_path
-    ]
+def render_settings(job, encoder):
+    """Hash of everything besides the inputs that determines a folder's output."""
+    filter_complex, _ = build_filter_graph(job, encoder, OVERLAY_SCALE)
+    return settings_hash(filter_complex, encoder.encode_args(), audio_args(job))
+
+@profiled
+def render_folder(job, encoder, global_output_dir, threads, manifest, settings):
+    """
+    Renders one prepared folder into the global output directory; returns the frames encoded.
+    'settings' is the job's render_settings hash, recorded in the manifest on success.
+    Raises RuntimeError if ffmpeg fails.
+    """
+    subfolder_name, output_path, total_duration = job.name, job.output_path, job.duration
+
+    filter_complex, overlay_size = build_filter_graph(job, encoder, OVERLAY_SCALE)
+    mask_path = circle_mask_path(overlay_size, os.path.join(global_output_dir, MASK_CACHE_DIR))
+
+    # Construct FFmpeg command with the selected encoder and progress reporting.
+    ffmpeg_cmd = render_command(job, encoder, filter_complex, mask_path, threads)
 
     print(f"Processing folder {subfolder_name}...")
     start_time = time.time()
     process = subprocess.Popen(ffmpeg_cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
 
-    # Read FFmpeg progress output line-by-line.
-    while True:
-        line = process.stdout.readline()
-        if not line:
-            if process.poll() is not None:
-                break
+    # Read FFmpeg's progress blocks until the pipe closes; only the latest value per
+    # folder is kept on the board, which the UI drains at a fixed rate.
+    frames = 0
+    log_lines = []
+    for block in iter_progress(process.stdout, log_lines):
+        if block.get("frame", "").isdigit():
+            frames = int(block["frame"])
+        current_time_sec = out_time_seconds(block)
+        if current_time_sec is None or total_duration <= 0:
             continue
-        line = line.strip()
-        if line.startswith("out_time_ms="):
-            try:
-                out_time_ms = int(line.split("=")[1])
-                current_time_sec = out_time_ms / 1_000_000.0  # Convert microseconds to seconds.
-                progress = (current_time_sec / total_duration) * 100
-                elapsed = time.time() - start_time
-                estimated_total = elapsed / (progress / 100) if progress > 0 else 0
-                remaining = estimated_total - elapsed if estimated_total > elapsed else 0
-                root.after(0, update_folder_progress, subfolder_name, progress, remaining)
-            except Exception as e:
-                print(f"Error parsing progress in folder {subfolder_name}: {e}")
+        progress = min(100.0, current_time_sec / total_duration * 100)
+        elapsed = time.time() - start_time
+        estimated_total = elapsed / (progress / 100) if progress > 0 else 0
+        remaining = estimated_total - elapsed if estimated_total > elapsed else 0
+        progress_board.update(subfolder_name, progress, remaining)
     process.wait()
-    root.after(0, update_folder_progress, subfolder_name, 100, 0)
+    failed = process.returncode != 0
+    tracer.record(parse_row_number(subfolder_name), "composite", start_time, time.time() - start_time,
+                  "error" if failed else "ok", f"ffmpeg exited with code {process.returncode}" if failed else None,
+                  encoder=encoder.name, frames=frames, threads=threads)
+    if failed:
+        print(f"Error rendering folder {subfolder_name}: ffmpeg exited with code {process.returncode}")
+        for line in log_lines[-5:]:
+            print(f"  {line}")
+        # Raised so the scheduler counts the folder as failed and leaves its frames out.
+        raise RuntimeError(f"ffmpeg exited with code {process.returncode}: " + " | ".join(log_lines[-5:]))
+    manifest.record(output_path, job.inputs, settings)
+    progress_board.update(subfolder_name, 100, 0)
     print(f"Folder {subfolder_name} processed. Output saved to: {output_path}")
+    return frames
 
 def process_all_folders():
     main_folder = main_folder_var.get()
@@ -124,18 +153,22 @@ def process_all_folders():
         messagebox.showerror("Error", "Please select a main videos folder first.")
         return
 
-    # Get a sorted list of subfolders based on the number preceding the '-' in the folder name.
-    subfolders = []
-    for name in os.listdir(main_folder):
-        sub_path = os.path.join(main_folder, name)
-        if os.path.isdir(sub_path):
-            parts = name.split("-")
-            if parts and parts[0].strip().isdigit():
-                num = int(parts[0].strip())
-                subfolders.append((num, name, sub_path))
-    subfolders.sort(key=lambda x: x[0])
+    # Subfolders sorted by the number preceding the '-' in the folder name.
+    folder_index = get_index(main_folder)
+    unnumbered = folder_index.unparsed + folder_index.duplicates
+    for subfolder in unnumbered:
+        print(f"Skipping folder '{subfolder}': no unique row number prefix (expected e.g. '12 - Jane Doe').")
+    subfolders = folder_index.items()
     if not subfolders:
         messagebox.showerror("Error", "No valid subfolders with a leading number were found.")
+        process_button.config(state=tk.NORMAL)
+        return
+
+    try:
+        encoder = select_encoder(preferred=PREFERRED_ENCODER)
+    except EncoderError as e:
+        messagebox.showerror("Error", str(e))
+        process_button.config(state=tk.NORMAL)
         return
 
     # Determine global output folder: the parent of the main folder plus "Final Video".
@@ -158,21 +191,58 @@ def process_all_folders():
         status.pack(side="left")
         folder_widgets[folder_name] = (pb, status)
 
-    # Process folders concurrently.
-    max_workers = 3  # Adjust as needed.
-    futures = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        for _, folder_name, folder_path in subfolders:
-            future = executor.submit(process_single_folder, folder_name, folder_path, global_output_dir)
-            futures.append(future)
-        concurrent.futures.wait(futures)
-    messagebox.showinfo("Done", "All folders have been processed.")
+    # Probe every folder first so the scheduler can start the longest videos first.
+    probe_cache = MediaProbeCache(global_output_dir)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=PROBE_WORKERS) as executor:
+        jobs = [job for job in executor.map(
+                    lambda entry: prepare_folder(entry[1], entry[2], global_output_dir, probe_cache), subfolders)
+                if job is not None]
+    probe_cache.save()
+    print(f"Probed {probe_cache.stats['probes']} videos ({probe_cache.stats['hits']} cached).")
+
+    # Skip outputs already rendered from the same inputs and settings.
+    manifest = RenderManifest(global_output_dir)
+    settings = {}
+    to_render = []
+    up_to_date = 0
+    for job in jobs:
+        settings[job.name] = render_settings(job, encoder)
+        if manifest.is_current(job.output_path, job.inputs, settings[job.name]):
+            progress_board.update(job.name, 100, 0)
+            up_to_date += 1
+        else:
+            to_render.append(job)
+    print(f"{up_to_date} folders up to date, {len(to_render)} to render.")
+
+    # Render concurrently, sized to this machine's cores and the encoder.
+    scheduler = RenderScheduler(encoder.name, max_jobs=MAX_PARALLEL_RENDERS)
+    scheduler.run(to_render, lambda job, threads: render_folder(job, encoder, global_output_dir, threads, manifest,
+                                                               settings[job.name]))
+    print(scheduler.format_stats())
+    notes = []
+    if scheduler.errors:
+        notes.append(f"{len(scheduler.errors)} failed: " + ", ".join(name for name, _ in scheduler.errors))
+    if unnumbered:
+        notes.append(f"{len(unnumbered)} skipped (no unique row number prefix): " + ", ".join(unnumbered))
+    if notes:
+        messagebox.showwarning("Done", "All folders have been processed; " + "; ".join(notes))
+    else:
+        messagebox.showinfo("Done", "All folders have been processed.")
     process_button.config(state=tk.NORMAL)
 
+def probe_encoder():
+    # Runs once at startup so the first batch does not wait for the probe; the result is cached.
+    try:
+        print(f"Using encoder: {select_encoder(preferred=PREFERRED_ENCODER).codec}")
+    except EncoderError as e:
+        print(f"Encoder probe failed: {e}")
+
 def start_processing():
     process_button.config(state=tk.DISABLED)
     threading.Thread(target=process_all_folders, daemon=True).start()
 
+enable_from_argv("step6")
+
 # Set up the Tkinter GUI.
 root = tk.Tk()
 root.title("Parallel Video Overlay Processor")
@@ -192,4 +262,6 @@ process_button.pack(padx=10, pady=10)
 progress_container = tk.Frame(root)
 progress_container.pack(padx=10, pady=10, fill="x")
 
+threading.Thread(target=probe_encoder, daemon=True).start()
+start_ui_pump(root, progress_board, update_folder_progress)
 root.mainloop()
\ No newline at end of file
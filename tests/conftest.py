@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Spans stay in memory: tracing.tracer would otherwise append to logs/traces.jsonl in the tree.
+os.environ["TRACE_FILE"] = ""
+
+# The pipeline modules live at the top of the repository, next to the step scripts.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
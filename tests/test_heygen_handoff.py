@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from heygen_handoff import HandoffError, read_video_id
+
+NEW_ID = "a" * 32
+OLD_ID = "b" * 32
+ROW_ID = "c" * 32
+
+
+class FakeDriver:
+    """Replays performance-log entries; 'bodies' maps request ids to response bodies."""
+
+    def __init__(self, events, bodies=None, current_url=""):
+        self.entries = [{"message": json.dumps({"message": event})} for event in events]
+        self.bodies = bodies or {}
+        self.current_url = current_url
+
+    def get_log(self, kind):
+        return self.entries
+
+    def execute_cdp_cmd(self, command, params):
+        return {"body": self.bodies[params["requestId"]]}
+
+
+def request(request_id, url, method="GET"):
+    return {"method": "Network.requestWillBeSent",
+            "params": {"requestId": request_id, "request": {"url": url, "method": method}}}
+
+
+def response(request_id, url):
+    return {"method": "Network.responseReceived", "params": {"requestId": request_id, "response": {"url": url}}}
+
+
+def test_submit_response_wins_over_thumbnails():
+    driver = FakeDriver(
+        [request("1", "https://api.heygen.com/v2/video/generate", "POST"),
+         response("1", "https://api.heygen.com/v2/video/generate"),
+         # Loaded after the submit: an older video's thumbnail.
+         request("2", f"https://resource.heygen.ai/video/{OLD_ID}/thumbnail.jpg")],
+        bodies={"1": json.dumps({"data": {"video_id": NEW_ID}})},
+    )
+    assert read_video_id(driver) == NEW_ID
+
+
+def test_decoy_post_with_a_video_id_is_not_the_submit():
+    driver = FakeDriver(
+        [request("1", "https://api.heygen.com/v2/video/generate", "POST"),
+         response("1", "https://api.heygen.com/v2/video/generate"),
+         # A later POST from the page (telemetry / list refresh) naming an older video.
+         request("2", "https://api.heygen.com/v1/video/list", "POST"),
+         response("2", "https://api.heygen.com/v1/video/list")],
+        bodies={"1": json.dumps({"data": {"video_id": NEW_ID}}),
+                "2": json.dumps({"data": {"videos": [{"video_id": OLD_ID}]}})},
+    )
+    assert read_video_id(driver) == NEW_ID
+
+
+def test_decoy_post_alone_is_not_trusted():
+    driver = FakeDriver(
+        [request("1", "https://app.heygen.com/api/video/track", "POST"),
+         response("1", "https://app.heygen.com/api/video/track")],
+        bodies={"1": json.dumps({"video_id": OLD_ID})},
+    )
+    with pytest.raises(HandoffError):
+        read_video_id(driver)
+
+
+def test_other_ids_need_a_creation_time_after_the_submit():
+    driver = FakeDriver([request("1", f"https://app.heygen.com/videos/{OLD_ID}"),
+                         request("2", f"https://app.heygen.com/videos/{NEW_ID}")])
+    created = {OLD_ID: 500.0, NEW_ID: 1005.0}
+    assert read_video_id(driver, submitted_at=1000.0, created_at=created.get) == NEW_ID
+    with pytest.raises(HandoffError):
+        read_video_id(driver)
+    with pytest.raises(HandoffError):
+        read_video_id(driver, submitted_at=2000.0, created_at=created.get)
+
+
+def test_several_new_videos_are_ambiguous():
+    driver = FakeDriver([request("1", f"https://app.heygen.com/videos/{OLD_ID}")],
+                        current_url=f"https://app.heygen.com/videos/{NEW_ID}")
+    with pytest.raises(HandoffError):
+        read_video_id(driver, submitted_at=1000.0, created_at=lambda video_id: 1001.0)
+
+
+def test_known_ids_are_never_returned():
+    driver = FakeDriver(
+        [request("1", "https://api.heygen.com/v2/video/generate", "POST"),
+         response("1", "https://api.heygen.com/v2/video/generate")],
+        bodies={"1": json.dumps({"data": {"video_id": ROW_ID}})},
+        current_url=f"https://app.heygen.com/videos/{ROW_ID}",
+    )
+    with pytest.raises(HandoffError):
+        read_video_id(driver, known_ids=[ROW_ID], submitted_at=1000.0, created_at=lambda video_id: 1001.0)
@@ -0,0 +1,173 @@
+import time
+
+import pytest
+
+import video_downloader
+from heygen_client import HeyGenClient, HeyGenError
+from heygen_scheduler import SubmissionJob, SubmissionScheduler
+from mock_heygen import MockHeyGenServer
+from video_downloader import DownloadEngine, DownloadJob
+
+
+@pytest.fixture
+def mock():
+    server = MockHeyGenServer(render_seconds=0.2, video_size=256 * 1024).start()
+    yield server
+    server.stop()
+
+
+def client_for(server, api_key=""):
+    return HeyGenClient(api_key, avatar_id="avatar", voice_id="voice", base_url=server.url)
+
+
+def wait_for_status(client, video_id, wanted, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        data = client.video_status(video_id)
+        if data.get("status") == wanted:
+            return data
+        time.sleep(0.05)
+    raise AssertionError(f"{video_id} never reached {wanted}")
+
+
+def test_generate_and_status(mock):
+    client = client_for(mock)
+    try:
+        video_id = client.generate_video("Hello there.", "2 - Jane Doe")
+        assert mock.videos[video_id]["title"] == "2 - Jane Doe"
+        assert client.video_status(video_id)["status"] == "processing"
+        data = wait_for_status(client, video_id, "completed")
+        assert data["video_url"].endswith(f"/videos/{video_id}.mp4")
+    finally:
+        client.close()
+
+
+def test_generate_rejects_empty_script_and_bad_key():
+    with MockHeyGenServer(render_seconds=0.1, api_key="right") as server:
+        client = client_for(server, api_key="wrong")
+        try:
+            with pytest.raises(HeyGenError):
+                client.generate_video("   ")
+            with pytest.raises(HeyGenError) as error:
+                client.generate_video("Hello there.")
+            assert error.value.status_code == 401
+            assert not error.value.rate_limited
+        finally:
+            client.close()
+
+
+def test_quota_429_is_rate_limited():
+    with MockHeyGenServer(render_seconds=1.0, max_concurrent_renders=1) as server:
+        client = client_for(server)
+        try:
+            client.generate_video("First.")
+            with pytest.raises(HeyGenError) as error:
+                client.generate_video("Second.")
+            assert error.value.status_code == 429
+            assert error.value.rate_limited
+        finally:
+            client.close()
+
+
+def test_scheduler_backs_off_and_submits_every_job():
+    with MockHeyGenServer(render_seconds=0.2, max_concurrent_renders=2) as server:
+        client = client_for(server)
+        saved = {}
+        try:
+            # More slots than the account quota, so some submissions are rejected with 429.
+            scheduler = SubmissionScheduler(client, max_in_flight=4, poll_interval=0.05, batch_size=2,
+                                            batch_seconds=0.1, rate_limit_backoff=0.1)
+            jobs = [SubmissionJob(row, f"Script {row}.", f"{row} - Lead") for row in range(2, 8)]
+            results = scheduler.run(jobs, lambda batch: saved.update(batch))
+        finally:
+            client.close()
+    assert sorted(results) == list(range(2, 8))
+    assert saved == results
+    assert len(set(results.values())) == 6
+    assert scheduler.stats["submitted"] == 6
+    assert scheduler.stats["rate_limited"] > 0
+    assert scheduler.stats["failed_submissions"] == 0
+
+
+def test_scheduler_frees_slot_of_unknown_video(mock):
+    class LostVideoClient:
+        # The first video id is unknown to the server, so its status check returns 404.
+        def __init__(self, client):
+            self.client = client
+            self.first = True
+
+        def generate_video(self, script, title=""):
+            video_id = self.client.generate_video(script, title)
+            if self.first:
+                self.first = False
+                return "missing-" + video_id
+            return video_id
+
+        def video_status(self, video_id):
+            return self.client.video_status(video_id)
+
+    client = client_for(mock)
+    try:
+        scheduler = SubmissionScheduler(LostVideoClient(client), max_in_flight=1, poll_interval=0.05,
+                                        rate_limit_backoff=0.1)
+        results = scheduler.run([SubmissionJob(row, "Hello.") for row in (2, 3)], lambda batch: None)
+    finally:
+        client.close()
+    assert sorted(results) == [2, 3]
+    assert scheduler.stats["renders_abandoned"] == 1
+
+
+def expected_bytes(server, video_id):
+    return b"".join(server.iter_video_bytes(video_id, 0, server.video_size - 1))
+
+
+@pytest.mark.parametrize("segments", [1, 4])
+def test_download_engine_waits_for_render_and_downloads(tmp_path, monkeypatch, segments):
+    # Small enough that the 3 MB test videos take the segmented path when segments > 1.
+    monkeypatch.setattr(video_downloader, "SEGMENT_THRESHOLD", 1024 * 1024)
+    with MockHeyGenServer(render_seconds=0.2, video_size=3 * 1024 * 1024) as server:
+        client = client_for(server)
+        try:
+            video_ids = {row: client.generate_video(f"Script {row}.") for row in (2, 3)}
+        finally:
+            client.close()
+        jobs = [DownloadJob(row, video_id, str(tmp_path / f"{row}.mp4")) for row, video_id in video_ids.items()]
+        engine = DownloadEngine("", base_url=server.url, min_interval=0.05, max_interval=0.2, segments=segments)
+        try:
+            stats = engine.run(jobs)
+        finally:
+            engine.close()
+        for job in jobs:
+            with open(job.dest_path, "rb") as f:
+                assert f.read() == expected_bytes(server, job.video_id)
+    assert stats["downloaded"] == 2
+    assert stats["failed"] == 0
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_interrupted_download_resumes(tmp_path):
+    with MockHeyGenServer(render_seconds=0.0, video_size=512 * 1024, interrupt_after=100 * 1024) as server:
+        client = client_for(server)
+        try:
+            video_id = client.generate_video("Hello there.")
+        finally:
+            client.close()
+        job = DownloadJob(2, video_id, str(tmp_path / "video.mp4"))
+        engine = DownloadEngine("", base_url=server.url, min_interval=0.05, max_interval=0.2)
+        try:
+            stats = engine.run([job])
+        finally:
+            engine.close()
+        with open(job.dest_path, "rb") as f:
+            assert f.read() == expected_bytes(server, video_id)
+    assert stats["downloaded"] == 1
+
+
+def test_download_of_unknown_video_fails(tmp_path, mock):
+    engine = DownloadEngine("", base_url=mock.url, min_interval=0.05, max_interval=0.2)
+    try:
+        stats = engine.run([DownloadJob(2, "no-such-video", str(tmp_path / "video.mp4"))])
+    finally:
+        engine.close()
+    assert stats["downloaded"] == 0
+    assert stats["failed"] == 1
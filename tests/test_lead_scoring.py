@@ -0,0 +1,55 @@
+from lead_dedup import cluster_leads
+from lead_scoring import MIN_MATCH_CONFIDENCE, best_matches, confidence_column, low_confidence
+
+
+def best(lead, organic):
+    (title, url, confidence), = best_matches([lead], [organic])
+    return url, confidence
+
+
+def test_profile_beats_company_page_and_post():
+    organic = [
+        {"title": "Acme Inc. | LinkedIn", "link": "https://www.linkedin.com/company/acme"},
+        {"title": "Bob Smith on LinkedIn: great post", "link": "https://www.linkedin.com/posts/bob-smith_x"},
+        {"title": "Alice Smith - Engineer - Acme | LinkedIn", "link": "https://www.linkedin.com/in/alice-smith"},
+        {"title": "Robert Smith - Head of Sales - Acme | LinkedIn",
+         "link": "https://www.linkedin.com/in/robert-smith-12ab"},
+    ]
+    url, confidence = best(("Bob", "Smith", "Acme Inc."), organic)
+    assert url == "https://www.linkedin.com/in/robert-smith-12ab"
+    assert confidence >= MIN_MATCH_CONFIDENCE
+
+
+def test_non_latin_name_matches():
+    organic = [{"title": "Дмитрий Иванов - Яндекс | LinkedIn",
+                "link": "https://ru.linkedin.com/in/%D0%B4%D0%BC%D0%B8%D1%82%D1%80%D0%B8%D0%B9-%D0%B8%D0%B2%D0%B0%D0%BD%D0%BE%D0%B2"}]
+    _, confidence = best(("Дмитрий", "Иванов", "Яндекс"), organic)
+    assert confidence >= MIN_MATCH_CONFIDENCE
+
+
+def test_missing_middle_name_matches():
+    organic = [{"title": "Mary Smith - Product Manager | LinkedIn", "link": "https://www.linkedin.com/in/mary-smith"}]
+    _, confidence = best(("Mary Ann", "Smith", "Globex"), organic)
+    assert confidence >= MIN_MATCH_CONFIDENCE
+
+
+def test_wrong_first_name_is_low_confidence():
+    organic = [{"title": "Alice Smith - Engineer - Acme | LinkedIn", "link": "https://www.linkedin.com/in/alice-smith"}]
+    _, confidence = best(("Bob", "Smith", "Acme"), organic)
+    assert confidence < MIN_MATCH_CONFIDENCE
+
+
+def test_low_confidence_reads_the_header_column():
+    header = ["First", "Last", "Company", "Title", "URL", "Match Confidence"]
+    column = confidence_column(header)
+    assert low_confidence(["a", "b", "c", "t", "u", "0.31"], column) == 0.31
+    assert low_confidence(["a", "b", "c", "t", "u", "0.90"], column) is None
+    assert low_confidence(["a", "b", "c"], column) is None
+    assert low_confidence(["a", "b", "c", "t", "u", "0.31"], confidence_column(header[:5])) is None
+
+
+def test_cluster_leads_joins_variants_only():
+    leads = [("Robert", "Smith", "Acme Inc."), ("bob", "smith", "ACME LLC"), ("María", "García", "Globex"),
+             ("Maria", "Garcia", "Globex Corporation"), ("Jane", "Doe", ""), ("John", "Doe", "Initech"),
+             ("Дмитрий", "Иванов", "Яндекс"), ("дмитрий", "иванов", "Яндекс")]
+    assert cluster_leads(leads) == [[0, 1], [2, 3], [4], [5], [6, 7]]
@@ -0,0 +1,26 @@
+from screenshot_writer import ScreenshotWriter
+
+
+class FakeImage:
+    """Writes some bytes, then fails part-way if 'fail' is set (like a full disk)."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    def save(self, f, format, **params):
+        f.write(b"\x89PNG" + b"x" * 100)
+        if self.fail:
+            raise OSError("No space left on device")
+
+
+def test_failed_write_leaves_no_partial_file(tmp_path):
+    errors = []
+    writer = ScreenshotWriter(fsync_every=2, on_error=lambda path, e: errors.append(path)).start()
+    for i in range(5):
+        writer.submit(FakeImage(fail=i == 2), str(tmp_path / f"screenshot_{i}.png"))
+    writer.close()
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "screenshot_0.png", "screenshot_1.png", "screenshot_3.png", "screenshot_4.png"]
+    assert errors == [str(tmp_path / "screenshot_2.png")]
+    stats = writer.stats()
+    assert stats["written"] == 4 and stats["errors"] == 1 and stats["fsyncs"] == 2
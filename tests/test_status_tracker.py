@@ -0,0 +1,43 @@
+import requests
+
+from status_tracker import StatusTracker
+
+
+def run(tracker):
+    outcomes = []
+    tracker.run(lambda key, video_id, url: outcomes.append(("ready", key)),
+                lambda key, video_id, reason: outcomes.append(("failed", key)),
+                lambda key, video_id, reason: outcomes.append(("abandoned", key)))
+    return sorted(outcomes)
+
+
+def test_slow_render_is_polled_until_it_finishes():
+    checks = {"count": 0}
+
+    def fetch(video_id):
+        checks["count"] += 1
+        if checks["count"] < 5:
+            raise requests.ConnectionError("temporarily down")
+        if checks["count"] < 12:
+            return {"status": "processing"}
+        return {"status": "completed", "video_url": "http://example/video.mp4"}
+
+    tracker = StatusTracker(fetch, min_interval=0.01, max_interval=0.01)
+    tracker.add("v", 2)
+    assert run(tracker) == [("ready", 2)]
+    assert tracker.stats["abandoned"] == 0
+
+
+def test_opt_in_limits_abandon_and_report():
+    def fetch(video_id):
+        if video_id == "down":
+            raise requests.ConnectionError("down")
+        return {"status": "processing"}
+
+    tracker = StatusTracker(fetch, min_interval=0.01, max_interval=0.02, max_errors=3, max_age=0.2)
+    tracker.add("down", 2)
+    tracker.add("slow", 3)
+    assert run(tracker) == [("abandoned", 2), ("abandoned", 3)]
+    assert tracker.stats["abandoned"] == 2
+    assert tracker.stats["failed"] == 0
+    assert sorted(key for key, _, _ in tracker.abandoned) == [2, 3]
@@ -0,0 +1,69 @@
+import sqlite3
+
+from work_queue import Retry, Worker, WorkQueue
+
+
+def test_lost_lease_discards_the_result(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"), lease_seconds=60)
+    queue.enqueue("submit", "2", {"script": "Hello."})
+    worker = Worker(queue, "submit", None, worker_id="a")
+    job = queue.lease("submit", "a")
+
+    def handler(payload, checkpoint):
+        # Meanwhile the lease ran out and worker "b" took the job over.
+        queue._connection().execute("UPDATE jobs SET lease_owner = 'b' WHERE id = ?", (job.id,))
+        return {"video_id": "from-a"}
+
+    worker.handler = handler
+    worker.run_one(job)
+    assert worker.stats["done"] == 0
+    assert worker.stats["lost"] == 1
+    assert queue.counts("submit") == {"leased": 1}
+    assert queue.results("submit") == {}
+
+
+def test_checkpoint_is_seen_by_the_next_run(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"), lease_seconds=60)
+    queue.enqueue("submit", "2", {"script": "Hello."})
+    generated = []
+
+    def handler(payload, checkpoint):
+        if payload.get("video_id"):
+            return {"video_id": payload["video_id"]}
+        generated.append(payload["script"])
+        checkpoint(video_id="v1")
+        raise RuntimeError("crashed after paying for the video")
+
+    worker = Worker(queue, "submit", handler, worker_id="a", poll_interval=0.01)
+    stats = worker.run()
+    assert generated == ["Hello."]
+    assert stats["failed"] == 1 and stats["done"] == 1
+    assert queue.results("submit") == {"2": {"video_id": "v1"}}
+
+
+def test_retries_are_capped(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"), max_retries=3)
+    queue.enqueue("download", "2", {})
+
+    def handler(payload, checkpoint):
+        raise Retry("video is processing", delay=0)
+
+    stats = Worker(queue, "download", handler, poll_interval=0.01).run()
+    assert stats == {"done": 0, "failed": 1, "retried": 2, "lost": 0}
+    assert queue.counts("download") == {"failed": 1}
+    assert queue.requeue_failed("download") == 1
+    assert queue.lease("download", "a").retries == 0
+
+
+def test_old_database_gets_the_retries_column(tmp_path):
+    db_path = str(tmp_path / "queue.db")
+    db = sqlite3.connect(db_path)
+    db.execute("CREATE TABLE jobs (id INTEGER PRIMARY KEY, stage TEXT NOT NULL, key TEXT NOT NULL, "
+               "payload TEXT NOT NULL, priority INTEGER NOT NULL DEFAULT 0, state TEXT NOT NULL DEFAULT 'pending', "
+               "attempts INTEGER NOT NULL DEFAULT 0, available_at REAL NOT NULL DEFAULT 0, lease_owner TEXT, "
+               "lease_expires REAL, result TEXT, error TEXT, updated_at REAL, UNIQUE (stage, key))")
+    db.commit()
+    db.close()
+    queue = WorkQueue(db_path)
+    queue.enqueue("search", "2", {})
+    assert queue.lease("search", "a").retries == 0
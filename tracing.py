@@ -0,0 +1,285 @@
+"""
+Per-lead tracing and stage metrics for the pipeline steps.
+
+Every lead (CSV row) is one trace; each step records timed spans on it:
+    search, page_load, capture, ocr, llm, submit, render_wait, download, composite
+
+Spans are appended to a JSONL file shared by all steps (one JSON object per
+line) and counted in memory as Prometheus-style counters and latency
+histograms. A long-running process can expose those on /metrics with
+start_metrics_server(); the `serve` command does the same for the trace file,
+so the GUI steps need no port of their own.
+
+    with tracer.span(row_number, "ocr", images=4) as span:
+        ...
+        span.fail("OCR.space returned an error")   # failure without an exception
+
+Usage:
+    python tracing.py report [logs/traces.jsonl ...] [--since-hours 24]
+    python tracing.py serve  [logs/traces.jsonl] [--port 9464]
+"""
+
+import argparse
+import bisect
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from log_view import LOG_DIR
+
+# JSONL trace file shared by every step ("" turns file output off).
+TRACE_FILE = os.environ.get("TRACE_FILE", os.path.join(LOG_DIR, "traces.jsonl"))
+METRICS_PORT = 9464
+METRICS_PREFIX = "replireach"
+# Upper bounds of the latency histogram buckets (s); LLM calls and render waits run to minutes.
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+STAGES = ("search", "page_load", "capture", "ocr", "llm", "submit", "render_wait", "download", "composite")
+
+
+class Metrics:
+    """Span counters and latency histograms per (stage, status)."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.series = {}          # (stage, status) -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, stage, status, duration):
+        with self._lock:
+            series = self.series.get((stage, status))
+            if series is None:
+                series = self.series[(stage, status)] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, duration)] += 1
+            series[-1] += duration
+
+    def render(self):
+        """The metrics in the Prometheus text exposition format."""
+        name = f"{METRICS_PREFIX}_span_seconds"
+        lines = [f"# HELP {METRICS_PREFIX}_spans_total Finished spans by stage and status.",
+                 f"# TYPE {METRICS_PREFIX}_spans_total counter"]
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self.series.items())
+        for (stage, status), values in series:
+            lines.append(f'{METRICS_PREFIX}_spans_total{{stage="{stage}",status="{status}"}} {sum(values[:-1])}')
+        lines += [f"# HELP {name} Span latency by stage.", f"# TYPE {name} histogram"]
+        for (stage, status), values in series:
+            labels = f'stage="{stage}",status="{status}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {sum(values[:-1])}')
+            lines.append(f"{name}_sum{{{labels}}} {values[-1]:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {sum(values[:-1])}")
+        return "\n".join(lines) + "\n"
+
+
+class Span:
+    def __init__(self, tracer, trace_id, stage, attrs):
+        self.tracer = tracer
+        self.trace_id = str(trace_id)
+        self.stage = stage
+        self.attrs = attrs
+        self.status = "ok"
+        self.error = None
+        self.start = None
+
+    def fail(self, error):
+        """Marks the span failed without raising (for code that reports errors as return values)."""
+        self.status = "error"
+        self.error = str(error)[:500]
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.start = time.time()
+        self._clock = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.fail(exc)
+        self.tracer.record(self.trace_id, self.stage, self.start, time.perf_counter() - self._clock,
+                           self.status, self.error, **self.attrs)
+        return False
+
+
+class Tracer:
+    """
+    :param trace_file: JSONL file the spans are appended to (None = memory only).
+    """
+
+    def __init__(self, trace_file=TRACE_FILE):
+        self.trace_file = trace_file or None
+        self.metrics = Metrics()
+        self.host = socket.gethostname()
+        self._file = None
+        self._lock = threading.Lock()
+
+    def span(self, trace_id, stage, **attrs):
+        """Context manager timing one stage of lead 'trace_id' (its CSV row number)."""
+        return Span(self, trace_id, stage, attrs)
+
+    def record(self, trace_id, stage, start, duration, status="ok", error=None, **attrs):
+        """Records a span whose timing is already known (e.g. a render measured from its submission)."""
+        self.metrics.observe(stage, status, duration)
+        if not self.trace_file:
+            return
+        line = json.dumps({
+            "trace": str(trace_id), "span": uuid.uuid4().hex[:16], "stage": stage,
+            "start": round(start, 3), "duration": round(duration, 4), "status": status,
+            "error": error, "attrs": attrs, "host": self.host, "pid": os.getpid(),
+        }, default=str)
+        with self._lock:
+            try:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(self.trace_file) or ".", exist_ok=True)
+                    self._file = open(self.trace_file, "a", encoding="utf-8")
+                # One write per line, so lines from several processes do not interleave.
+                self._file.write(line + "\n")
+                self._file.flush()
+            except OSError:
+                # Tracing must never break a run.
+                pass
+
+
+tracer = Tracer()
+
+
+# ----------------------------------------------------------------------
+# /metrics endpoint
+# ----------------------------------------------------------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    render = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = type(self).render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port=METRICS_PORT, host="0.0.0.0", render=None):
+    """Serves render() (default: this process's tracer metrics) on /metrics; returns the server."""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"render": staticmethod(render or tracer.metrics.render)})
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+class TraceFileMetrics:
+    """Metrics built from a trace file, read incrementally on each scrape (for `serve`)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.metrics = Metrics()
+        self.offset = 0
+        self._lock = threading.Lock()
+
+    def render(self):
+        with self._lock:
+            if os.path.exists(self.path):
+                with open(self.path, "rb") as f:
+                    f.seek(self.offset)
+                    data = f.read()
+                # Leave a half-written last line for the next scrape.
+                data = data[:data.rfind(b"\n") + 1]
+                self.offset += len(data)
+                for span in _parse_lines(data.decode("utf-8", "replace").splitlines()):
+                    self.metrics.observe(span["stage"], span["status"], span["duration"])
+        return self.metrics.render()
+
+
+# ----------------------------------------------------------------------
+# Report
+# ----------------------------------------------------------------------
+def _parse_lines(lines):
+    for line in lines:
+        try:
+            span = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(span, dict) and "stage" in span and "duration" in span:
+            span.setdefault("status", "ok")
+            yield span
+
+
+def read_spans(paths, since=None):
+    spans = []
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            spans.extend(s for s in _parse_lines(f) if since is None or s.get("start", 0) >= since)
+    return spans
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(-(-q * len(sorted_values) // 1)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def format_report(spans):
+    by_stage = {}
+    for span in spans:
+        by_stage.setdefault(span["stage"], []).append(span)
+    order = [stage for stage in STAGES if stage in by_stage] + sorted(set(by_stage) - set(STAGES))
+
+    lines = [f"{'stage':<12}{'count':>7}{'errors':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'total':>11}"]
+    for stage in order:
+        durations = sorted(span["duration"] for span in by_stage[stage])
+        errors = sum(1 for span in by_stage[stage] if span["status"] != "ok")
+        lines.append(f"{stage:<12}{len(durations):>7}{errors:>8}"
+                     + "".join(f"{percentile(durations, q):>9.2f}s" for q in (0.5, 0.95, 0.99))
+                     + f"{sum(durations):>10.0f}s")
+    leads = {span["trace"] for span in spans}
+    lines.append(f"{len(spans)} spans over {len(leads)} leads.")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report on or serve the pipeline's trace file.")
+    parser.add_argument("command", choices=("report", "serve"))
+    parser.add_argument("files", nargs="*", help=f"Trace files (default {TRACE_FILE}).")
+    parser.add_argument("--since-hours", type=float, help="Only spans started in the last N hours (report).")
+    parser.add_argument("--port", type=int, default=METRICS_PORT, help="Port for /metrics (serve).")
+    args = parser.parse_args()
+    files = args.files or [TRACE_FILE]
+    missing = [path for path in files if args.command == "report" and not os.path.exists(path)]
+    if missing:
+        parser.error(f"no such trace file: {missing[0]}")
+
+    if args.command == "report":
+        since = time.time() - args.since_hours * 3600 if args.since_hours else None
+        print(format_report(read_spans(files, since)))
+    else:
+        if len(files) != 1:
+            parser.error("serve takes a single trace file")
+        start_metrics_server(args.port, render=TraceFileMetrics(files[0]).render)
+        print(f"Serving metrics for {files[0]} on http://0.0.0.0:{args.port}/metrics")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""
+Concurrent HeyGen status polling and video download engine for step5.
+
+Every pending video id is tracked at the same time (see status_tracker) and
+each download starts as soon as its own status is completed, so one slow
+render no longer blocks the finished ones behind it. All requests go through one keep-alive session
+and are capped per host.
+
+Videos are streamed to a ".part" file in fixed-size chunks and renamed into
+place once their size checks out, so memory stays flat regardless of video
+size and an interrupted transfer resumes with an HTTP Range request.
+Segmented downloads preallocate their own ".segments.part" file, which is
+never resumed: it is removed if the download fails and rewritten on the next run.
+
+With a webhook port set, HeyGen's completion callbacks (see webhook_receiver)
+trigger an immediate status check and polling only runs at a slow fallback pace.
+"""
+
+import contextlib
+import os
+import re
+import threading
+import time
+import concurrent.futures
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from heygen_client import HEYGEN_API_BASE, STATUS_ENDPOINT
+from status_tracker import StatusTracker
+from tracing import tracer
+from webhook_receiver import WebhookReceiver
+
+CHUNK_SIZE = 1024 * 1024
+# Files at least this large are fetched as parallel ranged segments when
+# the engine is created with segments > 1.
+SEGMENT_THRESHOLD = 64 * 1024 * 1024
+
+_CONTENT_RANGE_RE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+
+class DownloadError(Exception):
+    """Raised when a download cannot be completed or fails verification."""
+
+
+def _no_slot(url):
+    return contextlib.nullcontext()
+
+
+def _stream_to(response, f, chunk_size):
+    written = 0
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        if chunk:
+            f.write(chunk)
+            written += len(chunk)
+    return written
+
+
+def probe_size(session, url, timeout=60, slot=_no_slot):
+    """Returns (size, accepts_ranges) from a HEAD request; size is None if unknown."""
+    with slot(url):
+        response = session.head(url, allow_redirects=True, timeout=timeout)
+    if response.status_code != 200:
+        return None, False
+    length = response.headers.get("Content-Length")
+    accepts_ranges = response.headers.get("Accept-Ranges", "").lower() == "bytes"
+    return (int(length) if length and length.isdigit() else None), accepts_ranges
+
+
+def download_file(session, url, dest_path, chunk_size=CHUNK_SIZE, timeout=60, max_retries=3,
+                  slot=_no_slot):
+    """
+    Streams 'url' into dest_path + ".part" and atomically renames it to 'dest_path'.
+    An existing ".part" file (from an earlier interrupted run or a dropped
+    connection) is resumed with a Range request. The final size is checked against
+    the server's Content-Length / Content-Range. Returns the number of bytes.
+    """
+    part_path = dest_path + ".part"
+    expected = None
+    retries = 0
+
+    while True:
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            with slot(url):
+                with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                    if response.status_code == 416 and offset:
+                        match = re.match(r"bytes \*/(\d+)", response.headers.get("Content-Range", ""))
+                        if match and int(match.group(1)) == offset:
+                            break  # the .part file is already complete
+                        # Stale .part that no longer matches the remote file: start over.
+                        os.remove(part_path)
+                        retries += 1
+                        if retries > max_retries:
+                            raise DownloadError("Server rejected the resume range.")
+                        continue
+                    if response.status_code == 206:
+                        match = _CONTENT_RANGE_RE.match(response.headers.get("Content-Range", ""))
+                        if not match or int(match.group(1)) != offset:
+                            raise DownloadError("Server returned an unexpected range.")
+                        if match.group(3) != "*":
+                            expected = int(match.group(3))
+                        mode = "ab"
+                    else:
+                        response.raise_for_status()
+                        # Server ignored the Range header: start over.
+                        offset = 0
+                        length = response.headers.get("Content-Length")
+                        expected = int(length) if length and length.isdigit() else None
+                        mode = "wb"
+                    with open(part_path, mode) as f:
+                        _stream_to(response, f, chunk_size)
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+            retries += 1
+            if retries > max_retries:
+                raise DownloadError(f"Download interrupted {retries} times: {e}")
+            continue
+
+        size = os.path.getsize(part_path)
+        if expected is None or size == expected:
+            break
+        if size > expected:
+            os.remove(part_path)
+            raise DownloadError(f"Downloaded {size} bytes, expected {expected}.")
+        retries += 1
+        if retries > max_retries:
+            raise DownloadError(f"Incomplete download: {size} of {expected} bytes.")
+
+    os.replace(part_path, dest_path)
+    return os.path.getsize(dest_path)
+
+
+def download_segmented(session, url, dest_path, size, segments=4, chunk_size=CHUNK_SIZE,
+                       timeout=60, max_retries=3, slot=_no_slot):
+    """
+    Fetches 'size' bytes of 'url' as 'segments' parallel ranged requests into a
+    preallocated ".segments.part" file, then renames it to 'dest_path'. Each segment
+    is retried from where it stopped. The preallocated file is full length from the
+    start, so it is not left for download_file to mistake for a complete ".part".
+    """
+    part_path = dest_path + ".segments.part"
+    try:
+        return _download_segments(session, url, dest_path, part_path, size, segments, chunk_size,
+                                  timeout, max_retries, slot)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(part_path)
+        raise
+
+
+def _download_segments(session, url, dest_path, part_path, size, segments, chunk_size, timeout,
+                       max_retries, slot):
+    with open(part_path, "wb") as f:
+        f.truncate(size)
+
+    bounds = []
+    segment_size = -(-size // segments)
+    for start in range(0, size, segment_size):
+        bounds.append((start, min(start + segment_size, size) - 1))
+
+    def fetch(start, end):
+        position = start
+        retries = 0
+        with open(part_path, "r+b") as f:
+            while position <= end:
+                f.seek(position)
+                try:
+                    with slot(url):
+                        with session.get(url, headers={"Range": f"bytes={position}-{end}"},
+                                         stream=True, timeout=timeout) as response:
+                            if response.status_code != 206:
+                                raise DownloadError(f"Range request returned HTTP {response.status_code}.")
+                            position += _stream_to(response, f, chunk_size)
+                except (requests.ConnectionError, requests.Timeout,
+                        requests.exceptions.ChunkedEncodingError) as e:
+                    retries += 1
+                    if retries > max_retries:
+                        raise DownloadError(f"Segment {start}-{end} failed: {e}")
+        if position != end + 1:
+            raise DownloadError(f"Segment {start}-{end} returned {position - start} bytes.")
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(bounds)) as executor:
+        for future in [executor.submit(fetch, start, end) for start, end in bounds]:
+            future.result()
+
+    if os.path.getsize(part_path) != size:
+        raise DownloadError(f"Downloaded file is {os.path.getsize(part_path)} bytes, expected {size}.")
+    os.replace(part_path, dest_path)
+    return size
+
+
+class DownloadJob:
+    def __init__(self, row_number, video_id, dest_path):
+        self.row_number = row_number
+        self.video_id = video_id
+        self.dest_path = dest_path
+
+
+class DownloadEngine:
+    """
+    :param api_key: HeyGen API key (sent only to the status endpoint).
+    :param base_url: HeyGen API base URL.
+    :param max_per_host: Maximum concurrent connections to any one host.
+    :param workers: Number of videos downloaded at the same time.
+    :param min_interval: Shortest delay between status checks of one video (s).
+    :param max_interval: Longest delay between status checks of one video (s).
+    :param state_path: JSON file where the status tracker keeps its state across runs.
+    :param segments: Parallel ranged segments for files over SEGMENT_THRESHOLD (1 = off).
+    :param webhook_port: Port for the completion webhook receiver (None = poll only).
+    :param webhook_secret: Secret used to verify webhook signatures.
+    :param fallback_interval: Shortest delay between status checks while the webhook is active (s).
+    :param max_status_errors: Abandon a video after this many failed status checks in a row (None = never).
+    :param max_render_age: Abandon a video still unfinished this long after submission (s; None = never).
+    :param on_event: Callback(message) for progress lines; called from worker threads.
+    """
+
+    def __init__(self, api_key, base_url=HEYGEN_API_BASE, max_per_host=4, workers=8,
+                 min_interval=5.0, max_interval=120.0, state_path=None, timeout=60, segments=1,
+                 webhook_port=None, webhook_secret=None, fallback_interval=60.0, max_status_errors=None,
+                 max_render_age=None, on_event=None):
+        self.base_url = base_url.rstrip("/")
+        self.api_headers = {"x-api-key": api_key} if api_key else {}
+        self.max_per_host = max_per_host
+        self.workers = workers
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.state_path = state_path
+        self.timeout = timeout
+        self.segments = segments
+        self.webhook_port = webhook_port
+        self.webhook_secret = webhook_secret
+        self.fallback_interval = fallback_interval
+        self.max_status_errors = max_status_errors
+        self.max_render_age = max_render_age
+        self.on_event = on_event or (lambda message: None)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=max_per_host)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._host_slots = {}
+        self._host_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {"downloaded": 0, "failed": 0, "abandoned": 0, "status_requests": 0, "bytes": 0}
+        self.abandoned = []       # (row number, video id, reason) of videos given up on by the limits above
+
+    def _slot(self, url):
+        host = urlparse(url).netloc
+        with self._host_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_slots[host]
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def fetch_status(self, video_id):
+        """Returns the status endpoint's 'data' block for 'video_id'."""
+        url = self.base_url + STATUS_ENDPOINT
+        with self._slot(url):
+            response = self.session.get(
+                url, params={"video_id": video_id}, headers=self.api_headers, timeout=self.timeout
+            )
+        response.raise_for_status()
+        return response.json().get("data", {})
+
+    def download(self, job, video_url):
+        """Streams 'video_url' to job.dest_path; returns the number of bytes."""
+        with tracer.span(job.row_number, "download", video_id=job.video_id) as span:
+            size = None
+            if self.segments > 1 and not os.path.exists(job.dest_path + ".part"):
+                size, accepts_ranges = probe_size(self.session, video_url, self.timeout, self._slot)
+                if not accepts_ranges:
+                    size = None
+            if size is not None and size >= SEGMENT_THRESHOLD:
+                written = download_segmented(self.session, video_url, job.dest_path, size,
+                                             segments=self.segments, timeout=self.timeout, slot=self._slot)
+            else:
+                written = download_file(self.session, video_url, job.dest_path,
+                                        timeout=self.timeout, slot=self._slot)
+            span.set(bytes=written)
+        self._count("bytes", written)
+        return written
+
+    def process(self, job, video_url):
+        try:
+            self.download(job, video_url)
+        except Exception as e:
+            self.on_event(f"Row {job.row_number}: Error downloading video: {e}")
+            self._count("failed")
+            return False
+        self.on_event(f"Row {job.row_number}: Video saved to:\n{job.dest_path}")
+        self._count("downloaded")
+        return True
+
+    def run(self, jobs):
+        """
+        Tracks every job's render status and downloads each video as soon as it
+        completes. Returns the stats dict once nothing is outstanding.
+        """
+        start = time.monotonic()
+        jobs_by_row = {job.row_number: job for job in jobs}
+        min_interval = self.min_interval
+        if self.webhook_port is not None:
+            # Polling is only the safety net for missed callbacks.
+            min_interval = max(min_interval, self.fallback_interval)
+        tracker = StatusTracker(
+            self.fetch_status,
+            state_path=self.state_path,
+            min_interval=min_interval,
+            max_interval=max(self.max_interval, min_interval),
+            workers=self.max_per_host,
+            max_errors=self.max_status_errors,
+            max_age=self.max_render_age,
+            on_event=self.on_event,
+        )
+        receiver = None
+        if self.webhook_port is not None:
+            # Webhook events only trigger an immediate status check; the video URL
+            # always comes from the authenticated status endpoint.
+            receiver = WebhookReceiver(lambda video_id, url: tracker.notify(video_id),
+                                       lambda video_id, message: tracker.notify(video_id),
+                                       port=self.webhook_port, secret=self.webhook_secret).start()
+            self.on_event(f"Listening for HeyGen webhooks on port {receiver.httpd.server_address[1]}.")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            def on_ready(row_number, video_id, video_url):
+                self.on_event(f"Row {row_number}: Video completed!")
+                executor.submit(self.process, jobs_by_row[row_number], video_url)
+
+            def on_failed(row_number, video_id, reason):
+                self.on_event(f"Row {row_number}: Video URL not retrieved ({reason}), skipping.")
+                self._count("failed")
+
+            def on_abandoned(row_number, video_id, reason):
+                self.on_event(f"Row {row_number}: Gave up waiting for the video ({reason}); "
+                              f"run the download again later to pick it up.")
+                self._count("abandoned")
+                self.abandoned.append((row_number, video_id, reason))
+
+            try:
+                for job in jobs:
+                    tracker.add(job.video_id, job.row_number)
+                tracker.run(on_ready, on_failed, on_abandoned)
+            finally:
+                if receiver is not None:
+                    receiver.stop()
+
+        self.stats["status_requests"] = tracker.stats["polls"]
+        self.stats["webhook_events"] = tracker.stats["pushed"]
+        self.stats["elapsed_seconds"] = round(time.monotonic() - start, 2)
+        return self.stats
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,130 @@
+"""
+Optional HTTP callback receiver for HeyGen video webhooks (step5).
+
+HeyGen can POST an event when a render finishes:
+    {"event_type": "avatar_video.success",
+     "event_data": {"video_id": "...", "url": "https://..."}}
+    {"event_type": "avatar_video.fail",
+     "event_data": {"video_id": "...", "msg": "..."}}
+
+Received events make the status tracker check the video straight away, so the
+download starts without waiting for the next poll; the event's URL is not
+used, the status endpoint supplies it. Polling continues at a slower pace as a
+fallback for missed events. The endpoint has to be reachable by HeyGen (e.g.
+through a tunnel) and registered as a webhook for those two events.
+
+Without a secret the receiver only listens on 127.0.0.1 (for a local tunnel);
+it refuses to listen on any other address unless a secret is set.
+"""
+
+import hashlib
+import hmac
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WEBHOOK_PATH = "/heygen/webhook"
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+
+class WebhookReceiver:
+    """
+    :param on_completed: Callback(video_id, video_url) for success events.
+    :param on_failed: Callback(video_id, message) for failure events.
+    :param host: Address to listen on; defaults to all interfaces with a secret, 127.0.0.1 without.
+    :param secret: Webhook secret; when set, the "Signature" header must be the hex
+                   HMAC-SHA256 of the request body.
+    """
+
+    def __init__(self, on_completed, on_failed, host=None, port=8787, secret=None):
+        if host is None:
+            host = "0.0.0.0" if secret else "127.0.0.1"
+        elif not secret and host not in LOOPBACK_HOSTS:
+            raise ValueError(f"Refusing to accept unsigned webhooks on {host}; set a webhook secret.")
+        self.on_completed = on_completed
+        self.on_failed = on_failed
+        self.secret = secret
+        self.stats = {"received": 0, "rejected": 0}
+        self._lock = threading.Lock()
+
+        handler = type("WebhookHandler", (_Handler,), {"receiver": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        if host == "0.0.0.0":
+            host = "127.0.0.1"
+        return f"http://{host}:{port}{WEBHOOK_PATH}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def verify(self, body, signature):
+        if not self.secret:
+            return True
+        expected = hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature or "")
+
+    def handle_event(self, event):
+        """Dispatches one decoded webhook payload; returns False if it was not usable."""
+        event_type = event.get("event_type")
+        data = event.get("event_data") or {}
+        video_id = data.get("video_id")
+        if not video_id:
+            return False
+        if event_type == "avatar_video.success" and data.get("url"):
+            self.on_completed(video_id, data["url"])
+        elif event_type == "avatar_video.fail":
+            self.on_failed(video_id, data.get("msg") or "Video generation failed")
+        else:
+            return False
+        return True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    receiver = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        if self.path.split("?")[0] != WEBHOOK_PATH:
+            self._reply(404)
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if not self.receiver.verify(body, self.headers.get("Signature")):
+            self.receiver._count("rejected")
+            self._reply(401)
+            return
+        try:
+            event = json.loads(body or b"{}")
+        except ValueError:
+            self.receiver._count("rejected")
+            self._reply(400)
+            return
+        if self.receiver.handle_event(event):
+            self.receiver._count("received")
+        else:
+            self.receiver._count("rejected")
+        # Always acknowledge well-formed requests so the sender does not retry.
+        self._reply(200)
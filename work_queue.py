@@ -0,0 +1,324 @@
+"""
+Leased work queue for running pipeline stages on several machines.
+
+Jobs live in one SQLite database, which can sit on a shared filesystem (the
+database uses SQLite's default rollback journal, which works over network
+shares; WAL does not). A worker leases a job for lease_seconds, renews the
+lease from a heartbeat thread while its handler runs, and marks the job done
+or failed. If a worker dies, its lease runs out and the job goes back to
+another worker, up to max_attempts times.
+
+    queue = WorkQueue("/shared/pipeline.db")
+    queue.enqueue("download", "12", {"video_id": "...", "dest_path": "..."})
+    Worker(queue, "download", handler).run()
+
+Handlers take the job's payload dict and a checkpoint callable, and return a
+JSON-serializable result. checkpoint(**fields) saves fields into the stored
+payload right away, so a job that is run again (its lease ran out while the
+handler was busy) can see what the earlier run already did, e.g. the id of a
+video it paid for. Raising Retry puts the job back after a delay without
+counting it as a failure (e.g. a video that is still rendering), up to
+max_retries times. A worker whose lease was lost discards its result.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+DEFAULT_LEASE_SECONDS = 60
+DEFAULT_MAX_ATTEMPTS = 3
+# Retry requests per job before it is marked failed (3 hours of 30s render checks).
+DEFAULT_MAX_RETRIES = 360
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    stage TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    retries INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    updated_at REAL,
+    UNIQUE (stage, key)
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (stage, state, available_at);
+"""
+
+
+class Retry(Exception):
+    """Raised by a handler to run the job again after 'delay' seconds."""
+
+    def __init__(self, message="", delay=30):
+        super().__init__(message)
+        self.delay = delay
+
+
+class Job:
+    def __init__(self, job_id, stage, key, payload, attempts, retries=0):
+        self.id = job_id
+        self.stage = stage
+        self.key = key
+        self.payload = payload
+        self.attempts = attempts
+        self.retries = retries
+
+
+class WorkQueue:
+    """
+    :param db_path: SQLite database file, shared by every worker.
+    :param lease_seconds: How long a lease lasts without a heartbeat.
+    :param max_attempts: Leases per job before it is marked failed.
+    :param max_retries: Retry requests per job before it is marked failed.
+    """
+
+    def __init__(self, db_path, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                 max_retries=DEFAULT_MAX_RETRIES):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.max_retries = max_retries
+        self._local = threading.local()
+        db = self._connection()
+        db.executescript(SCHEMA)
+        # Databases created before retries were counted.
+        if "retries" not in {row[1] for row in db.execute("PRAGMA table_info(jobs)")}:
+            try:
+                db.execute("ALTER TABLE jobs ADD COLUMN retries INTEGER NOT NULL DEFAULT 0")
+            except sqlite3.OperationalError:
+                pass  # another worker added it first
+
+    def _connection(self):
+        # One connection per thread; the heartbeat thread gets its own.
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+            self._local.db = db
+        return db
+
+    class _Transaction:
+        def __init__(self, db):
+            self.db = db
+
+        def __enter__(self):
+            # IMMEDIATE takes the write lock up front, so two workers never lease the same job.
+            self.db.execute("BEGIN IMMEDIATE")
+            return self.db
+
+        def __exit__(self, exc_type, exc, tb):
+            self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+    def _transaction(self):
+        return self._Transaction(self._connection())
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+    def enqueue(self, stage, key, payload, priority=0):
+        """Adds a job; returns False if (stage, key) is already queued."""
+        return self.enqueue_many(stage, [(key, payload, priority)]) == 1
+
+    def enqueue_many(self, stage, jobs):
+        """Adds (key, payload[, priority]) tuples in one transaction; returns how many were new."""
+        added = 0
+        now = time.time()
+        with self._transaction() as db:
+            for job in jobs:
+                key, payload = job[0], job[1]
+                priority = job[2] if len(job) > 2 else 0
+                cursor = db.execute(
+                    "INSERT OR IGNORE INTO jobs (stage, key, payload, priority, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (stage, str(key), json.dumps(payload), priority, now),
+                )
+                added += cursor.rowcount
+        return added
+
+    def results(self, stage):
+        """{key: result} for the stage's finished jobs."""
+        rows = self._connection().execute(
+            "SELECT key, result FROM jobs WHERE stage = ? AND state = 'done'", (stage,)
+        )
+        return {key: json.loads(result) if result else None for key, result in rows}
+
+    def counts(self, stage=None):
+        """{state: number of jobs}, for one stage or all of them."""
+        if stage:
+            rows = self._connection().execute(
+                "SELECT state, COUNT(*) FROM jobs WHERE stage = ? GROUP BY state", (stage,))
+        else:
+            rows = self._connection().execute("SELECT state, COUNT(*) FROM jobs GROUP BY state")
+        return dict(rows)
+
+    # ------------------------------------------------------------------
+    # Worker side
+    # ------------------------------------------------------------------
+    def lease(self, stage, worker_id):
+        """Leases the next ready job of 'stage' to 'worker_id'; returns a Job or None."""
+        now = time.time()
+        with self._transaction() as db:
+            while True:
+                row = db.execute(
+                    "SELECT id, key, payload, attempts, retries FROM jobs "
+                    "WHERE stage = ? AND available_at <= ? "
+                    "AND (state = 'pending' OR (state = 'leased' AND lease_expires < ?)) "
+                    "ORDER BY priority DESC, id LIMIT 1",
+                    (stage, now, now),
+                ).fetchone()
+                if row is None:
+                    return None
+                job_id, key, payload, attempts, retries = row
+                if attempts >= self.max_attempts:
+                    # Its last worker died holding the lease.
+                    db.execute("UPDATE jobs SET state = 'failed', error = ?, lease_owner = NULL, updated_at = ? "
+                               "WHERE id = ?", ("Lease expired too many times", now, job_id))
+                    continue
+                db.execute(
+                    "UPDATE jobs SET state = 'leased', attempts = attempts + 1, lease_owner = ?, "
+                    "lease_expires = ?, updated_at = ? WHERE id = ?",
+                    (worker_id, now + self.lease_seconds, now, job_id),
+                )
+                return Job(job_id, stage, key, json.loads(payload), attempts + 1, retries)
+
+    def heartbeat(self, job, worker_id):
+        """Extends the lease; returns False if the job is no longer leased to this worker."""
+        now = time.time()
+        cursor = self._connection().execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+            "WHERE id = ? AND state = 'leased' AND lease_owner = ?",
+            (now + self.lease_seconds, now, job.id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def checkpoint(self, job, fields):
+        """
+        Merges 'fields' into the job's stored payload (and job.payload). Written even
+        if the lease was lost, so whoever runs the job next sees them.
+        """
+        job.payload.update(fields)
+        with self._transaction() as db:
+            row = db.execute("SELECT payload FROM jobs WHERE id = ?", (job.id,)).fetchone()
+            payload = json.loads(row[0]) if row else {}
+            payload.update(fields)
+            db.execute("UPDATE jobs SET payload = ?, updated_at = ? WHERE id = ?",
+                       (json.dumps(payload), time.time(), job.id))
+
+    def complete(self, job, worker_id, result=None):
+        """Marks the job done; returns False (and stores nothing) if the lease was lost."""
+        cursor = self._connection().execute(
+            "UPDATE jobs SET state = 'done', result = ?, error = NULL, lease_owner = NULL, updated_at = ? "
+            "WHERE id = ? AND lease_owner = ?",
+            (json.dumps(result), time.time(), job.id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job, worker_id, error, retry_delay=0, count_attempt=True):
+        """
+        Releases a job after an error: back to pending, or failed once attempts run out.
+        With count_attempt=False (a Retry) the lease is given back and a retry counted
+        instead, and the job fails once max_retries is reached.
+        """
+        now = time.time()
+        if count_attempt:
+            out_of_attempts = job.attempts >= self.max_attempts
+        else:
+            out_of_attempts = job.retries + 1 >= self.max_retries
+        cursor = self._connection().execute(
+            "UPDATE jobs SET state = ?, error = ?, lease_owner = NULL, available_at = ?, "
+            "attempts = attempts - ?, retries = retries + ?, updated_at = ? WHERE id = ? AND lease_owner = ?",
+            ("failed" if out_of_attempts else "pending", str(error), now + retry_delay,
+             0 if count_attempt else 1, 0 if count_attempt else 1, now, job.id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def requeue_failed(self, stage):
+        """Gives the stage's failed jobs a fresh set of attempts."""
+        with self._transaction() as db:
+            return db.execute("UPDATE jobs SET state = 'pending', attempts = 0, retries = 0, available_at = 0 "
+                              "WHERE stage = ? AND state = 'failed'", (stage,)).rowcount
+
+
+class Worker:
+    """
+    Pulls jobs of one stage and runs handler(payload, checkpoint) on each.
+
+    :param idle_exit: Stop once the stage has nothing pending or leased.
+    :param poll_interval: Wait between lease attempts when nothing is ready (s).
+    """
+
+    def __init__(self, queue, stage, handler, worker_id=None, poll_interval=2.0, idle_exit=True, on_event=None):
+        self.queue = queue
+        self.stage = stage
+        self.handler = handler
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.poll_interval = poll_interval
+        self.idle_exit = idle_exit
+        self.on_event = on_event or (lambda message: None)
+        self.stats = {"done": 0, "failed": 0, "retried": 0, "lost": 0}
+
+    def _heartbeat(self, job, stop):
+        interval = self.queue.lease_seconds / 3
+        while not stop.wait(interval):
+            if not self.queue.heartbeat(job, self.worker_id):
+                self.on_event(f"{self.stage} {job.key}: lease lost")
+                return
+
+    def run_one(self, job):
+        stop = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(job, stop), daemon=True)
+        beat.start()
+        try:
+            result = self.handler(job.payload, lambda **fields: self.queue.checkpoint(job, fields))
+        except Retry as e:
+            if not self.queue.fail(job, self.worker_id, e, retry_delay=e.delay, count_attempt=False):
+                self._lost(job)
+            elif job.retries + 1 >= self.queue.max_retries:
+                self.stats["failed"] += 1
+                self.on_event(f"{self.stage} {job.key}: failed after {job.retries + 1} retries ({e})")
+            else:
+                self.stats["retried"] += 1
+                self.on_event(f"{self.stage} {job.key}: retry in {e.delay}s ({e})")
+        except Exception as e:
+            if not self.queue.fail(job, self.worker_id, e):
+                self._lost(job)
+            else:
+                self.stats["failed"] += 1
+                self.on_event(f"{self.stage} {job.key}: failed ({e})")
+        else:
+            if not self.queue.complete(job, self.worker_id, result):
+                self._lost(job)
+            else:
+                self.stats["done"] += 1
+                self.on_event(f"{self.stage} {job.key}: done")
+        finally:
+            stop.set()
+            beat.join()
+
+    def _lost(self, job):
+        # Another worker holds the job now; its outcome is the one that counts.
+        self.stats["lost"] += 1
+        self.on_event(f"{self.stage} {job.key}: lease lost, result discarded")
+
+    def run(self, max_jobs=None):
+        """Processes jobs until the stage is drained (idle_exit) or max_jobs were handled."""
+        handled = 0
+        while max_jobs is None or handled < max_jobs:
+            job = self.queue.lease(self.stage, self.worker_id)
+            if job is None:
+                counts = self.queue.counts(self.stage)
+                if self.idle_exit and not counts.get("pending") and not counts.get("leased"):
+                    break
+                time.sleep(self.poll_interval)
+                continue
+            self.run_one(job)
+            handled += 1
+        return self.stats